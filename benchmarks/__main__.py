@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+
+from benchmarks.suite import DEFAULT_SIZES, run_benchmarks, compare_reports, save_report
+from ecomerceapp.ecomerce_service.generator import OrdersGeneratorConfig
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Ecommerce service benchmark suite')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='generate synthetic orders and measure loaders, validator and queries')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    run_parser.add_argument('--customers', type=int, default=OrdersGeneratorConfig.customers)
+    run_parser.add_argument('--products', type=int, default=OrdersGeneratorConfig.products)
+    run_parser.add_argument('--days', type=int, default=OrdersGeneratorConfig.days)
+    run_parser.add_argument('--invalid-rate', type=float, default=0.01)
+    run_parser.add_argument('--seed', type=int, default=OrdersGeneratorConfig.seed)
+    run_parser.add_argument('--workers', type=int, default=None)
+    run_parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc memory profiling')
+    run_parser.add_argument('--output', default='bench_output.json')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two reports created by run command')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        config = OrdersGeneratorConfig(customers=args.customers, products=args.products, days=args.days,
+                                       invalid_rate=args.invalid_rate, seed=args.seed)
+        report = run_benchmarks(args.sizes, config, args.workers, not args.no_memory)
+        save_report(report, args.output)
+        for result in report['results']:
+            print(f"{result['group']:<10}{result['name']:<66}{result['size']:>10}{result['seconds']:>12.4f}s")
+        return
+
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        comparison = compare_reports(json.load(baseline_file), json.load(current_file), args.threshold)
+    for case in comparison:
+        flag = 'REGRESSION' if case['regression'] else ''
+        print(f"{case['group']:<10}{case['name']:<66}{case['size']:>10}{case['ratio']:>8.2f}x {flag}")
+    sys.exit(1 if any(case['regression'] for case in comparison) else 0)
+
+
+if __name__ == '__main__':
+    main()
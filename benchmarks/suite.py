@@ -0,0 +1,211 @@
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig
+from ecomerceapp.ecomerce_service.report import build_report
+from ecomerceapp.ecomerce_service.loader import load_json_file, load_orders, stream_orders_from_file, \
+    load_orders_parallel
+from ecomerceapp.ecomerce_service.model import Order
+from ecomerceapp.ecomerce_service.partitioned import PartitionedOrdersService
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.ecomerce_service.validator import ServiceDataValidator
+
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+# properties of OrdersService that build their views on first access
+LAZY_VIEWS = ('columns', 'aggregates', 'date_index', 'histograms')
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """ One measured case. peak_memory is tracemalloc peak in bytes, None when memory wasn't profiled """
+    group: str
+    name: str
+    size: int
+    seconds: float
+    peak_memory: int | None
+
+
+def measure(function: Callable[[], Any], profile_memory: bool,
+            reset: Callable[[], Any] | None = None) -> tuple[float, int | None, Any]:
+    """
+    Measures wall time of function call, and when profile_memory is set, peak of memory allocated during second call.
+    Memory is profiled in separate call, because tracemalloc slows down allocations
+    :param reset: called before both calls, for example clear of cache that would answer second call
+    :return: seconds, peak memory in bytes or None, result of timed call
+    """
+    if reset is not None:
+        reset()
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    if not profile_memory:
+        return seconds, None, result
+    del result
+    if reset is not None:
+        reset()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_memory, result
+
+
+def get_report_arguments() -> dict[str, tuple]:
+    """ Arguments of report metrics, date ranges cover whole generated date spread """
+    date_range = (datetime(1970, 1, 1, tzinfo=timezone.utc), datetime(2100, 1, 1, tzinfo=timezone.utc))
+    return {
+        'get_average_product_price_in_date_range': date_range,
+        'get_orders_count_in_date_range': date_range,
+        'get_orders_value_in_date_range': date_range,
+        'get_clients_num_that_ordered_at_least_n_products_per_transaction': (1,),
+    }
+
+
+def get_service_queries(service: OrdersService) -> dict[str, Callable[[], Any]]:
+    """ Every OrdersService query with arguments that cover whole generated date spread """
+    start_date, end_date = get_report_arguments()['get_orders_count_in_date_range']
+    return {
+        'get_average_product_price_in_date_range':
+            lambda: service.get_average_product_price_in_date_range(start_date, end_date),
+        'get_orders_count_in_date_range': lambda: service.get_orders_count_in_date_range(start_date, end_date),
+        'get_most_expensive_products_per_category': service.get_most_expensive_products_per_category,
+        'get_customers_orders_summary': service.get_customers_orders_summary,
+        'get_date_with_most_orders_made': service.get_date_with_most_orders_made,
+        'get_date_with_least_orders_made': service.get_date_with_least_orders_made,
+        'get_client_with_most_valuable_cart': service.get_client_with_most_valuable_cart,
+        'get_orders_value_after_discounts': service.get_orders_value_after_discounts,
+        'get_clients_num_that_ordered_at_least_n_products_per_transaction':
+            lambda: service.get_clients_num_that_ordered_at_least_n_products_per_transaction(1),
+        'get_most_popular_category': service.get_most_popular_category,
+        'get_months_with_quantity_of_ordered_products': service.get_months_with_quantity_of_ordered_products,
+        'get_most_popular_categories_for_months_that_orders_occurred':
+            service.get_most_popular_categories_for_months_that_orders_occurred,
+    }
+
+
+def get_partitioned_report(orders: list[Order], workers: int) -> dict[str, Any]:
+    """ Builds partitioned service and its report, worker processes are started and shut down within measured call """
+    with PartitionedOrdersService(orders, workers=workers) as service:
+        return service.get_report(arguments=get_report_arguments())
+
+
+def build_service(filepath: str) -> OrdersService:
+    """ Service built from file with every lazy view synced, so views are part of build time, not of first query """
+    service = OrdersService.from_orders(stream_orders_from_file(filepath))
+    for view in LAZY_VIEWS:
+        getattr(service, view)
+    return service
+
+
+def run_size(size: int, config: OrdersGeneratorConfig, workers: int | None, profile_memory: bool,
+             directory: str) -> Iterable[BenchmarkResult]:
+    """ Generates file with size orders and measures every loader, validator and service query on it """
+    filepath = os.path.join(directory, f'orders_{size}.json')
+    OrdersGenerator(config).write(filepath, size)
+
+    def run(group: str, name: str, function: Callable[[], Any], reset: Callable[[], Any] | None = None) -> Any:
+        seconds, peak_memory, result = measure(function, profile_memory, reset)
+        results.append(BenchmarkResult(group, name, size, seconds, peak_memory))
+        return result
+
+    results = []
+    records = run('loader', 'load_json_file', lambda: load_json_file(filepath))
+    run('loader', 'load_orders', lambda: load_orders(records))
+    run('loader', 'load_orders_lazy', lambda: load_orders(records, lazy=True))
+    run('loader', 'stream_orders_from_file', lambda: list(stream_orders_from_file(filepath)))
+    # one worker and all of them show how much parallel loading gains over its own overhead
+    for loader_workers in dict.fromkeys((1, workers or os.cpu_count() or 1)):
+        run('loader', f'load_orders_parallel_workers_{loader_workers}',
+            lambda: load_orders_parallel(records, loader_workers))
+    run('validator', 'validate_order_data',
+        lambda: sum(map(ServiceDataValidator.validate_order_data, records)))
+
+    service = run('service', 'build', lambda: build_service(filepath))
+    # report that reads only quantity and category of orders, lazy orders don't convert other fields
+    narrow_metrics = ['get_most_popular_category', 'get_clients_num_that_ordered_at_least_n_products_per_transaction']
+    narrow_arguments = {'get_clients_num_that_ordered_at_least_n_products_per_transaction': (1,)}
+    run('report', 'build_narrow_report', lambda: build_report(load_orders(records), narrow_metrics, narrow_arguments))
+    run('report', 'build_narrow_report_lazy',
+        lambda: build_report(load_orders(records, lazy=True), narrow_metrics, narrow_arguments))
+    del records
+    for name, query in get_service_queries(service).items():
+        # cached result of the first call would make the profiled one almost free
+        run('service', name, query, service.result_cache.clear)
+    run('report', 'build_report', lambda: build_report(service.orders, arguments=get_report_arguments()))
+    # the same report with one worker and with all of them shows how partitioned service scales
+    for partitioned_workers in dict.fromkeys((1, workers or os.cpu_count() or 1)):
+        run('partitioned', f'report_workers_{partitioned_workers}',
+            lambda: get_partitioned_report(service.orders, partitioned_workers))
+    os.remove(filepath)
+    return results
+
+
+def get_metadata() -> dict[str, Any]:
+    """ Describes environment of benchmark run, so results from different commits and machines can be told apart """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created_at': datetime.now(tz=timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes: Iterable[int] = DEFAULT_SIZES, config: OrdersGeneratorConfig = OrdersGeneratorConfig(),
+                   workers: int | None = None, profile_memory: bool = True) -> dict[str, Any]:
+    """
+    Runs whole suite for every size
+    :return: json serializable report with 'metadata', 'config' and 'results' keys
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            results.extend(run_size(size, config, workers, profile_memory, directory))
+    config_data = asdict(config)
+    config_data['start_date'] = config.start_date.isoformat()
+    return {'metadata': get_metadata(), 'config': config_data, 'results': [asdict(result) for result in results]}
+
+
+def compare_reports(baseline: dict[str, Any], current: dict[str, Any],
+                    threshold: float = 0.1) -> list[dict[str, Any]]:
+    """
+    Matches results of two reports by group, name and size
+    :param threshold: relative slowdown above which case is marked as regression, 0.1 means 10% slower
+    :return: list of compared cases with ratio of current to baseline time
+    """
+    baseline_results = {(r['group'], r['name'], r['size']): r for r in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        if (base := baseline_results.get((result['group'], result['name'], result['size']))) is None:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        comparison.append({
+            'group': result['group'], 'name': result['name'], 'size': result['size'],
+            'baseline_seconds': base['seconds'], 'seconds': result['seconds'], 'ratio': ratio,
+            'regression': ratio > 1 + threshold
+        })
+    return comparison
+
+
+def save_report(report: dict[str, Any], filepath: str) -> None:
+    with open(filepath, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -1,21 +1,193 @@
-import os
-from dotenv import load_dotenv
-from typing import Final
-
+import argparse
+import json
 import logging
+import sys
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator, NoReturn
+
+from ecomerceapp.common.metrics import METRICS
+from ecomerceapp.ecomerce_service.loader import DEFAULT_CHUNK_SIZE, iter_batches, iter_json_records, stream_orders, \
+    stream_orders_parallel
+from ecomerceapp.ecomerce_service.model import Order
+from ecomerceapp.ecomerce_service.report import METRICS_ARGUMENTS, REPORT_METRICS, TOP_K_METRICS, to_json_value, \
+    validate_metrics
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.settings import AppData
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_peak_rss() -> int | None:
+    """ Peak resident set size of this process in bytes, None on platforms without resource module """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class PhaseTimer:
+    """ Wall time and peak RSS at the end of every phase of batch job """
+    phases: list[dict[str, Any]] = field(default_factory=list)
+
+    def run(self, name: str, function, *args) -> Any:
+        start = time.perf_counter()
+        result = function(*args)
+        self.phases.append({'phase': name, 'seconds': time.perf_counter() - start, 'peak_rss': get_peak_rss()})
+        return result
+
+    def format(self) -> str:
+        lines = [f'{"phase":<10}{"seconds":>12}{"peak RSS MB":>14}']
+        for phase in self.phases:
+            peak_rss = '-' if phase['peak_rss'] is None else f'{phase["peak_rss"] / 2 ** 20:.1f}'
+            lines.append(f'{phase["phase"]:<10}{phase["seconds"]:>12.4f}{peak_rss:>14}')
+        lines.append(f'{"total":<10}{sum(phase["seconds"] for phase in self.phases):>12.4f}')
+        return '\n'.join(lines)
+
+
+def parse_date(value: str) -> datetime:
+    """ Isoformat date for command line arguments, dates without timezone are UTC """
+    date = datetime.fromisoformat(value)
+    return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not positive integer')
+    return number
 
-def main() -> None:
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m ecomerceapp',
+                                     description='Streams orders file through validation into orders service and '
+                                                 'writes chosen metrics as json')
+    parser.add_argument('--input', help='.json, .jsonl or .ndjson orders file, ORDERS_FILE_PATH setting by default')
+    parser.add_argument('--output', default='-', help='json report file, standard output by default')
+    parser.add_argument('--metrics', nargs='+', choices=REPORT_METRICS, metavar='METRIC',
+                        help='metrics to compute, all metrics whose arguments were given by default')
+    parser.add_argument('--k', type=positive_int, help='number of returned elements of top and bottom metrics')
+    parser.add_argument('--n', type=int, help='argument of get_clients_num_that_ordered_at_least_n_products_per_'
+                                              'transaction')
+    parser.add_argument('--start-date', type=parse_date, help='start of date range metrics, isoformat')
+    parser.add_argument('--end-date', type=parse_date, help='end of date range metrics, isoformat')
+    parser.add_argument('--reference-time', type=parse_date, help='"today" of discounts, now by default')
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help='number of processes that validate orders, 1 validates them in this process')
+    parser.add_argument('--chunk-size', type=positive_int, default=DEFAULT_CHUNK_SIZE,
+                        help='number of orders validated and added to service at once')
+    parser.add_argument('--max-memory', type=positive_int, metavar='MB',
+                        help='job stops when peak RSS exceeds this number of megabytes')
+    parser.add_argument('--timing', action='store_true', help='print wall time and peak RSS of every phase to stderr')
+    parser.add_argument('--instrumentation-file',
+                        help='enables instrumentation and writes it to .json file or in Prometheus text format')
+    parser.add_argument('--log-file', default='logs.log')
+    parser.add_argument('--log-level', default='DEBUG', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    return parser
+
+
+def get_metrics_arguments(args: argparse.Namespace) -> tuple[list[str], dict[str, tuple]]:
+    """ Chosen metrics with their arguments, ValueError tells which arguments are missing """
+    arguments = {}
+    if args.k is not None:
+        arguments.update((metric, (args.k,)) for metric in TOP_K_METRICS)
+    if args.n is not None:
+        arguments['get_clients_num_that_ordered_at_least_n_products_per_transaction'] = (args.n,)
+    if (args.start_date is None) != (args.end_date is None):
+        raise ValueError('--start-date and --end-date have to be given together')
+    if args.start_date is not None:
+        arguments.update((metric, (args.start_date, args.end_date)) for metric, names in METRICS_ARGUMENTS.items()
+                         if names == ('start_date', 'end_date'))
+    if args.reference_time is not None:
+        arguments['get_orders_value_after_discounts'] = (args.reference_time,)
+    metrics = args.metrics or [metric for metric in REPORT_METRICS
+                               if metric not in METRICS_ARGUMENTS or metric in arguments]
+    # checked before input is streamed, so missing argument doesn't waste whole load
+    return validate_metrics(metrics, arguments), arguments
+
+
+def stream_input_orders(filepath: str, workers: int, chunk_size: int) -> Iterator[Order]:
+    records = iter_json_records(filepath)
+    if workers == 1:
+        return stream_orders(records)
+    return stream_orders_parallel(records, workers, chunk_size)
+
+
+def load_service(filepath: str, workers: int, chunk_size: int, max_memory: int | None) -> OrdersService:
+    """
+    Adds orders to service chunk by chunk, so whole file is never held in memory next to the service
+    :param max_memory: limit of peak RSS in megabytes, checked after every chunk
+    """
+    logger.info(f'Streaming orders from {filepath}')
+    service = OrdersService([])
+    for chunk in iter_batches(stream_input_orders(filepath, workers, chunk_size), chunk_size):
+        service.add_orders(chunk)
+        if max_memory is not None and (peak_rss := get_peak_rss()) is not None and peak_rss > max_memory * 2 ** 20:
+            raise MemoryError(f'Memory limit of {max_memory} MB was exceeded after {len(service.orders)} orders')
+    return service
+
+
+def write_report(report: dict[str, Any], filepath: str) -> None:
+    # without indent json uses its C encoder, which matters for large summaries of customers
+    content = json.dumps({metric: to_json_value(value) for metric, value in report.items()})
+    if filepath == '-':
+        print(content)
+        return
+    with open(filepath, 'w', encoding='utf-8') as file:
+        file.write(content)
+    logger.info(f'Report was saved to {filepath}')
+
+
+def exit_with_error(parser: argparse.ArgumentParser, message: Any) -> NoReturn:
+    logger.error(message)
+    parser.exit(1, f'{parser.prog}: error: {message}\n')
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = create_parser()
+    args = parser.parse_args(argv)
     logging.basicConfig(
         encoding='utf-8',
         format='%(asctime)s - %(levelname)s - %(message)s',
         datefmt='%m/%d/%Y %I:%M:%S %p',
-        level=logging.DEBUG,
+        level=args.log_level,
         handlers=[
-            logging.FileHandler("logs.log"),
+            logging.FileHandler(args.log_file),
             logging.StreamHandler()
         ]
     )
+    try:
+        metrics, arguments = get_metrics_arguments(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.instrumentation_file:
+        METRICS.enable()
+
+    filepath = args.input or AppData.ORDERS_FILE_PATH
+    timer = PhaseTimer()
+    try:
+        service = timer.run('load', load_service, filepath, args.workers, args.chunk_size, args.max_memory)
+        report = timer.run('report', service.get_report, metrics, arguments)
+    except json.JSONDecodeError as e:
+        exit_with_error(parser, f'{filepath} is not valid json: {e}')
+    except IndexError:
+        # top metrics have no element to return when file had no valid orders
+        exit_with_error(parser, f'No valid orders were loaded from {filepath}, top metrics can not be computed')
+    except (FileNotFoundError, MemoryError, ZeroDivisionError) as e:
+        exit_with_error(parser, e)
+    timer.run('write', write_report, report, args.output)
 
-    load_dotenv()
-    ORDERS_FILE_PATH: Final = os.getenv('ORDERS_FILE_PATH')
+    if args.instrumentation_file:
+        if args.instrumentation_file.endswith('.json'):
+            METRICS.write_json(args.instrumentation_file)
+        else:
+            METRICS.write_prometheus(args.instrumentation_file)
+    if args.timing:
+        print(timer.format(), file=sys.stderr)
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from inspect import signature
+from typing import Any, Callable, Hashable
+
+DEFAULT_CACHE_SIZE = 128
+
+
+@dataclass(frozen=True, slots=True)
+class CacheStats:
+    """ Counters of ResultCache, like functools.lru_cache cache_info() """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+def copy_result(value: Any) -> Any:
+    """
+    Copies dicts, lists and sets of result all the way down, so caller can't change cached value. Other objects are
+    shared, query results hold only immutable ones: frozen models, enums, datetimes, Decimals and numbers
+    """
+    if isinstance(value, dict):
+        return {key: copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_result(item) for item in value]
+    if isinstance(value, set):
+        return {copy_result(item) for item in value}
+    return value
+
+
+class ResultCache:
+    """
+    Bounded cache of query results with least recently used eviction. Every entry remembers version of data it was
+    computed from, entry of older version is a miss and is dropped, so cache is invalidated just by changing version
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """ :param max_size: number of kept results, 0 disables cache """
+        if not isinstance(max_size, int) or max_size < 0:
+            raise ValueError('max_size has to be non negative integer')
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[Hashable, Any]] = OrderedDict()
+        self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        :param key: method and arguments of query, unhashable key bypasses cache
+        :param version: version of data that result is computed from
+        :param compute: called when there is no valid result of key
+        :return: copy of cached or computed result
+        """
+        try:
+            entry = self._entries.get(key)
+        except TypeError:
+            self._misses += 1
+            return compute()
+        if entry is not None and entry[0] == version:
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return copy_result(entry[1])
+        self._misses += 1
+        result = compute()
+        if self.max_size:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return copy_result(result)
+
+    def clear(self) -> None:
+        """ Drops all results, statistics are kept """
+        self._entries.clear()
+
+    def get_stats(self) -> CacheStats:
+        return CacheStats(self._hits, self._misses, self._evictions, len(self._entries), self.max_size)
+
+
+def cached_query(method: Callable) -> Callable:
+    """
+    Caches results of service method in service result_cache under current version of its data. Service has to
+    provide result_cache attribute and get_version method. Arguments are bound to signature of method with defaults
+    applied, so f(2), f(k=2) and, when 2 is default, f() share one result
+    """
+    method_signature = signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = method_signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__, bound.args[1:], tuple(sorted(bound.kwargs.items())))
+        return self.result_cache.get_or_compute(key, self.get_version(), lambda: method(self, *args, **kwargs))
+    return wrapper
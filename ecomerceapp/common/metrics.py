@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Final
+
+# upper bounds of latency buckets in seconds, +Inf bucket is implicit
+DEFAULT_BUCKETS: Final = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+METRICS_HELP: Final = {
+    'ecommerce_calls_total': 'Number of calls of instrumented function',
+    'ecommerce_errors_total': 'Number of calls of instrumented function that raised exception',
+    'ecommerce_call_duration_seconds': 'Latency of instrumented function',
+    'ecommerce_records_total': 'Number of records processed by loader, by status',
+    'ecommerce_rejections_total': 'Number of records rejected by loader, by field and failed rule',
+}
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class Histogram:
+    """ Counts of observations per bucket, like Prometheus histogram, but not cumulative """
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = self.counts or [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self) -> list[tuple[str, int]]:
+        """ (le, count of observations lower or equal to le) pairs, the last one is +Inf """
+        bounds = [*map(_format_number, self.buckets), '+Inf']
+        total, cumulative = 0, []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(labels: Labels, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms of loader, validator and service. Every recording method returns at once when
+    registry is disabled, so disabled instrumentation costs one attribute check per call
+    """
+
+    def __init__(self, enabled: bool = False, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.enabled, self.buckets = enabled, buckets
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """ Drops all recorded values """
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if (histogram := self.histograms.get(key)) is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def get_snapshot(self) -> dict[str, Any]:
+        """ All recorded values as json serializable dict """
+        with self._lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in self.counters.items()],
+                'histograms': [{'name': name, 'labels': dict(labels), 'buckets': list(histogram.buckets),
+                                'counts': list(histogram.counts), 'sum': histogram.sum, 'count': histogram.count}
+                               for (name, labels), histogram in self.histograms.items()],
+            }
+
+    def to_prometheus(self) -> str:
+        """ All recorded values in Prometheus text exposition format """
+        lines, described = [], set()
+
+        def describe(name: str, metric_type: str) -> None:
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {METRICS_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} {metric_type}')
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                describe(name, 'counter')
+                lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                describe(name, 'histogram')
+                for bound, count in histogram.get_cumulative_counts():
+                    lines.append(f'{name}_bucket{_format_labels(labels, (("le", bound),))} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(histogram.sum)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filepath: str) -> None:
+        """ Writes metrics in Prometheus text format, for example for node exporter textfile collector """
+        self._write(filepath, self.to_prometheus())
+
+    def write_json(self, filepath: str) -> None:
+        self._write(filepath, json.dumps(self.get_snapshot(), indent=2))
+
+    @staticmethod
+    def _write(filepath: str, content: str) -> None:
+        # collectors can read file at any moment, so it's replaced at once instead of being written in place
+        temporary_path = f'{filepath}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(temporary_path, filepath)
+
+
+METRICS: Final = MetricsRegistry(enabled=os.getenv('ECOMMERCE_METRICS', '').lower() in ('1', 'true', 'yes'))
+
+
+def instrumented(function: Callable | None = None, *, name: str | None = None,
+                 registry: MetricsRegistry = METRICS) -> Callable:
+    """
+    Records number of calls, number of raised exceptions and latency of function under its qualified name
+    :param function: decorated function, decorator can be used with or without arguments
+    :param name: value of function label, qualified name of function by default
+    :param registry: registry that receives values
+    """
+    def decorator(wrapped: Callable) -> Callable:
+        label = name or wrapped.__qualname__
+
+        @wraps(wrapped)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return wrapped(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return wrapped(*args, **kwargs)
+            except Exception:
+                registry.increment('ecommerce_errors_total', function=label)
+                raise
+            finally:
+                registry.increment('ecommerce_calls_total', function=label)
+                registry.observe('ecommerce_call_duration_seconds', time.perf_counter() - start, function=label)
+        return wrapper
+
+    return decorator if function is None else decorator(function)
+
+
+def instrument_methods(cls: type | None = None, *, registry: MetricsRegistry = METRICS) -> type | Callable:
+    """ Class decorator that instruments every public method defined in class, properties are left as they are """
+    def decorator(decorated: type) -> type:
+        for attribute, value in list(vars(decorated).items()):
+            if attribute.startswith('_'):
+                continue
+            if isinstance(value, (classmethod, staticmethod)):
+                setattr(decorated, attribute, type(value)(instrumented(value.__func__, registry=registry)))
+            elif callable(value) and not isinstance(value, type):
+                setattr(decorated, attribute, instrumented(value, registry=registry))
+        return decorated
+
+    return decorator if cls is None else decorator(cls)
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import total_ordering
+from typing import Any, Final, Self
+
+# rounding of Money.quantize, the same one that default decimal context uses
+ROUNDING: Final = ROUND_HALF_EVEN
+
+
+def get_scale(value: Decimal) -> int:
+    """ Number of digits after decimal point, Decimal('1.50') -> 2, Decimal('15') -> 0 """
+    return max(-value.as_tuple().exponent, 0)
+
+
+def to_minor_units(value: Decimal, scale: int) -> int:
+    """ Converts Decimal to integer number of 10 ** -scale units, value can't have more than scale decimal places """
+    return int(value.scaleb(scale))
+
+
+def to_decimal(units: int, scale: int) -> Decimal:
+    """ Converts fixed-point integer back to Decimal with exactly scale digits after decimal point """
+    return Decimal(units).scaleb(-scale)
+
+
+def rescale(units: int, scale: int, new_scale: int) -> int:
+    """ Fixed-point integer of scale converted to new_scale, which can't be lower than scale """
+    return units if scale == new_scale else units * 10 ** (new_scale - scale)
+
+
+@total_ordering
+@dataclass(frozen=True, slots=True, eq=False)
+class Money:
+    """
+    Exact amount of money as integer number of minor units with explicit scale, Money(1250, 2) is 12.50. Scale works
+    like exponent of Decimal: sum has the largest scale of its terms and product has sum of scales of its factors, so
+    to_decimal returns the same Decimal, digit for digit, as Decimal arithmetic on the same values would. Nothing is
+    rounded, discounted values keep all digits of price times rate, unless quantize is called explicitly
+    """
+    units: int
+    scale: int = 0
+
+    @classmethod
+    def from_decimal(cls, value: Decimal) -> Self:
+        scale = get_scale(value)
+        return cls(to_minor_units(value, scale), scale)
+
+    def to_decimal(self) -> Decimal:
+        return to_decimal(self.units, self.scale)
+
+    def rescale(self, scale: int) -> Self:
+        """ The same amount with scale digits after decimal point, scale can only grow """
+        if scale < self.scale:
+            raise ValueError('scale can not be decreased without rounding, use quantize instead')
+        return Money(rescale(self.units, self.scale, scale), scale)
+
+    def quantize(self, scale: int, rounding: str = ROUNDING) -> Self:
+        """ Amount rounded to scale digits after decimal point, with the same rounding modes as Decimal.quantize """
+        if scale >= self.scale:
+            return self.rescale(scale)
+        units = Decimal(self.units).scaleb(scale - self.scale).to_integral_value(rounding=rounding)
+        return Money(int(units), scale)
+
+    @staticmethod
+    def _coerce(other: Any) -> 'Money | None':
+        # int behaves like Decimal made from it, it's needed for sum() which starts from 0
+        if isinstance(other, Money):
+            return other
+        if isinstance(other, int):
+            return Money(other)
+        return None
+
+    def __add__(self, other: Any) -> Self:
+        if (other := self._coerce(other)) is None:
+            return NotImplemented
+        scale = max(self.scale, other.scale)
+        return Money(rescale(self.units, self.scale, scale) + rescale(other.units, other.scale, scale), scale)
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any) -> Self:
+        if (other := self._coerce(other)) is None:
+            return NotImplemented
+        return self + -other
+
+    def __neg__(self) -> Self:
+        return Money(-self.units, self.scale)
+
+    def __mul__(self, other: Any) -> Self:
+        if (other := self._coerce(other)) is None:
+            return NotImplemented
+        return Money(self.units * other.units, self.scale + other.scale)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other: Any) -> bool:
+        if (other := self._coerce(other)) is None:
+            return NotImplemented
+        scale = max(self.scale, other.scale)
+        return rescale(self.units, self.scale, scale) == rescale(other.units, other.scale, scale)
+
+    def __lt__(self, other: Any) -> bool:
+        if (other := self._coerce(other)) is None:
+            return NotImplemented
+        scale = max(self.scale, other.scale)
+        return rescale(self.units, self.scale, scale) < rescale(other.units, other.scale, scale)
+
+    def __hash__(self) -> int:
+        # equal amounts of different scales and equal ints have to share hash, Decimal hash already guarantees it
+        return hash(self.to_decimal())
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __str__(self) -> str:
+        return str(self.to_decimal())
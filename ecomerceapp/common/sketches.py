@@ -0,0 +1,271 @@
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from hashlib import blake2b
+from math import ceil, e, exp, log, log2
+from operator import add
+from typing import Any, Callable, Final
+
+from ecomerceapp.common.utils import get_top_k
+
+# precision of HyperLogLog is limited, so registers of the most precise one take 256 KiB
+MAX_HLL_PRECISION: Final = 18
+MIN_HLL_PRECISION: Final = 4
+_INVERSE_POWERS: Final = tuple(2.0 ** -rank for rank in range(66))
+# hashes of the most recent keys, popular customers and products are hashed once instead of for every order
+HASH_CACHE_SIZE: Final = 2 ** 16
+
+
+def hash_key(key: str, size: int = 8) -> int:
+    """
+    Hash of key that is the same in every process and on every machine, unlike hash() of str, so sketches built by
+    different workers can be merged
+    :param size: number of bytes of hash
+    """
+    return int.from_bytes(blake2b(key.encode(), digest_size=size).digest(), 'little')
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def _get_cells(key: str, width: int, depth: int) -> tuple[int, ...]:
+    """ Position of counter of key in every row of Count-Min sketch, rows hashes are derived from two halves of hash """
+    hashed = hash_key(key, 16)
+    first, second = hashed >> 64, hashed & 0xFFFF_FFFF_FFFF_FFFF
+    return tuple(row * width + (first + row * second) % width for row in range(depth))
+
+
+def _validate_rate(name: str, value: float) -> None:
+    if not isinstance(value, (int, float)) or not 0 < value < 1:
+        raise ValueError(f'{name} has to be between 0 and 1')
+
+
+def _validate_positive(name: str, value: int) -> None:
+    if not isinstance(value, int) or value < 1:
+        raise ValueError(f'{name} has to be positive integer')
+
+
+@dataclass
+class HyperLogLog:
+    """
+    Estimates number of distinct keys in fixed memory of 2 ** precision bytes. Precision is derived from error, which is
+    relative standard error of estimate, 1.04 / sqrt(2 ** precision). Sketches of the same precision are merged without
+    any loss, merged sketch is the same as the one built from all keys
+    """
+    error: float = 0.01
+    precision: int = field(init=False)
+    registers: bytearray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        _validate_rate('error', self.error)
+        precision = max(ceil(log2((1.04 / self.error) ** 2)), MIN_HLL_PRECISION)
+        if precision > MAX_HLL_PRECISION:
+            raise ValueError(f'error can not be lower than {1.04 / 2 ** (MAX_HLL_PRECISION / 2):.4f}')
+        self.precision = precision
+        self.registers = bytearray(2 ** precision)
+
+    def add(self, key: str) -> None:
+        hashed, bits = hash_key(key), 64 - self.precision
+        index, rest = hashed >> bits, hashed & ((1 << bits) - 1)
+        # position of the first 1 bit, counted from the left of the rest of hash
+        rank = bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        registers = self.registers
+        m = len(registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, registers))
+        # small cardinalities are estimated better by linear counting of empty registers
+        if estimate <= 2.5 * m and (zeros := registers.count(0)):
+            estimate = m * log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        if other.precision != self.precision:
+            raise ValueError('HyperLogLog sketches of different precision can not be merged')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+
+@dataclass
+class CountMinSketch:
+    """
+    Estimates counts of keys in width * depth counters. Estimate is never lower than true count and with probability
+    1 - delta it exceeds it by at most epsilon * total, where total is sum of all counts added. Sketches of the same
+    dimensions are merged by adding counters, which is the same as adding all keys to one sketch
+    """
+    epsilon: float = 0.001
+    delta: float = 0.01
+    width: int = field(init=False)
+    depth: int = field(init=False)
+    total: int = field(default=0, init=False)
+    counters: array = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        _validate_rate('epsilon', self.epsilon)
+        _validate_rate('delta', self.delta)
+        self.width, self.depth = ceil(e / self.epsilon), ceil(log(1 / self.delta))
+        self.counters = array('q', bytes(8 * self.width * self.depth))
+
+    def add(self, key: str, count: int = 1) -> int:
+        """ :return: estimated count of key after adding """
+        counters, cells = self.counters, _get_cells(key, self.width, self.depth)
+        for cell in cells:
+            counters[cell] += count
+        self.total += count
+        return min(map(counters.__getitem__, cells))
+
+    def estimate(self, key: str) -> int:
+        return min(map(self.counters.__getitem__, _get_cells(key, self.width, self.depth)))
+
+    def merge(self, other: 'CountMinSketch') -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Count-Min sketches of different dimensions can not be merged')
+        self.counters = array('q', map(add, self.counters, other.counters))
+        self.total += other.total
+
+
+@dataclass
+class HeavyHitters:
+    """
+    Tracks capacity items with the highest counts estimated by CountMinSketch. Item is identified by key(item), which
+    has to be the same in every process, so repr of items whose repr is stable is used by default. Any item whose count
+    is higher than total / capacity is tracked, and its estimate is off by at most epsilon * total with probability
+    1 - delta. Memory depends only on capacity, epsilon and delta
+    """
+    capacity: int = 100
+    epsilon: float = 0.001
+    delta: float = 0.01
+    key: Callable[[Any], str] = repr
+    sketch: CountMinSketch = field(init=False, repr=False)
+    # key of item -> [item, estimated count], in order of first appearance
+    candidates: dict[str, list] = field(default_factory=dict, init=False, repr=False)
+    # lower bound of the smallest estimate of candidates, estimates only grow, so it's recomputed lazily
+    _threshold: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        _validate_positive('capacity', self.capacity)
+        self.sketch = CountMinSketch(self.epsilon, self.delta)
+
+    def add(self, item: Any, count: int = 1) -> None:
+        key = self.key(item)
+        estimate = self.sketch.add(key, count)
+        candidates = self.candidates
+        if (candidate := candidates.get(key)) is not None:
+            candidate[1] = estimate
+        elif len(candidates) < self.capacity:
+            candidates[key] = [item, estimate]
+        elif estimate > self._threshold:
+            weakest = min(candidates, key=lambda candidate_key: candidates[candidate_key][1])
+            self._threshold = candidates[weakest][1]
+            if estimate > self._threshold:
+                del candidates[weakest]
+                candidates[key] = [item, estimate]
+                self._threshold = min(candidate[1] for candidate in candidates.values())
+
+    def get_counts(self) -> dict[Any, int]:
+        """ :return: tracked items with their current estimates, in order of first appearance """
+        return {item: self.sketch.estimate(key) for key, (item, _) in self.candidates.items()}
+
+    def get_top(self, k: int | None = None) -> list[Any]:
+        """
+        :param k: number of items, items tied with k-th one are included. None means only items with top estimate
+        :return: items with the highest estimated counts, ties in order of first appearance
+        """
+        if not self.candidates:
+            return []
+        return get_top_k(self.get_counts().items(), 1 if k is None else k)
+
+    def merge(self, other: 'HeavyHitters') -> None:
+        """ Candidates of both trackers are estimated again with merged sketch and capacity strongest of them stay """
+        if other.capacity != self.capacity:
+            raise ValueError('HeavyHitters of different capacity can not be merged')
+        self.sketch.merge(other.sketch)
+        candidates = {**self.candidates, **other.candidates}
+        for candidate_key, candidate in candidates.items():
+            candidates[candidate_key] = [candidate[0], self.sketch.estimate(candidate_key)]
+        strongest = sorted(candidates, key=lambda candidate_key: candidates[candidate_key][1], reverse=True)
+        self.candidates = {candidate_key: candidates[candidate_key] for candidate_key in strongest[:self.capacity]}
+        self._threshold = min((candidate[1] for candidate in self.candidates.values()), default=0)
+
+
+@dataclass
+class QuantileSketch:
+    """
+    Estimates quantiles of non-negative values with relative error, every estimate is within error * true value of
+    value of the requested rank. Values are counted in buckets of logarithmically growing width, so at most
+    max_buckets counters are kept no matter how many values are added. When there are more buckets, the lowest ones
+    are collapsed, which loses accuracy of the lowest quantiles first. Sketches with the same error are merged by
+    adding counts of buckets
+    """
+    error: float = 0.01
+    max_buckets: int = 2048
+    count: int = field(default=0, init=False)
+    zeros: int = field(default=0, init=False)
+    buckets: dict[int, int] = field(default_factory=dict, init=False, repr=False)
+    minimum: float | None = field(default=None, init=False)
+    maximum: float | None = field(default=None, init=False)
+    _log_gamma: float = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        _validate_rate('error', self.error)
+        _validate_positive('max_buckets', self.max_buckets)
+        self._log_gamma = log((1 + self.error) / (1 - self.error))
+
+    def add(self, value: float) -> None:
+        if value < 0:
+            raise ValueError('QuantileSketch accepts only non-negative values')
+        self.count += 1
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        if value == 0:
+            self.zeros += 1
+            return
+        index = ceil(log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        """ Moves counts of the lowest buckets to the lowest one that stays """
+        indices = sorted(self.buckets)
+        excess = len(indices) - self.max_buckets
+        if excess > 0:
+            self.buckets[indices[excess]] += sum(self.buckets.pop(index) for index in indices[:excess])
+
+    def get_quantile(self, q: float) -> float | None:
+        """
+        :param q: quantile between 0 and 1, 0.5 is median
+        :return: estimated value of the q quantile, None when no values were added
+        """
+        if not isinstance(q, (int, float)) or not 0 <= q <= 1:
+            raise ValueError('q has to be between 0 and 1')
+        if self.count == 0:
+            return None
+        # the extremes are known exactly
+        if q in (0, 1):
+            return float(self.minimum if q == 0 else self.maximum)
+        rank, seen = q * (self.count - 1), self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                break
+        # bucket covers values from gamma ** (index - 1) to gamma ** index, its middle is within error of both ends
+        gamma = exp(self._log_gamma)
+        return min(max(2 * gamma ** index / (gamma + 1), self.minimum), self.maximum)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        if other.error != self.error:
+            raise ValueError('QuantileSketch sketches of different error can not be merged')
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.zeros += other.zeros
+        for bound in (other.minimum, other.maximum):
+            if bound is not None:
+                self.minimum = bound if self.minimum is None else min(self.minimum, bound)
+                self.maximum = bound if self.maximum is None else max(self.maximum, bound)
+        self._collapse()
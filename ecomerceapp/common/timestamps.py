@@ -0,0 +1,66 @@
+import re
+
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Final, NamedTuple
+
+
+EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ISOFORMAT_PATTERN: Final = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2}$')
+# exports stamp many orders with the same second, so distinct timestamps of one load easily fit in memo
+TIMESTAMPS_CACHE_SIZE: Final = 65_536
+
+
+class TimestampKeys(NamedTuple):
+    """ Keys that orders are grouped by, computed once per distinct timestamp """
+    epoch: int
+    month: int
+
+
+def to_epoch_microseconds(date: datetime) -> int:
+    """ Exact number of microseconds between unix epoch and aware datetime """
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+
+def get_utc_offset_microseconds(date: datetime) -> int:
+    """ Offset of aware datetime from UTC in microseconds """
+    return date.utcoffset() // timedelta(microseconds=1)
+
+
+def from_epoch_microseconds(epoch: int, offset: int = 0) -> datetime:
+    """ Inverse of to_epoch_microseconds, offset in microseconds sets timezone of returned datetime """
+    return (EPOCH + timedelta(microseconds=epoch + offset)).replace(tzinfo=timezone(timedelta(microseconds=offset)))
+
+
+@lru_cache(maxsize=TIMESTAMPS_CACHE_SIZE)
+def is_isoformat_timestamp(expression: str) -> bool:
+    """ Memoized check of ISOFORMAT_PATTERN, expression has to be str """
+    return ISOFORMAT_PATTERN.match(expression) is not None
+
+
+@lru_cache(maxsize=TIMESTAMPS_CACHE_SIZE)
+def parse_timestamp(expression: str) -> datetime:
+    """
+    Memoized datetime.fromisoformat. Repeated timestamps share one datetime instance, which computes its hash only
+    once, so counting orders by date doesn't hash the same aware datetime again for every order
+    """
+    return datetime.fromisoformat(expression)
+
+
+@lru_cache(maxsize=TIMESTAMPS_CACHE_SIZE)
+def _get_timestamp_keys(date: datetime, _: tzinfo | None) -> TimestampKeys:
+    return TimestampKeys(to_epoch_microseconds(date), date.month)
+
+
+def get_timestamp_keys(date: datetime) -> TimestampKeys:
+    """
+    Memoized epoch and month of aware datetime. Equal instants in different timezones fall into different local
+    months, so timezone is part of memo key
+    """
+    return _get_timestamp_keys(date, date.tzinfo)
+
+
+def clear_timestamps_cache() -> None:
+    """ Drops all memoized timestamps """
+    for function in (is_isoformat_timestamp, parse_timestamp, _get_timestamp_keys):
+        function.cache_clear()
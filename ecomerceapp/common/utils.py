@@ -1,4 +1,5 @@
-from typing import Any
+from heapq import heappush, heappushpop
+from typing import Any, Iterable
 
 def get_n_top_elements_of_most_common_list(elements: list[tuple[Any, Any]]) -> int:
     """
@@ -16,3 +17,124 @@ def get_n_top_elements_of_most_common_list(elements: list[tuple[Any, Any]]) -> i
         else:
             return n
     return n
+
+
+def _select_k(items: Iterable[tuple[Any, Any]], k: int, bottom: bool) -> list[Any]:
+    """
+    Keeps k best items on heap whose root is the weakest of them. Items tied with the root that didn't fit on heap are
+    kept aside and dropped as soon as root gets stronger, so ties with k-th item are never lost. Values of bottom
+    selection are negated, so they have to support unary minus
+    """
+    if not isinstance(k, int) or k < 1:
+        raise ValueError('k has to be positive integer')
+    heap, ties = [], []
+    for index, (key, value) in enumerate(items):
+        entry = (-value if bottom else value, index, key)
+        if len(heap) < k:
+            heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            dropped = heappushpop(heap, entry)
+            if dropped[0] == heap[0][0]:
+                ties.append(dropped)
+            else:
+                ties = []
+        elif entry[0] == heap[0][0]:
+            ties.append(entry)
+    if not heap:
+        raise IndexError("List is empty therefor index will be invalid")
+    heap.extend(ties)
+    heap.sort(key=lambda e: (-e[0], -e[1] if bottom else e[1]))
+    return [key for _, _, key in heap]
+
+
+def get_top_k(items: Iterable[tuple[Any, Any]], k: int) -> list[Any]:
+    """
+    Selects keys with k highest values in O(n log k), without sorting all items
+    :param items: (key, value) pairs, for example Counter.items()
+    :param k: number of keys to return, keys tied with k-th one are returned as well
+    :return: keys from the highest value, ties in order of appearance in items like Counter.most_common() does
+    """
+    return _select_k(items, k, bottom=False)
+
+
+def get_bottom_k(items: Iterable[tuple[Any, Any]], k: int) -> list[Any]:
+    """
+    Selects keys with k lowest values in O(n log k), without sorting all items
+    :param items: (key, value) pairs with numeric values, for example Counter.items()
+    :param k: number of keys to return, keys tied with k-th one are returned as well
+    :return: keys from the lowest value, ties in reversed order of appearance like reversed Counter.most_common()
+    """
+    return _select_k(items, k, bottom=True)
+
+
+class TieCounter:
+    """
+    Counter that keeps keys grouped by their current value, so keys with the highest and the lowest value are known
+    without sorting. Ties are returned in order of first appearance of the key, like Counter.most_common() does
+    """
+
+    def __init__(self) -> None:
+        self.counts: dict[Any, Any] = {}
+        self._first_seen: dict[Any, int] = {}
+        self._buckets: dict[Any, dict[Any, None]] = {}
+        self._max = self._min = None
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, key: Any, amount: Any = 1) -> None:
+        """ Adds amount to value of key, new keys start from 0 """
+        if key in self.counts:
+            old_value = self.counts[key]
+            if amount == 0:
+                return
+            bucket = self._buckets[old_value]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[old_value]
+        else:
+            old_value = 0
+            self._first_seen[key] = len(self._first_seen)
+        self.counts[key] = value = old_value + amount
+        self._buckets.setdefault(value, {})[key] = None
+
+        if self._max is None or value > self._max:
+            self._max = value
+        elif self._max not in self._buckets:
+            self._max = max(self._buckets)
+        if self._min is None or value < self._min:
+            self._min = value
+        elif self._min not in self._buckets:
+            self._min = min(self._buckets)
+
+    def multiply(self, factor: int) -> None:
+        """
+        Multiplies every value by positive factor, for example when fixed-point values get more decimal places. Order
+        of values and ties between keys stay the same
+        """
+        self.counts = {key: value * factor for key, value in self.counts.items()}
+        self._buckets = {value * factor: keys for value, keys in self._buckets.items()}
+        if self._max is not None:
+            self._max, self._min = self._max * factor, self._min * factor
+
+    def get_top(self, k: int | None = None) -> list[Any]:
+        """
+        :param k: number of keys to return with keys tied with k-th one, None means only keys with the highest value
+        :return: keys from the highest value, ties in order of first appearance
+        """
+        if k is not None:
+            return get_top_k(self.counts.items(), k)
+        if not self.counts:
+            raise IndexError("List is empty therefor index will be invalid")
+        return sorted(self._buckets[self._max], key=self._first_seen.__getitem__)
+
+    def get_bottom(self, k: int | None = None) -> list[Any]:
+        """
+        :param k: number of keys to return with keys tied with k-th one, None means only keys with the lowest value
+        :return: keys from the lowest value, ties in reversed order of first appearance, like reversed most_common()
+        """
+        if k is not None:
+            return get_bottom_k(self.counts.items(), k)
+        if not self.counts:
+            raise IndexError("List is empty therefor index will be invalid")
+        return sorted(self._buckets[self._min], key=self._first_seen.__getitem__, reverse=True)
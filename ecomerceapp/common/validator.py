@@ -1,13 +1,26 @@
 import enum
 import re
 
+from dataclasses import dataclass, field
 from decimal import Decimal
 from enum import Enum
+from functools import cache
 
-from typing import Any, Callable
+from typing import Any, Callable, Final
+
+from ecomerceapp.common.timestamps import ISOFORMAT_PATTERN, is_isoformat_timestamp
+
+
+DECIMAL_PATTERN: Final = re.compile(r'^\d+\.?\d*$')
 
 
 # ENUM
+@cache
+def get_enum_names(enum_: Enum) -> frozenset[str]:
+    """ Names of all enum elements, computed once per enum """
+    return frozenset(element.name for element in enum_)
+
+
 def is_enum_name(enum_: Enum, name: str) -> bool:
     """
     :param enum_: enum object that will be checked
@@ -18,7 +31,7 @@ def is_enum_name(enum_: Enum, name: str) -> bool:
         raise TypeError("Object is not an Enum")
     if not isinstance(name, str):
         raise TypeError("Name is not a string")
-    return name in [element.name for element in enum_]
+    return name in get_enum_names(enum_)
 
 # NUMERIC VALUES
 def is_unstandardized_decimal_grater_or_equal_to(compare_value: Decimal, value: str) -> bool:
@@ -32,7 +45,7 @@ def is_unstandardized_decimal_grater_or_equal_to(compare_value: Decimal, value:
         raise TypeError('Compare value has invalid type')
     if not isinstance(value, str):
         raise TypeError('Value argument has invalid type')
-    if not matches_regex(r'^\d+\.?\d*$', value):
+    if not matches_regex(DECIMAL_PATTERN, value):
         raise ValueError('Value argument has invalid formatting')
 
     return Decimal(value) >= compare_value
@@ -46,9 +59,9 @@ def is_integer_grater_equal_to(compare_value: int, value: int) -> bool:
     return value >= compare_value
 
 # STRING VALUES
-def matches_regex(regex: str, expression: str) -> bool:
+def matches_regex(regex: str | re.Pattern, expression: str) -> bool:
     """
-    :param regex: valid r-string that determine desired pattern
+    :param regex: valid r-string that determine desired pattern or already compiled pattern
     :param expression: valid str expression
     :return: if expression matches regex
     """
@@ -67,7 +80,7 @@ def is_default_isoformat(expression: str) -> bool:
     """
     if not isinstance(expression, str):
         raise TypeError('Expression should be string')
-    return True if re.match(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2}$', expression) else False
+    return is_isoformat_timestamp(expression)
 
 # DICT
 def are_keys_in_dict(data_keys: set, data: dict[str, Any]) -> bool:
@@ -82,3 +95,53 @@ def validate_dict_structure(validator_and_params_in_order: tuple[tuple[Callable[
     :return: if all validations are successful
     """
     return all([validator(*params) for validator, params in validator_and_params_in_order])
+
+
+# VALIDATION PLAN
+Rule = tuple[str, Callable[[Any], bool]]
+
+
+@dataclass(frozen=True)
+class Rejection:
+    """ Describes why data didn't pass validation. field is dotted path to value (empty for whole dict), rule is name
+        of first rule that failed """
+    field: str
+    rule: str
+
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    """
+    Validation plan is compiled once and then reused for every validated dict. For every expected key it holds either
+    nested plan (value has to be a dict) or tuple of (rule name, predicate) pairs that are checked in order.
+    Data goes through plan in one pass and first failed rule is returned as a Rejection
+    """
+    fields: tuple[tuple[str, 'ValidationPlan | tuple[Rule, ...]'], ...]
+    keys: frozenset[str] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'keys', frozenset(key for key, _ in self.fields))
+
+    def check(self, data: dict[str, Any], path: str = '') -> Rejection | None:
+        """
+        :param data: dict that is validated, non dict objects raise AttributeError like are_keys_in_dict does
+        :param path: path of data in parent dict, used as prefix of rejected field
+        :return: None if data is valid, otherwise Rejection of first failed rule
+        """
+        if data.keys() != self.keys:
+            return Rejection(path, 'keys')
+        for key, rules in self.fields:
+            value, field_path = data[key], f'{path}.{key}' if path else key
+            if isinstance(rules, ValidationPlan):
+                if not isinstance(value, dict):
+                    return Rejection(field_path, 'type')
+                if rejection := rules.check(value, field_path):
+                    return rejection
+                continue
+            for rule, predicate in rules:
+                if not predicate(value):
+                    return Rejection(field_path, rule)
+        return None
+
+    def is_valid(self, data: dict[str, Any]) -> bool:
+        return self.check(data) is None
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Final, Iterable, Self
+
+from ecomerceapp.common.utils import TieCounter, get_top_k
+from ecomerceapp.ecomerce_service.customer_index import CustomerIndex
+from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer
+
+
+AGGREGATE_PARTS: Final = ('categories', 'dates', 'carts', 'months', 'most_expensive_products', 'customers_orders',
+                          'customers_quantities')
+# parts answered by one CustomerIndex, which is updated once per order no matter how many of them are chosen
+CUSTOMER_PARTS: Final = ('carts', 'customers_orders', 'customers_quantities')
+
+
+def _get_updater_name(part: str) -> str:
+    return 'customers' if part in CUSTOMER_PARTS else part
+
+
+@dataclass
+class OrdersAggregates:
+    """
+    Running counters and sums of orders pool. Every order updates them once when it's added, so OrdersService queries
+    are answered from already grouped data, in time proportional to size of their result instead of number of orders.
+    parts limits which of AGGREGATE_PARTS are maintained, None means all of them. Parts can also be brought up to date
+    separately with sync, then every part reads fields of orders only when it's needed for the first time
+    """
+    parts: tuple[str, ...] | None = None
+    orders_count: int = 0
+    categories: TieCounter = field(default_factory=TieCounter)
+    dates: TieCounter = field(default_factory=TieCounter)
+    customers: CustomerIndex = field(init=False)
+    months_quantities: dict[int, int] = field(default_factory=dict)
+    months_categories: dict[int, TieCounter] = field(default_factory=lambda: defaultdict(TieCounter))
+    most_expensive_products: dict[Category, list[Product]] = field(default_factory=dict)
+    # distinct products of every category with their prices
+    categories_products: dict[Category, dict[Product, Decimal]] = field(default_factory=lambda: defaultdict(dict))
+    # name of updater -> function that adds order to parts it maintains
+    _updaters: dict[str, Callable[[Order], None]] = field(init=False, repr=False)
+    # name of updater -> number of orders it has added, they differ only when parts were synced separately
+    _counts: dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if unknown_parts := set(self.parts or ()) - set(AGGREGATE_PARTS):
+            raise ValueError(f'Unknown aggregate parts: {", ".join(sorted(unknown_parts))}')
+        parts = self.parts or AGGREGATE_PARTS
+        # positions, products and quantities of orders are needed only by summary of customers orders
+        self.customers = CustomerIndex(keep_orders='customers_orders' in parts)
+        self._updaters = {name: getattr(self, f'_add_{name}') for name in map(_get_updater_name, parts)}
+        self._counts = dict.fromkeys(self._updaters, 0)
+
+    def __len__(self) -> int:
+        return self.orders_count
+
+    def clear(self) -> None:
+        self.__init__(self.parts)
+
+    def add(self, order: Order) -> None:
+        self.orders_count += 1
+        for name, update in self._updaters.items():
+            update(order)
+            self._counts[name] += 1
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            self.add(order)
+
+    def sync(self, orders: list[Order], parts: Iterable[str] | None = None) -> Self:
+        """
+        Adds orders that chosen parts haven't seen yet, other parts are left behind until they are synced
+        :param orders: list that every order added so far came from, aggregates are cleared when it got shorter
+        :param parts: parts of AGGREGATE_PARTS, None means all maintained parts
+        :return: the same aggregates
+        """
+        if parts is not None and (missing_parts := set(parts) - set(self.parts or AGGREGATE_PARTS)):
+            raise ValueError(f'Aggregate parts are not maintained: {", ".join(sorted(missing_parts))}')
+        if max(self._counts.values(), default=0) > len(orders):
+            self.clear()
+        for name in self._updaters if parts is None else dict.fromkeys(map(_get_updater_name, parts)):
+            count = self._counts[name]
+            if name == 'customers':
+                # customer index needs position of every order in pool
+                self.customers.extend(orders[count:], count)
+            else:
+                update = self._updaters[name]
+                for order in orders[count:]:
+                    update(order)
+            self._counts[name] = len(orders)
+        self.orders_count = min(self._counts.values(), default=len(orders))
+        return self
+
+    def _add_categories(self, order: Order) -> None:
+        self.categories.add(order.product.category)
+
+    def _add_dates(self, order: Order) -> None:
+        self.dates.add(order.order_date)
+
+    def _add_customers(self, order: Order) -> None:
+        self.customers.add(order, self.orders_count - 1)
+
+    def _add_months(self, order: Order) -> None:
+        month = order.order_date.month
+        self.months_quantities[month] = self.months_quantities.get(month, 0) + order.quantity
+        self.months_categories[month].add(order.product.category)
+
+    def _add_most_expensive_products(self, order: Order) -> None:
+        product = order.product
+        self.categories_products[product.category][product] = product.price
+        products = self.most_expensive_products.get(product.category)
+        if products is None or product.price > products[0].price:
+            self.most_expensive_products[product.category] = [product]
+        elif product.price == products[0].price:
+            products.append(product)
+
+    def get_most_expensive_products_per_category(self, k: int | None = None) -> dict[Category, list[Product]]:
+        """
+        :param k: number of distinct products per category, with products tied with k-th one. None means products with
+                  top price, listed once per order like full rescan does
+        """
+        if k is not None:
+            return {category: get_top_k(products.items(), k) for category, products in self.categories_products.items()}
+        return {category: list(products) for category, products in self.most_expensive_products.items()}
+
+    def get_customers_orders_summary(self) -> dict[Customer, list[dict[str, Any]]]:
+        return self.customers.get_customers_orders_summary()
+
+    def get_date_with_most_orders_made(self, k: int | None = None) -> list[datetime]:
+        return self.dates.get_top(k)
+
+    def get_date_with_least_orders_made(self, k: int | None = None) -> list[datetime]:
+        return self.dates.get_bottom(k)
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
+        return self.customers.get_client_with_most_valuable_cart(k)
+
+    def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
+        return self.customers.get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    def get_most_popular_category(self, k: int | None = None) -> list[Category]:
+        return self.categories.get_top(k)
+
+    def get_months_with_quantity_of_ordered_products(self) -> dict[int, int]:
+        return dict(sorted(self.months_quantities.items(), key=lambda m_q: m_q[1], reverse=True))
+
+    def get_most_popular_categories_for_months_that_orders_occurred(self) -> dict[int, list[Category]]:
+        return {month: categories.get_top() for month, categories in self.months_categories.items()}
+
@@ -0,0 +1,156 @@
+import logging
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Iterable, Self
+
+from ecomerceapp.common.metrics import instrument_methods
+from ecomerceapp.common.money import to_decimal
+from ecomerceapp.common.sketches import HeavyHitters, HyperLogLog, QuantileSketch
+from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_customer_key(customer: Customer) -> str:
+    return f'{customer.name}\x1f{customer.surname}\x1f{customer.age}\x1f{customer.email}'
+
+
+def get_product_key(product: Product) -> str:
+    # equal prices with different number of decimal places belong to equal products, so they need the same key
+    return f'{product.name}\x1f{product.price.normalize()}\x1f{product.category.name}'
+
+
+def get_category_key(category: Category) -> str:
+    return category.name
+
+
+@dataclass(frozen=True)
+class SketchConfig:
+    """
+    Error bounds of ApproximateOrdersService, they decide its memory, which doesn't grow with number of orders.
+    Services can be merged only when they were built with equal configs
+    """
+    # relative standard error of number of distinct customers
+    distinct_error: float = 0.01
+    # estimated counts of top customers, products and categories exceed true ones by at most
+    # frequency_epsilon * total with probability 1 - frequency_delta
+    frequency_epsilon: float = 0.001
+    frequency_delta: float = 0.01
+    # number of customers and products tracked as candidates for top ones
+    heavy_hitters: int = 100
+    # relative error of order value quantiles
+    quantile_error: float = 0.01
+    quantile_buckets: int = 2048
+    # digits after decimal point that cart values are counted with
+    value_scale: int = 2
+
+
+@instrument_methods
+@dataclass
+class ApproximateOrdersService:
+    """
+    Approximate counterpart of OrdersService for streams too large to keep. Orders are not stored, every order only
+    updates sketches whose size is fixed by config: HyperLogLog of customers, Count-Min sketches with heavy hitters of
+    customers by cart value, of products by ordered quantity and of categories by number of orders, and quantile sketch
+    of order values. Services built by different workers or from different shards of data are combined with merge
+    """
+    config: SketchConfig = field(default_factory=SketchConfig)
+    orders_count: int = field(default=0, init=False)
+    customers: HyperLogLog = field(init=False, repr=False)
+    carts: HeavyHitters = field(init=False, repr=False)
+    products: HeavyHitters = field(init=False, repr=False)
+    categories: HeavyHitters = field(init=False, repr=False)
+    values: QuantileSketch = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        config = self.config
+        if not isinstance(config.value_scale, int) or config.value_scale < 0:
+            raise ValueError('value_scale has to be non-negative integer')
+        frequency = config.frequency_epsilon, config.frequency_delta
+        self.customers = HyperLogLog(config.distinct_error)
+        self.carts = HeavyHitters(config.heavy_hitters, *frequency, key=get_customer_key)
+        self.products = HeavyHitters(config.heavy_hitters, *frequency, key=get_product_key)
+        # there are only few categories, all of them fit
+        self.categories = HeavyHitters(len(Category), *frequency, key=get_category_key)
+        self.values = QuantileSketch(config.quantile_error, config.quantile_buckets)
+        logger.info("Approximate orders service was initialized successfully")
+
+    def __len__(self) -> int:
+        return self.orders_count
+
+    def add_order(self, order: Order) -> None:
+        customer_key = get_customer_key(order.customer)
+        value = order.get_total_money().quantize(self.config.value_scale)
+        self.customers.add(customer_key)
+        self.carts.add(order.customer, value.units)
+        self.products.add(order.product, order.quantity)
+        self.categories.add(order.product.category)
+        self.values.add(value.units)
+        self.orders_count += 1
+
+    def add_order_from_dict(self, order_data: dict[str, Any]) -> None:
+        """ Ads single order from unstandardized data dict, without interning, which would keep every customer """
+        self.add_order(Order.from_dict(order_data))
+
+    def add_orders(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            self.add_order(order)
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Order], config: SketchConfig = SketchConfig()) -> Self:
+        service = cls(config)
+        service.add_orders(orders)
+        return service
+
+    def merge(self, other: 'ApproximateOrdersService') -> None:
+        """ Adds sketches of other service, which has to be built with equal config, to sketches of this one """
+        if other.config != self.config:
+            raise ValueError('Services with different sketch configs can not be merged')
+        for sketch in ('customers', 'carts', 'products', 'categories', 'values'):
+            getattr(self, sketch).merge(getattr(other, sketch))
+        self.orders_count += other.orders_count
+
+    @classmethod
+    def from_services(cls, services: list['ApproximateOrdersService']) -> Self:
+        """ Merges services built by workers or from shards into new service with config of the first of them """
+        if not services:
+            raise ValueError('At least one service is needed to merge')
+        merged = cls(services[0].config)
+        for service in services:
+            merged.merge(service)
+        return merged
+
+    def get_distinct_customers_count(self) -> int:
+        """ Estimated number of distinct customers that made orders """
+        return self.customers.count()
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
+        """
+        Approximate OrdersService.get_client_with_most_valuable_cart, customers are ranked by estimated cart values
+        :param k: number of clients, clients tied with k-th one are included. None means only clients with top value
+        """
+        return self.carts.get_top(k)
+
+    def get_most_popular_products(self, k: int | None = None) -> list[Product]:
+        """
+        :param k: number of products, products tied with k-th one are included. None means only the most popular
+        :return: products with the highest estimated sum of ordered quantities
+        """
+        return self.products.get_top(k)
+
+    def get_most_popular_category(self, k: int | None = None) -> list[Category]:
+        """
+        Approximate OrdersService.get_most_popular_category, categories are ranked by estimated number of orders
+        :param k: number of categories, categories tied with k-th one are included. None means only the most popular
+        """
+        return self.categories.get_top(k)
+
+    def get_order_value_quantile(self, q: float) -> Decimal | None:
+        """
+        :param q: quantile between 0 and 1, 0.5 is median order value
+        :return: estimated value of the q quantile of order values with value_scale decimal places, None without orders
+        """
+        value = self.values.get_quantile(q)
+        return None if value is None else to_decimal(round(value), self.config.value_scale)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from ecomerceapp.common.validator import Rejection
+from ecomerceapp.ecomerce_service.loader import DEFAULT_CHUNK_SIZE, iter_json_records, iter_batches, \
+    encode_orders_chunk, log_loading_summary
+from ecomerceapp.ecomerce_service.model import Interner
+from ecomerceapp.ecomerce_service.service import OrdersService
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 8
+
+
+@dataclass
+class FileLoadingSummary:
+    """ Numbers of loaded and all records of one file, with reasons of rejections """
+    filepath: str
+    loaded: int = 0
+    total: int = 0
+    rejections: Counter[Rejection] = field(default_factory=Counter)
+
+
+async def _produce_file_chunks(filepath: str, queue: asyncio.Queue, executor: Executor, chunk_size: int,
+                               files_semaphore: asyncio.Semaphore) -> FileLoadingSummary:
+    """
+    Reads one file chunk by chunk in thread, validates and encodes every chunk in executor and puts decoded orders on
+    queue. Put waits while queue is full, so reading stops until service catches up
+    """
+    summary, interner = FileLoadingSummary(filepath), Interner()
+    loop = asyncio.get_running_loop()
+    async with files_semaphore:
+        logger.info(f'Streaming orders from {filepath}')
+        chunks = iter_batches(iter_json_records(filepath), chunk_size)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            encoded, rejections = await loop.run_in_executor(executor, encode_orders_chunk, chunk)
+            orders = encoded.decode(interner)
+            summary.loaded += len(orders)
+            summary.total += len(chunk)
+            summary.rejections.update(rejections)
+            await queue.put(orders)
+    logger.info(f'File {filepath} was successfully loaded')
+    log_loading_summary(summary.loaded, summary.total, summary.rejections)
+    return summary
+
+
+async def _consume_chunks(service: OrdersService, queue: asyncio.Queue) -> None:
+    """ Adds chunks of orders to service until None is received """
+    while (orders := await queue.get()) is not None:
+        service.add_orders(orders)
+
+
+async def ingest_files(service: OrdersService, filepaths: Iterable[str], workers: int | None = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, queue_size: int = DEFAULT_QUEUE_SIZE,
+                       executor: Executor | None = None) -> list[FileLoadingSummary]:
+    """
+    Loads orders from many json or json lines files at once into service. At most workers files are read at the same
+    time, and at most queue_size chunks of loaded orders wait for service, so memory doesn't depend on number or size
+    of files. Orders of one file are added in file order, orders of different files are interleaved
+    :param service: OrdersService that receives orders
+    :param filepaths: paths to .json, .jsonl or .ndjson files
+    :param workers: number of files read at once and size of default executor, os.cpu_count() by default
+    :param chunk_size: number of records validated at once
+    :param queue_size: number of loaded chunks that can wait for service
+    :param executor: executor that validates chunks, for example ProcessPoolExecutor. Thread pool with workers threads
+                     is created and shut down when it's not provided
+    :return: summary of every file in order of filepaths
+    """
+    workers = workers or os.cpu_count() or 1
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError('workers has to be positive integer')
+    if not isinstance(queue_size, int) or queue_size < 1:
+        raise ValueError('queue_size has to be positive integer')
+
+    own_executor = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=workers)
+    queue, files_semaphore = asyncio.Queue(maxsize=queue_size), asyncio.Semaphore(workers)
+    consumer = asyncio.create_task(_consume_chunks(service, queue))
+    producers = [asyncio.create_task(_produce_file_chunks(filepath, queue, executor, chunk_size, files_semaphore))
+                 for filepath in filepaths]
+    producing = asyncio.gather(*producers)
+    try:
+        # consumer finishes before producers only when service raised, producers would wait on full queue forever
+        await asyncio.wait((producing, consumer), return_when=asyncio.FIRST_COMPLETED)
+        if consumer.done():
+            consumer.result()
+        summaries = await producing
+        await queue.put(None)
+        await consumer
+    finally:
+        # gather that already failed doesn't cancel its other tasks, so every task is cancelled and awaited on its own
+        tasks = [producing, *producers, consumer]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+    return summaries
+
+
+def load_files_into_service(service: OrdersService, filepaths: Iterable[str], workers: int | None = None,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            queue_size: int = DEFAULT_QUEUE_SIZE) -> list[FileLoadingSummary]:
+    """ Blocking entry point to ingest_files for code that doesn't run event loop """
+    return asyncio.run(ingest_files(service, filepaths, workers, chunk_size, queue_size))
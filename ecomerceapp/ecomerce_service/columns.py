@@ -0,0 +1,185 @@
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from itertools import compress, repeat
+from operator import eq, le, ge, and_, mul
+from typing import Any, Iterable, Self
+
+from ecomerceapp.common.money import Money, rescale, to_decimal
+from ecomerceapp.common.timestamps import to_epoch_microseconds, get_timestamp_keys
+from ecomerceapp.common.utils import get_top_k, get_bottom_k
+from ecomerceapp.ecomerce_service.discount import get_default_discount_engine
+from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer
+
+
+CATEGORIES: tuple[Category, ...] = tuple(Category)
+_CATEGORY_CODES: dict[Category, int] = {category: code for code, category in enumerate(CATEGORIES)}
+
+
+@dataclass
+class OrdersColumns:
+    """
+    Columnar representation of orders pool. Every order is split into typed arrays, customers and products are stored
+    once and referenced by id. Prices are kept as fixed-point integers with price_scale digits after decimal point.
+    Queries mirror OrdersService ones, but are computed on arrays with C-level builtins instead of Order objects.
+    """
+    quantities: array = field(default_factory=lambda: array('q'))
+    prices: array = field(default_factory=lambda: array('q'))
+    order_dates: array = field(default_factory=lambda: array('q'))
+    months: array = field(default_factory=lambda: array('b'))
+    category_codes: array = field(default_factory=lambda: array('b'))
+    customer_ids: array = field(default_factory=lambda: array('q'))
+    product_ids: array = field(default_factory=lambda: array('q'))
+    customers: list[Customer] = field(default_factory=list)
+    products: list[Product] = field(default_factory=list)
+    price_scale: int = 0
+    _customer_ids: dict[Customer, int] = field(default_factory=dict, repr=False)
+    _product_ids: dict[Product, int] = field(default_factory=dict, repr=False)
+    _dates: dict[int, datetime] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.quantities)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Order]) -> Self:
+        columns = cls()
+        columns.extend(orders)
+        return columns
+
+    def _get_customer_id(self, customer: Customer) -> int:
+        if (customer_id := self._customer_ids.get(customer)) is None:
+            customer_id = self._customer_ids[customer] = len(self.customers)
+            self.customers.append(customer)
+        return customer_id
+
+    def _get_product_id(self, product: Product) -> int:
+        if (product_id := self._product_ids.get(product)) is None:
+            product_id = self._product_ids[product] = len(self.products)
+            self.products.append(product)
+        return product_id
+
+    def _to_minor_units(self, product: Product) -> int:
+        """ Converts price of product to price_scale. When price has more decimal places than price_scale, whole price
+            column is rescaled first, so stored values stay exact """
+        if product.price_scale > self.price_scale:
+            factor = 10 ** (product.price_scale - self.price_scale)
+            self.prices = array('q', (stored_price * factor for stored_price in self.prices))
+            self.price_scale = product.price_scale
+        return rescale(product.price_units, product.price_scale, self.price_scale)
+
+    def to_decimal(self, minor_units: int) -> Decimal:
+        """ Converts fixed-point integer back to Decimal """
+        return to_decimal(minor_units, self.price_scale)
+
+    def append(self, order: Order) -> None:
+        price = self._to_minor_units(order.product)
+        self.quantities.append(order.quantity)
+        self.prices.append(price)
+        keys = get_timestamp_keys(order.order_date)
+        self.order_dates.append(keys.epoch)
+        self._dates.setdefault(keys.epoch, order.order_date)
+        self.months.append(keys.month)
+        self.category_codes.append(_CATEGORY_CODES[order.product.category])
+        self.customer_ids.append(self._get_customer_id(order.customer))
+        self.product_ids.append(self._get_product_id(order.product))
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            self.append(order)
+
+    def get_values(self) -> Iterable[int]:
+        """ Fixed-point value of every order """
+        return map(mul, self.quantities, self.prices)
+
+    def get_customer_ages(self) -> list[int]:
+        """ Age of every customer, indexed by customer id """
+        return [customer.age for customer in self.customers]
+
+    def get_price_scale(self, mask: Iterable[bool]) -> int:
+        """ The largest number of decimal places of prices of orders selected by mask, 0 when none is selected """
+        return max((self.products[product_id].price_scale
+                    for product_id in set(compress(self.product_ids, mask))), default=0)
+
+    def _get_date_mask(self, start_date: datetime, end_date: datetime) -> list[bool]:
+        start, end = to_epoch_microseconds(start_date), to_epoch_microseconds(end_date)
+        return list(map(and_, map(le, repeat(start), self.order_dates), map(ge, repeat(end), self.order_dates)))
+
+    def get_average_product_price_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal:
+        mask = self._get_date_mask(start_date, end_date)
+        products_count = sum(compress(self.quantities, mask))
+        if products_count == 0:
+            raise ZeroDivisionError('product_count equals 0 therefore it cannot be valid divisor')
+        products_value = sum(map(mul, compress(self.quantities, mask), compress(self.prices, mask)))
+        # sum of Decimal values has decimal places of the most precise price in range, not of the whole pool
+        value = Money(products_value, self.price_scale).quantize(self.get_price_scale(mask))
+        return value.to_decimal() / Decimal(products_count)
+
+    def get_most_expensive_products_per_category(self, k: int | None = None) -> dict[Category, list[Product]]:
+        result = {}
+        for code in dict.fromkeys(self.category_codes):
+            mask = list(map(eq, self.category_codes, repeat(code)))
+            if k is not None:
+                products = dict(zip(compress(self.product_ids, mask), compress(self.prices, mask)))
+                result[CATEGORIES[code]] = [self.products[product_id] for product_id in get_top_k(products.items(), k)]
+                continue
+            top_price = max(compress(self.prices, mask))
+            result[CATEGORIES[code]] = [
+                self.products[product_id]
+                for product_id, price in zip(compress(self.product_ids, mask), compress(self.prices, mask))
+                if price == top_price
+            ]
+        return result
+
+    def get_customers_orders_summary(self) -> dict[Customer, list[dict[str, Any]]]:
+        customer_and_products = defaultdict(list)
+        for customer_id, product_id, quantity in zip(self.customer_ids, self.product_ids, self.quantities):
+            customer_and_products[self.customers[customer_id]].append(
+                {"product": self.products[product_id], "quantity": quantity})
+        return dict(customer_and_products)
+
+    def get_date_with_most_orders_made(self, k: int | None = None) -> list[datetime]:
+        dates = get_top_k(Counter(self.order_dates).items(), 1 if k is None else k)
+        return [self._dates[epoch] for epoch in dates]
+
+    def get_date_with_least_orders_made(self, k: int | None = None) -> list[datetime]:
+        dates = get_bottom_k(Counter(self.order_dates).items(), 1 if k is None else k)
+        return [self._dates[epoch] for epoch in dates]
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
+        counter = Counter()
+        for customer_id, value in zip(self.customer_ids, self.get_values()):
+            counter[customer_id] += value
+        return [self.customers[customer_id] for customer_id in get_top_k(counter.items(), 1 if k is None else k)]
+
+    def get_orders_value_after_discounts(self, reference_time: datetime | None = None) -> Decimal:
+        return get_default_discount_engine().get_columns_value_after_discounts(self, reference_time)
+
+    def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
+        valid_clients = {}
+        for customer_id, quantity in zip(self.customer_ids, self.quantities):
+            valid_clients[customer_id] = valid_clients.get(customer_id, True) and quantity == n
+        return sum(valid_clients.values())
+
+    def get_most_popular_category(self, k: int | None = None) -> list[Category]:
+        return [CATEGORIES[code] for code in get_top_k(Counter(self.category_codes).items(), 1 if k is None else k)]
+
+    def get_months_with_quantity_of_ordered_products(self) -> dict[int, int]:
+        months_with_products_quantities = {
+            month: sum(compress(self.quantities, map(eq, self.months, repeat(month))))
+            for month in dict.fromkeys(self.months)
+        }
+        return dict(sorted(months_with_products_quantities.items(), key=lambda m_q: m_q[1], reverse=True))
+
+    def get_most_popular_categories_for_months_that_orders_occurred(self) -> dict[int, list[Category]]:
+        months_with_categories = defaultdict(Counter)
+        for (month, code), count in Counter(zip(self.months, self.category_codes)).items():
+            months_with_categories[month][code] = count
+        return {
+            month: [CATEGORIES[code] for code in get_top_k(months_with_categories[month].items(), 1)]
+            for month in dict.fromkeys(self.months)
+        }
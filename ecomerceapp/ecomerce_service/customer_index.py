@@ -0,0 +1,120 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from ecomerceapp.common.money import rescale, to_decimal
+from ecomerceapp.common.utils import get_top_k
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product
+
+
+@dataclass
+class CustomerIndex:
+    """
+    Orders grouped by customer. Every customer gets integer id on first order, and totals of all its orders are kept
+    in lists indexed by that id: number of orders, sum of quantities, cart value and the lowest and the highest
+    quantity. Customer is hashed once per added order and customer queries visit customers, not orders. When
+    keep_orders is set, positions of orders in pool with their products and quantities are kept as well
+    """
+    keep_orders: bool = True
+    ids: dict[Customer, int] = field(default_factory=dict)
+    # customers in order of first appearance, position in list is id of customer
+    customers: list[Customer] = field(default_factory=list)
+    counts: list[int] = field(default_factory=list)
+    quantities: list[int] = field(default_factory=list)
+    # cart values are fixed-point integers with value_scale digits after decimal point
+    values: list[int] = field(default_factory=list)
+    value_scale: int = 0
+    min_quantities: list[int] = field(default_factory=list)
+    max_quantities: list[int] = field(default_factory=list)
+    positions: list[array] = field(default_factory=list)
+    products: list[list[Product]] = field(default_factory=list)
+    orders_quantities: list[array] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.customers)
+
+    def add(self, order: Order, position: int) -> None:
+        """ :param position: index of order in orders pool """
+        customer, product, quantity = order.customer, order.product, order.quantity
+        if product.price_scale > self.value_scale:
+            factor = 10 ** (product.price_scale - self.value_scale)
+            self.values = [value * factor for value in self.values]
+            self.value_scale = product.price_scale
+        value = rescale(quantity * product.price_units, product.price_scale, self.value_scale)
+        if (customer_id := self.ids.get(customer)) is None:
+            self.ids[customer] = len(self.customers)
+            self.customers.append(customer)
+            self.counts.append(1)
+            self.quantities.append(quantity)
+            self.values.append(value)
+            self.min_quantities.append(quantity)
+            self.max_quantities.append(quantity)
+            if self.keep_orders:
+                self.positions.append(array('q', (position,)))
+                self.products.append([product])
+                self.orders_quantities.append(array('q', (quantity,)))
+            return
+        self.counts[customer_id] += 1
+        self.quantities[customer_id] += quantity
+        self.values[customer_id] += value
+        if quantity < self.min_quantities[customer_id]:
+            self.min_quantities[customer_id] = quantity
+        elif quantity > self.max_quantities[customer_id]:
+            self.max_quantities[customer_id] = quantity
+        if self.keep_orders:
+            self.positions[customer_id].append(position)
+            self.products[customer_id].append(product)
+            self.orders_quantities[customer_id].append(quantity)
+
+    def extend(self, orders: Iterable[Order], start: int = 0) -> None:
+        """ :param start: position of the first of orders in orders pool """
+        for position, order in enumerate(orders, start):
+            self.add(order, position)
+
+    def _check_orders_are_kept(self) -> None:
+        if not self.keep_orders:
+            raise ValueError('CustomerIndex was created without keep_orders')
+
+    def get_customer_totals(self, customer: Customer) -> dict[str, Any] | None:
+        """ :return: dict with count, quantity, value, min_quantity and max_quantity keys, None for unknown customer """
+        if (customer_id := self.ids.get(customer)) is None:
+            return None
+        return {'count': self.counts[customer_id], 'quantity': self.quantities[customer_id],
+                'value': to_decimal(self.values[customer_id], self.value_scale),
+                'min_quantity': self.min_quantities[customer_id], 'max_quantity': self.max_quantities[customer_id]}
+
+    def get_customer_positions(self, customer: Customer) -> list[int]:
+        """ :return: positions of orders of customer in orders pool, in order they were added """
+        self._check_orders_are_kept()
+        customer_id = self.ids.get(customer)
+        return [] if customer_id is None else self.positions[customer_id].tolist()
+
+    def get_positions_with_quantity(self, n: int) -> list[int]:
+        """
+        Positions of all orders with quantity equal to n, in pool order. Customers whose quantity range doesn't contain
+        n are skipped after one comparison and all orders of customers that always ordered n are taken without looking
+        at their quantities
+        """
+        self._check_orders_are_kept()
+        positions = []
+        for customer_id, (low, high) in enumerate(zip(self.min_quantities, self.max_quantities)):
+            if low == high == n:
+                positions.extend(self.positions[customer_id])
+            elif low <= n <= high:
+                positions.extend(position for position, quantity in
+                                 zip(self.positions[customer_id], self.orders_quantities[customer_id]) if quantity == n)
+        positions.sort()
+        return positions
+
+    def get_customers_orders_summary(self) -> dict[Customer, list[dict[str, Any]]]:
+        self._check_orders_are_kept()
+        return {customer: [{"product": product, "quantity": quantity}
+                           for product, quantity in zip(products, quantities)]
+                for customer, products, quantities in zip(self.customers, self.products, self.orders_quantities)}
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
+        return get_top_k(zip(self.customers, self.values), 1 if k is None else k)
+
+    def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
+        # customer ordered exactly n products in every order when its lowest and highest quantities are both n
+        return sum(low == high == n for low, high in zip(self.min_quantities, self.max_quantities))
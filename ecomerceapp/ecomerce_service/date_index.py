@@ -0,0 +1,162 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from heapq import merge
+from itertools import accumulate, repeat
+from operator import itemgetter, mul, sub
+from typing import Iterable, Iterator
+
+from ecomerceapp.common.money import Money, rescale
+from ecomerceapp.common.timestamps import to_epoch_microseconds, get_timestamp_keys
+from ecomerceapp.ecomerce_service.model import Order
+
+
+@dataclass
+class DateIndex:
+    """
+    Orders sorted by order date with prefix sums of quantity and value, so count, sum of quantities and sum of values
+    in any date range are two binary searches away. Orders that arrive in date order are appended in O(1). Late
+    orders are kept in small sorted buffer that is checked by every query and merged into index when it grows over
+    max_pending elements. Values are summed as fixed-point integers. Positions of orders are kept per scale of their
+    price, so the largest scale inside any range is found with one binary search per scale and returned Decimals have
+    the same digits as sum of Decimal values of orders in range
+    """
+    max_pending: int = 1024
+    dates: array = field(default_factory=lambda: array('q'))
+    quantity_sums: array = field(default_factory=lambda: array('q', [0]))
+    # prefix sums of values with value_scale digits after decimal point, ints so they never overflow
+    value_sums: list[int] = field(default_factory=lambda: [0])
+    value_scale: int = 0
+    # price scale -> sorted positions of indexed orders with prices of that scale, there are only few scales
+    scale_positions: dict[int, array] = field(default_factory=dict)
+    # (epoch, quantity, units, scale) of late orders
+    pending: list[tuple[int, int, int, int]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.dates) + len(self.pending)
+
+    def clear(self) -> None:
+        self.__init__(self.max_pending)
+
+    def add(self, order: Order) -> None:
+        product = order.product
+        self.add_entry(get_timestamp_keys(order.order_date).epoch, order.quantity,
+                       order.quantity * product.price_units, product.price_scale)
+
+    def add_entry(self, epoch: int, quantity: int, units: int, scale: int) -> None:
+        """
+        Adds order given by its raw values, so index can be built from columns without Order objects
+        :param epoch: order date in microseconds since unix epoch
+        :param units: value of order with scale digits after decimal point
+        """
+        if not self.dates or epoch >= self.dates[-1]:
+            self._append(epoch, quantity, units, scale)
+            return
+        insort(self.pending, (epoch, quantity, units, scale))
+        if len(self.pending) > self.max_pending:
+            self._merge_pending()
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        """ Late orders of whole batch are sorted and merged into index at most once """
+        late = []
+        for order in orders:
+            epoch, product = get_timestamp_keys(order.order_date).epoch, order.product
+            if not self.dates or epoch >= self.dates[-1]:
+                self._append(epoch, order.quantity, order.quantity * product.price_units, product.price_scale)
+            else:
+                late.append((epoch, order.quantity, order.quantity * product.price_units, product.price_scale))
+        if late:
+            late.sort()
+            self.pending = list(merge(self.pending, late))
+            if len(self.pending) > self.max_pending:
+                self._merge_pending()
+
+    def _append(self, epoch: int, quantity: int, units: int, scale: int) -> None:
+        if scale > self.value_scale:
+            factor = 10 ** (scale - self.value_scale)
+            self.value_sums = [value * factor for value in self.value_sums]
+            self.value_scale = scale
+        elif scale < self.value_scale:
+            units *= 10 ** (self.value_scale - scale)
+        self.dates.append(epoch)
+        self.quantity_sums.append(self.quantity_sums[-1] + quantity)
+        self.value_sums.append(self.value_sums[-1] + units)
+        if (positions := self.scale_positions.get(scale)) is None:
+            positions = self.scale_positions[scale] = array('q')
+        positions.append(len(self.dates) - 1)
+
+    def _iter_indexed(self, scale: int) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Recovers (date, quantity, value, price scale) of every indexed order from prefix sums, value with scale digits
+        after decimal point
+        """
+        values = map(sub, self.value_sums[1:], self.value_sums)
+        if scale > self.value_scale:
+            values = map(mul, values, repeat(10 ** (scale - self.value_scale)))
+        scales = bytearray(len(self.dates))
+        for price_scale, positions in self.scale_positions.items():
+            for position in positions:
+                scales[position] = price_scale
+        return zip(self.dates, map(sub, self.quantity_sums[1:], self.quantity_sums), values, scales)
+
+    def _merge_pending(self) -> None:
+        scale = max(self.value_scale, *map(itemgetter(3), self.pending))
+        pending = [(epoch, quantity, rescale(units, units_scale, scale), units_scale)
+                   for epoch, quantity, units, units_scale in self.pending]
+        entries = list(merge(self._iter_indexed(scale), pending, key=itemgetter(0)))
+        self.dates = array('q', map(itemgetter(0), entries))
+        self.quantity_sums = array('q', accumulate(map(itemgetter(1), entries), initial=0))
+        self.value_sums = list(accumulate(map(itemgetter(2), entries), initial=0))
+        self.value_scale = scale
+        self.scale_positions = {}
+        for position, price_scale in enumerate(map(itemgetter(3), entries)):
+            if (positions := self.scale_positions.get(price_scale)) is None:
+                positions = self.scale_positions[price_scale] = array('q')
+            positions.append(position)
+        self.pending = []
+
+    def _get_range_scale(self, lo: int, hi: int) -> int:
+        """ The largest price scale of indexed orders from lo to hi exclusive, 0 for empty range """
+        for scale in sorted(self.scale_positions, reverse=True):
+            positions = self.scale_positions[scale]
+            index = bisect_left(positions, lo)
+            if index < len(positions) and positions[index] < hi:
+                return scale
+        return 0
+
+    def get_totals(self, start_date: datetime, end_date: datetime) -> tuple[int, int, Money]:
+        """ Number of orders, sum of their quantities and sum of their values, between both dates inclusive """
+        start, end = to_epoch_microseconds(start_date), to_epoch_microseconds(end_date)
+        if start > end:
+            return 0, 0, Money(0)
+        lo, hi = bisect_left(self.dates, start), bisect_right(self.dates, end)
+        count = hi - lo
+        quantity = self.quantity_sums[hi] - self.quantity_sums[lo]
+        scale = self._get_range_scale(lo, hi)
+        value = Money((self.value_sums[hi] - self.value_sums[lo]) // 10 ** (self.value_scale - scale), scale)
+        for _, pending_quantity, pending_units, pending_scale in self.pending[
+                bisect_left(self.pending, (start,)):bisect_right(self.pending, (end, float('inf')))]:
+            count += 1
+            quantity += pending_quantity
+            value += Money(pending_units, pending_scale)
+        return count, quantity, value
+
+    def get_orders_count(self, start_date: datetime, end_date: datetime) -> int:
+        """ Number of orders made between start_date and end_date, both inclusive """
+        return self.get_totals(start_date, end_date)[0]
+
+    def get_products_quantity(self, start_date: datetime, end_date: datetime) -> int:
+        """ Sum of quantities of orders made between start_date and end_date, both inclusive """
+        return self.get_totals(start_date, end_date)[1]
+
+    def get_orders_value(self, start_date: datetime, end_date: datetime) -> Decimal:
+        """ Sum of values of orders made between start_date and end_date, both inclusive """
+        return self.get_totals(start_date, end_date)[2].to_decimal()
+
+    def get_average_product_price(self, start_date: datetime, end_date: datetime) -> Decimal:
+        _, products_count, products_value = self.get_totals(start_date, end_date)
+        if products_count == 0:
+            raise ZeroDivisionError('product_count equals 0 therefore it cannot be valid divisor')
+        return products_value.to_decimal() / Decimal(products_count)
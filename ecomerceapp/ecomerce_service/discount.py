@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import compress
+from operator import and_, not_
+from functools import cache
+from typing import Any, Callable, Iterable, TYPE_CHECKING
+
+from ecomerceapp.common.money import Money, rescale
+from ecomerceapp.common.timestamps import to_epoch_microseconds
+from ecomerceapp.settings import AppData
+
+if TYPE_CHECKING:
+    from ecomerceapp.ecomerce_service.columns import OrdersColumns
+    from ecomerceapp.ecomerce_service.model import Order
+
+
+@dataclass(frozen=True)
+class CustomerAgeRule:
+    """ Discount for orders of customers that are age_cap years old or younger """
+    rate: Decimal
+    age_cap: int
+
+    def get_predicate(self, reference_time: datetime) -> Callable[['Order'], bool]:
+        age_cap = self.age_cap
+        return lambda order: order.customer.age <= age_cap
+
+    def get_mask(self, columns: 'OrdersColumns', reference_time: datetime) -> list[bool]:
+        young_customers = [age <= self.age_cap for age in columns.get_customer_ages()]
+        return list(map(young_customers.__getitem__, columns.customer_ids))
+
+    def get_sql_condition(self, reference_time: datetime) -> tuple[str, tuple]:
+        """ :return: condition over tables of SqliteOrdersService and its parameters """
+        return 'customers.age <= ?', (self.age_cap,)
+
+
+@dataclass(frozen=True)
+class OrderDateRule:
+    """
+    Discount for orders made from reference time until days later, both inclusive. Window is built with timedelta, so
+    it doesn't depend on length of month
+    """
+    rate: Decimal
+    days: int = 2
+
+    def get_window(self, reference_time: datetime) -> tuple[datetime, datetime]:
+        """ :return: inclusive start and inclusive end of discounted period """
+        return reference_time, reference_time + timedelta(days=self.days)
+
+    def get_predicate(self, reference_time: datetime) -> Callable[['Order'], bool]:
+        start, end = self.get_window(reference_time)
+        return lambda order: start <= order.order_date <= end
+
+    def get_mask(self, columns: 'OrdersColumns', reference_time: datetime) -> list[bool]:
+        start, end = map(to_epoch_microseconds, self.get_window(reference_time))
+        return [start <= epoch <= end for epoch in columns.order_dates]
+
+    def get_sql_condition(self, reference_time: datetime) -> tuple[str, tuple]:
+        """ :return: condition over tables of SqliteOrdersService and its parameters """
+        return 'orders.order_date BETWEEN ? AND ?', tuple(map(to_epoch_microseconds, self.get_window(reference_time)))
+
+
+DiscountRule = CustomerAgeRule | OrderDateRule
+
+
+@dataclass
+class DiscountedValue:
+    """
+    Running value of orders after discounts. Orders are grouped by rate and summed as fixed-point integers, so every
+    rate is multiplied once, exactly, when value is read
+    """
+    get_rate: Callable[['Order'], Decimal]
+    # rate -> [units, scale] of value of orders with that rate
+    values_by_rate: dict[Decimal, list[int]] = field(default_factory=dict)
+
+    def add(self, order: 'Order') -> None:
+        rate, product = self.get_rate(order), order.product
+        units, scale = order.quantity * product.price_units, product.price_scale
+        if (value := self.values_by_rate.get(rate)) is None:
+            self.values_by_rate[rate] = [units, scale]
+        elif scale > value[1]:
+            value[:] = [rescale(value[0], value[1], scale) + units, scale]
+        else:
+            value[0] += rescale(units, scale, value[1])
+
+    def get_value(self) -> Decimal:
+        return sum((Money(units, scale) * Money.from_decimal(rate) if rate != 1 else Money(units, scale)
+                    for rate, (units, scale) in self.values_by_rate.items()), Money(0)).to_decimal()
+
+
+@dataclass(frozen=True)
+class DiscountEngine:
+    """
+    Evaluates table of discount rules over batches of orders. Rules are checked in order and the first one that matches
+    sets discount rate of order, orders that match no rule keep full price. Clock is read once per batch and every
+    threshold is computed before orders are visited
+    """
+    rules: tuple[DiscountRule, ...]
+
+    def get_rate_function(self, reference_time: datetime | None = None) -> Callable[['Order'], Decimal]:
+        """
+        :param reference_time: moment that date rules are relative to, now by default
+        :return: function that returns rate that value of order is multiplied by, 1 when no rule matches
+        """
+        reference_time = reference_time or datetime.now(tz=timezone.utc)
+        rules = [(rule.get_predicate(reference_time), rule.rate) for rule in self.rules]
+        full_rate = Decimal('1')
+
+        def get_rate(order: 'Order') -> Decimal:
+            for is_matched, rate in rules:
+                if is_matched(order):
+                    return rate
+            return full_rate
+
+        return get_rate
+
+    def get_value_after_discount(self, order: 'Order', reference_time: datetime | None = None) -> Decimal:
+        rate = self.get_rate_function(reference_time)(order)
+        value = order.get_total_money()
+        return (value * Money.from_decimal(rate) if rate != 1 else value).to_decimal()
+
+    def get_orders_value_after_discounts(self, orders: Iterable['Order'],
+                                         reference_time: datetime | None = None) -> Decimal:
+        """ Sum of values of orders after discounts """
+        discounted_value = DiscountedValue(self.get_rate_function(reference_time))
+        for order in orders:
+            discounted_value.add(order)
+        return discounted_value.get_value()
+
+    def get_columns_value_after_discounts(self, columns: 'OrdersColumns',
+                                          reference_time: datetime | None = None) -> Decimal:
+        """
+        The same sum as get_orders_value_after_discounts, computed with one mask per rule over columnar orders. Value of
+        every rule has decimal places of prices of orders it matched, and rules that match nothing add no places
+        """
+        reference_time = reference_time or datetime.now(tz=timezone.utc)
+        values = list(columns.get_values())
+
+        def get_value(selected: list[bool]) -> Money:
+            value = Money(sum(compress(values, selected)), columns.price_scale)
+            return value.quantize(columns.get_price_scale(selected))
+
+        remaining = [True] * len(columns)
+        total = Money(0)
+        for rule in self.rules:
+            mask = list(map(and_, remaining, rule.get_mask(columns, reference_time)))
+            if not any(mask):
+                continue
+            total += get_value(mask) * Money.from_decimal(rule.rate)
+            remaining = list(map(and_, remaining, map(not_, mask)))
+        if any(remaining):
+            total += get_value(remaining)
+        return total.to_decimal()
+
+
+@cache
+def get_default_discount_engine() -> DiscountEngine:
+    """ Engine with rules from settings, it's built on first use, so importing module doesn't read settings """
+    return DiscountEngine((
+        CustomerAgeRule(AppData.DISCOUNT_RATE_FOR_CUSTOMER_AGE, AppData.DISCOUNT_AGE_CAP),
+        OrderDateRule(AppData.DISCOUNT_RATE_FOR_DATE),
+    ))
+
+
+def __getattr__(name: str) -> Any:
+    # DEFAULT_DISCOUNT_ENGINE stays available as module attribute, but it's created only when it's read
+    if name == 'DEFAULT_DISCOUNT_ENGINE':
+        return get_default_discount_engine()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
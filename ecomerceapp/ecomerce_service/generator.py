@@ -0,0 +1,121 @@
+import json
+import random
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Any, Iterator
+
+from ecomerceapp.ecomerce_service.loader import JSON_LINES_EXTENSIONS
+from ecomerceapp.ecomerce_service.model import Category
+
+
+def _get_letters(n: int) -> str:
+    """ Bijective base-26 representation of n, 0 -> A, 25 -> Z, 26 -> AA. Generated names have to match [A-Z]+ """
+    letters = ''
+    n += 1
+    while n:
+        n, remainder = divmod(n - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+@dataclass(frozen=True)
+class OrdersGeneratorConfig:
+    """
+    Describes synthetic orders data. Customers and products are picked with Zipf-like popularity, so few of them
+    appear in many orders like in real shop. invalid_rate is share of records that have one field broken
+    """
+    customers: int = 1_000
+    products: int = 200
+    start_date: datetime = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    days: int = 365
+    max_quantity: int = 10
+    invalid_rate: float = 0.0
+    seed: int = 0
+
+
+class OrdersGenerator:
+    """ Generates raw order records, the same ones that are stored in json files loaded by loader module """
+
+    def __init__(self, config: OrdersGeneratorConfig = OrdersGeneratorConfig()) -> None:
+        if config.customers < 1 or config.products < 1 or config.days < 1:
+            raise ValueError('customers, products and days have to be positive')
+        if not 0 <= config.invalid_rate <= 1:
+            raise ValueError('invalid_rate has to be between 0 and 1')
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._customers = [self._create_customer(i) for i in range(config.customers)]
+        self._products = [self._create_product(i) for i in range(config.products)]
+        self._customer_weights = list(accumulate(1 / (i + 1) for i in range(config.customers)))
+        self._product_weights = list(accumulate(1 / (i + 1) for i in range(config.products)))
+
+    def _create_customer(self, i: int) -> dict[str, Any]:
+        name, surname = _get_letters(i), _get_letters(self._rng.randrange(10_000))
+        return {
+            "name": name,
+            "surname": surname,
+            "age": self._rng.randint(18, 80),
+            "email": f'{name.lower()}.{surname.lower()}{i}@example.com'
+        }
+
+    def _create_product(self, i: int) -> dict[str, Any]:
+        return {
+            "name": f'PRODUCT {_get_letters(i)}',
+            "price": f'{self._rng.randint(1, 500_000) / 100:.2f}',
+            "category": self._rng.choice(list(Category)).name
+        }
+
+    def _break_record(self, record: dict[str, Any]) -> None:
+        """ Makes record invalid by breaking exactly one of its fields """
+        match self._rng.randrange(6):
+            case 0:
+                record['customer'] = {**record['customer'], 'age': 17}
+            case 1:
+                record['product'] = {**record['product'], 'price': '1$'}
+            case 2:
+                record['product'] = {**record['product'], 'category': 'Z'}
+            case 3:
+                record['quantity'] = -1
+            case 4:
+                record['order_date'] = record['order_date'][:10]
+            case _:
+                del record['customer']
+
+    def generate(self, count: int) -> Iterator[dict[str, Any]]:
+        """
+        Lazily generates order records
+        :param count: number of records
+        :return: iterator of dicts ready to be dumped to json
+        """
+        rng, config = self._rng, self.config
+        seconds = config.days * 24 * 60 * 60
+        for _ in range(count):
+            order_date = config.start_date + timedelta(seconds=rng.randrange(seconds))
+            record = {
+                "customer": rng.choices(self._customers, cum_weights=self._customer_weights)[0],
+                "product": rng.choices(self._products, cum_weights=self._product_weights)[0],
+                "quantity": rng.randint(1, config.max_quantity),
+                "order_date": order_date.isoformat(timespec='seconds')
+            }
+            if config.invalid_rate and rng.random() < config.invalid_rate:
+                self._break_record(record)
+            yield record
+
+    def write(self, filepath: str, count: int) -> None:
+        """
+        Writes count records to file one by one, so memory doesn't depend on count. Files with .jsonl or .ndjson
+        extension get one record per line, any other file gets json array
+        """
+        json_lines = filepath.endswith(JSON_LINES_EXTENSIONS)
+        with open(filepath, 'w') as f:
+            if not json_lines:
+                f.write('[\n')
+            for i, record in enumerate(self.generate(count)):
+                if not json_lines and i:
+                    f.write(',\n')
+                f.write(json.dumps(record))
+                if json_lines:
+                    f.write('\n')
+            if not json_lines:
+                f.write('\n]\n')
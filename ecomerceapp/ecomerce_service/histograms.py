@@ -0,0 +1,177 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Callable, Final, Iterable
+
+from ecomerceapp.common.money import rescale, to_decimal
+from ecomerceapp.common.timestamps import EPOCH, TIMESTAMPS_CACHE_SIZE, get_timestamp_keys
+from ecomerceapp.common.utils import get_top_k, get_bottom_k
+from ecomerceapp.ecomerce_service.model import Order
+
+
+GRANULARITIES: Final = ('hour', 'day', 'week', 'month')
+_HOUR: Final = 3_600_000_000
+_DAY: Final = 24 * _HOUR
+# 1970-01-01 was Thursday, weeks start on Monday like ISO weeks
+_WEEK_OFFSET: Final = 3
+
+
+@lru_cache(maxsize=TIMESTAMPS_CACHE_SIZE)
+def _get_month_id(day_id: int) -> int:
+    day = date(1970, 1, 1) + timedelta(days=day_id)
+    return day.year * 12 + day.month - 1
+
+
+def _get_bucket_ids(epoch: int) -> tuple[int, int, int, int]:
+    """ Hour, day, week and month of epoch in microseconds, all in UTC """
+    day_id = epoch // _DAY
+    return epoch // _HOUR, day_id, (day_id + _WEEK_OFFSET) // 7, _get_month_id(day_id)
+
+
+def _get_bucket_id(granularity: str, moment: datetime) -> int:
+    return _get_bucket_ids(get_timestamp_keys(moment).epoch)[GRANULARITIES.index(granularity)]
+
+
+def get_bucket_start(granularity: str, bucket_id: int) -> datetime:
+    """ Beginning of bucket in UTC """
+    if granularity == 'hour':
+        return EPOCH + timedelta(microseconds=bucket_id * _HOUR)
+    if granularity == 'day':
+        return EPOCH + timedelta(days=bucket_id)
+    if granularity == 'week':
+        return EPOCH + timedelta(days=bucket_id * 7 - _WEEK_OFFSET)
+    return datetime(bucket_id // 12, bucket_id % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def validate_granularity(granularity: str) -> str:
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unknown granularity: {granularity}, available: {", ".join(GRANULARITIES)}')
+    return granularity
+
+
+@dataclass
+class TimeHistogram:
+    """
+    Number of orders, sum of quantities and value of orders in every hour, day, week or month (UTC) that had orders.
+    Adding order updates one bucket. Buckets sorted by time with prefix sums over them are built on first query after
+    change, so totals of any window are two binary searches away and its busiest or quietest bucket is found among
+    buckets of window, without visiting orders
+    """
+    granularity: str
+    # bucket id -> [count, quantity, value], value is fixed-point integer with value_scale digits after decimal point
+    buckets: dict[int, list[int]] = field(default_factory=dict)
+    value_scale: int = 0
+    _ids: array | None = field(default=None, repr=False)
+    _counts: list[int] = field(default_factory=list, repr=False)
+    _count_sums: list[int] = field(default_factory=list, repr=False)
+    _quantity_sums: list[int] = field(default_factory=list, repr=False)
+    _value_sums: list[int] = field(default_factory=list, repr=False)
+
+    def __post_init__(self) -> None:
+        validate_granularity(self.granularity)
+
+    def add(self, bucket_id: int, quantity: int, units: int, scale: int) -> None:
+        if scale > self.value_scale:
+            factor = 10 ** (scale - self.value_scale)
+            for bucket in self.buckets.values():
+                bucket[2] *= factor
+            self.value_scale = scale
+        units = rescale(units, scale, self.value_scale)
+        if (bucket := self.buckets.get(bucket_id)) is None:
+            self.buckets[bucket_id] = [1, quantity, units]
+        else:
+            bucket[0] += 1
+            bucket[1] += quantity
+            bucket[2] += units
+        self._ids = None
+
+    def _build(self) -> None:
+        self._ids = array('q', sorted(self.buckets))
+        rows = [self.buckets[bucket_id] for bucket_id in self._ids]
+        self._counts = [count for count, _, _ in rows]
+        self._count_sums = list(accumulate(self._counts, initial=0))
+        self._quantity_sums = list(accumulate((quantity for _, quantity, _ in rows), initial=0))
+        self._value_sums = list(accumulate((value for _, _, value in rows), initial=0))
+
+    def _get_window(self, start_date: datetime | None, end_date: datetime | None) -> tuple[int, int]:
+        """ :return: positions of the first and after the last bucket of window, both dates inclusive """
+        if self._ids is None:
+            self._build()
+        lo = 0 if start_date is None else bisect_left(self._ids, _get_bucket_id(self.granularity, start_date))
+        hi = len(self._ids) if end_date is None else bisect_right(self._ids, _get_bucket_id(self.granularity, end_date))
+        return lo, max(lo, hi)
+
+    def get_totals(self, start_date: datetime | None = None, end_date: datetime | None = None) -> dict[str, Any]:
+        """
+        Totals of whole buckets from the one that contains start_date to the one that contains end_date
+        :return: dict with count, quantity and value keys
+        """
+        lo, hi = self._get_window(start_date, end_date)
+        return {'count': self._count_sums[hi] - self._count_sums[lo],
+                'quantity': self._quantity_sums[hi] - self._quantity_sums[lo],
+                'value': to_decimal(self._value_sums[hi] - self._value_sums[lo], self.value_scale)}
+
+    def get_buckets(self, start_date: datetime | None = None,
+                    end_date: datetime | None = None) -> dict[datetime, dict[str, Any]]:
+        """ :return: beginning of every bucket of window that had orders, in time order, with totals of bucket """
+        lo, hi = self._get_window(start_date, end_date)
+        buckets = {}
+        for bucket_id in self._ids[lo:hi]:
+            count, quantity, value = self.buckets[bucket_id]
+            buckets[get_bucket_start(self.granularity, bucket_id)] = {
+                'count': count, 'quantity': quantity, 'value': to_decimal(value, self.value_scale)}
+        return buckets
+
+    def _select(self, select: Callable, k: int | None, start_date: datetime | None,
+                end_date: datetime | None) -> list[datetime]:
+        lo, hi = self._get_window(start_date, end_date)
+        bucket_ids = select(zip(self._ids[lo:hi], self._counts[lo:hi]), 1 if k is None else k)
+        return [get_bucket_start(self.granularity, bucket_id) for bucket_id in bucket_ids]
+
+    def get_busiest(self, k: int | None = None, start_date: datetime | None = None,
+                    end_date: datetime | None = None) -> list[datetime]:
+        """
+        :param k: number of buckets, buckets tied with k-th one are included. None means only the busiest buckets
+        :return: beginnings of buckets with the most orders, ties in time order
+        """
+        return self._select(get_top_k, k, start_date, end_date)
+
+    def get_quietest(self, k: int | None = None, start_date: datetime | None = None,
+                     end_date: datetime | None = None) -> list[datetime]:
+        """
+        :param k: number of buckets, buckets tied with k-th one are included. None means only the quietest buckets
+        :return: beginnings of buckets with the fewest orders among buckets that had any, ties in reversed time order
+        """
+        return self._select(get_bottom_k, k, start_date, end_date)
+
+
+@dataclass
+class OrdersHistograms:
+    """ Histograms of all GRANULARITIES, every order is bucketed once for all of them """
+    histograms: dict[str, TimeHistogram] = field(
+        default_factory=lambda: {granularity: TimeHistogram(granularity) for granularity in GRANULARITIES})
+    orders_count: int = 0
+
+    def __len__(self) -> int:
+        return self.orders_count
+
+    def __getitem__(self, granularity: str) -> TimeHistogram:
+        return self.histograms[validate_granularity(granularity)]
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def add(self, order: Order) -> None:
+        product = order.product
+        units, scale = order.quantity * product.price_units, product.price_scale
+        for histogram, bucket_id in zip(self.histograms.values(),
+                                        _get_bucket_ids(get_timestamp_keys(order.order_date).epoch)):
+            histogram.add(bucket_id, order.quantity, units, scale)
+        self.orders_count += 1
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            self.add(order)
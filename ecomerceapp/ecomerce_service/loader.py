@@ -1,15 +1,30 @@
 import json
 import logging
+import os
 
-from typing import Any
+from array import array
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator
 
-from ecomerceapp.ecomerce_service.model import Order
+from ecomerceapp.common.metrics import METRICS, instrumented
+from ecomerceapp.common.timestamps import parse_timestamp
+from ecomerceapp.common.validator import Rejection
+from ecomerceapp.ecomerce_service.model import Order, Interner, LazyOrder
 from ecomerceapp.ecomerce_service.validator import ServiceDataValidator
 
 
 logger = logging.getLogger(__name__)
 
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+DEFAULT_CHUNK_SIZE = 10_000
+_WHITESPACE = ' \t\n\r'
+# decoder may need that many characters after position of error to tell if the error is real, '-Infinity' is the longest
+_MAX_TOKEN_LENGTH = len('-Infinity')
 
+
+@instrumented
 def load_json_file(filepath: str) -> dict | list:
     """
     It opens connection with json file, and returns an object represented in that file
@@ -24,17 +39,315 @@ def load_json_file(filepath: str) -> dict | list:
         raise FileNotFoundError('File does not exist')
 
 
-def load_orders(data: list[dict[str, Any]]) -> list['Order']:
+def iter_json_array(filepath: str, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Yields elements of top-level json array one by one, so whole file is never held in memory
+    :param filepath: path to json file which top-level object is an array
+    :param chunk_size: number of characters that are read from file at once
+    :return: iterator of decoded array elements
+    """
+    decoder = json.JSONDecoder()
+    try:
+        jf = open(filepath)
+    except FileNotFoundError:
+        raise FileNotFoundError('File does not exist')
+
+    with jf:
+        buffer, idx, eof = '', 0, False
+        # characters, lines and characters of the last unfinished line that were dropped from beginning of buffer
+        dropped_chars = dropped_lines = dropped_column = 0
+
+        def fill() -> bool:
+            """
+            Drops already consumed part of buffer and appends next chunk. Chunk is at least as long as the part that is
+            kept, so element longer than chunk_size is read in logarithmic number of steps. Returns False when file has
+            ended
+            """
+            nonlocal buffer, idx, eof, dropped_chars, dropped_lines, dropped_column
+            dropped_chars += idx
+            if newlines := buffer.count('\n', 0, idx):
+                dropped_lines += newlines
+                dropped_column = idx - buffer.rfind('\n', 0, idx) - 1
+            else:
+                dropped_column += idx
+            chunk = jf.read(max(chunk_size, len(buffer) - idx))
+            buffer, idx, eof = buffer[idx:] + chunk, 0, not chunk
+            return not eof
+
+        def get_error(message: str, position: int) -> json.JSONDecodeError:
+            """ Error whose position, line and column are counted from beginning of file, not of buffer """
+            error = json.JSONDecodeError(message, buffer, position)
+            line_start = buffer.rfind('\n', 0, position)
+            error.pos = dropped_chars + position
+            error.lineno = dropped_lines + buffer.count('\n', 0, position) + 1
+            error.colno = position - line_start if line_start >= 0 else dropped_column + position + 1
+            error.args = (f'{message}: line {error.lineno} column {error.colno} (char {error.pos})',)
+            return error
+
+        def skip_whitespace() -> str:
+            """ Moves idx to next meaningful character and returns it, empty string means end of file """
+            nonlocal idx
+            while True:
+                while idx < len(buffer) and buffer[idx] in _WHITESPACE:
+                    idx += 1
+                if idx < len(buffer):
+                    return buffer[idx]
+                if not fill():
+                    return ''
+
+        if skip_whitespace() != '[':
+            raise get_error('Expecting top-level array', idx)
+        idx += 1
+        if skip_whitespace() == ']':
+            return
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, idx)
+                # number or literal at the end of buffer may continue in next chunk
+                if end == len(buffer) and not eof:
+                    raise json.JSONDecodeError('Element may be incomplete', buffer, end)
+            except json.JSONDecodeError as e:
+                # only errors at the end of buffer can be caused by element that continues in next chunk
+                truncated = e.msg.startswith('Unterminated string') or e.pos + _MAX_TOKEN_LENGTH > len(buffer)
+                if eof or not truncated:
+                    raise get_error(e.msg, e.pos) from None
+                fill()
+                continue
+            idx = end
+            yield element
+            separator = skip_whitespace()
+            if separator == ']':
+                return
+            if separator != ',':
+                raise get_error("Expecting ',' delimiter", idx)
+            idx += 1
+            skip_whitespace()
+
+
+def iter_json_lines(filepath: str) -> Iterator[Any]:
+    """
+    Yields objects from json lines file (one json document per line). Blank lines are skipped
+    :param filepath: path to .jsonl file
+    :return: iterator of decoded objects
+    """
+    try:
+        jf = open(filepath)
+    except FileNotFoundError:
+        raise FileNotFoundError('File does not exist')
+
+    with jf:
+        for line in jf:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_json_records(filepath: str) -> Iterator[Any]:
+    """ Chooses json lines reader for .jsonl/.ndjson files and streaming array reader for everything else """
+    if filepath.endswith(JSON_LINES_EXTENSIONS):
+        return iter_json_lines(filepath)
+    return iter_json_array(filepath)
+
+
+def log_loading_summary(loaded: int, total: int, rejections: Counter[Rejection]) -> None:
+    """
+    Logs how many objects were loaded, and for rejected ones which field and rule made them invalid. Every loading
+    path ends here, also the parallel ones, so numbers are recorded in metrics here as well
+    """
+    METRICS.increment('ecommerce_records_total', loaded, status='loaded')
+    METRICS.increment('ecommerce_records_total', total - loaded, status='rejected')
+    for rejection, count in rejections.items():
+        METRICS.increment('ecommerce_rejections_total', count, field=rejection.field, rule=rejection.rule)
+    if loaded == total:
+        logger.info(f'All json objects were loaded successfully')
+    else:
+        logger.warning(f"{total - loaded} json objects weren't loaded correctly")
+        for rejection, count in rejections.most_common():
+            logger.warning(f"{count} rejected by rule '{rejection.rule}' of field '{rejection.field}'")
+
+
+def stream_orders(data: Iterable[dict[str, Any]], lazy: bool = False) -> Iterator['Order']:
+    """
+    Lazy version of load_orders. Every record is validated and turned into Order when it is requested, invalid
+    records are skipped. Identical customers and products are shared between orders. Summary is logged after last
+    record was consumed
+    :param data: iterable of dicts with raw values of Order object arguments
+    :param lazy: yields LazyOrder objects that convert fields of record when they are read
+    :return: iterator of Order objects
+    """
+    loaded = total = 0
+    rejections, interner = Counter(), Interner()
+    order_type = LazyOrder if lazy else Order
+    for order_data in data:
+        total += 1
+        if rejection := ServiceDataValidator.get_order_data_rejection(order_data):
+            rejections[rejection] += 1
+            continue
+        loaded += 1
+        yield order_type.from_dict(order_data, interner)
+
+    log_loading_summary(loaded, total, rejections)
+
+
+def stream_orders_from_file(filepath: str, lazy: bool = False) -> Iterator['Order']:
+    """
+    Streams validated orders directly from json array or json lines file, without loading whole file first
+    :param filepath: path to .json, .jsonl or .ndjson file
+    :param lazy: yields LazyOrder objects, see stream_orders
+    :return: iterator of Order objects
+    """
+    logger.info(f'Streaming orders from {filepath}')
+    return stream_orders(iter_json_records(filepath), lazy)
+
+
+def iter_batches(elements: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+    """
+    Groups elements into lists of batch_size elements, last batch can be shorter
+    :param elements: any iterable, for example result of stream_orders
+    :param batch_size: positive integer
+    :return: iterator of lists
+    """
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise ValueError('batch_size has to be positive integer')
+    iterator = iter(elements)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+@instrumented
+def load_orders(data: list[dict[str, Any]], lazy: bool = False) -> list['Order']:
     """
     It has a purpose of loading data of orders that were loaded from json file
     :param data: list of dicts with keys - Order object argument names, values - raw values of those arguments, for example: Decimal values are represented by string values
+    :param lazy: returns LazyOrder objects, see stream_orders
     :return: list of Order objects
     """
-    orders = [Order.from_dict(order_data) for order_data in data if ServiceDataValidator.validate_order_data(order_data)]
+    return list(stream_orders(data, lazy))
 
-    # ternary operator
-    if (l1 := len(orders)) == (l2 := len(data)):
-        logger.info(f'All json objects were loaded successfully')
-    else:
-        logger.warning(f"{l2 - l1} json objects weren't loaded correctly")
-    return orders
+
+@dataclass
+class EncodedOrders:
+    """
+    Valid orders of one chunk encoded by worker process. Distinct customers, products and order dates of chunk are
+    kept once, as raw data, and orders are positions in these tables, so chunk is cheap to pickle back and decoding it
+    converts every distinct value once and then only looks orders up
+    """
+    customers: list[dict[str, Any]] = field(default_factory=list)
+    products: list[dict[str, Any]] = field(default_factory=list)
+    dates: list[str] = field(default_factory=list)
+    customer_ids: array = field(default_factory=lambda: array('q'))
+    product_ids: array = field(default_factory=lambda: array('q'))
+    # validator doesn't limit quantity, so it may not fit in array
+    quantities: list[int] = field(default_factory=list)
+    date_ids: array = field(default_factory=lambda: array('q'))
+
+    def __len__(self) -> int:
+        return len(self.quantities)
+
+    def decode(self, interner: Interner) -> list['Order']:
+        """
+        :param interner: shares customers and products between chunks
+        :return: orders in input order
+        """
+        customers = list(map(interner.get_customer, self.customers))
+        products = list(map(interner.get_product, self.products))
+        dates = list(map(parse_timestamp, self.dates))
+        return list(map(Order, map(customers.__getitem__, self.customer_ids),
+                        map(products.__getitem__, self.product_ids), self.quantities,
+                        map(dates.__getitem__, self.date_ids)))
+
+
+def _get_table_id(ids: dict[Any, int], table: list, key: Any, value: Any) -> int:
+    """ Position of value with key in table, value is appended when key is seen for the first time """
+    if (table_id := ids.get(key)) is None:
+        table_id = ids[key] = len(table)
+        table.append(value)
+    return table_id
+
+
+@instrumented
+def encode_orders_chunk(data: list[dict[str, Any]]) -> tuple[EncodedOrders, Counter[Rejection]]:
+    """
+    Validates one chunk of records and encodes valid ones. It's executed in worker processes, so it doesn't log
+    anything itself
+    :param data: list of dicts with raw values of Order object arguments
+    :return: encoded valid orders and counter of rejection reasons
+    """
+    encoded, rejections = EncodedOrders(), Counter()
+    customer_ids, product_ids, date_ids = {}, {}, {}
+    for order_data in data:
+        if rejection := ServiceDataValidator.get_order_data_rejection(order_data):
+            rejections[rejection] += 1
+            continue
+        customer, product, order_date = order_data['customer'], order_data['product'], order_data['order_date']
+        # the same keys that Interner uses, so equal raw data is decoded into one instance
+        encoded.customer_ids.append(_get_table_id(
+            customer_ids, encoded.customers,
+            (customer['name'], customer['surname'], customer['age'], customer['email']), customer))
+        encoded.product_ids.append(_get_table_id(
+            product_ids, encoded.products, (product['name'], product['price'], product['category']), product))
+        encoded.quantities.append(order_data['quantity'])
+        encoded.date_ids.append(_get_table_id(date_ids, encoded.dates, order_date, order_date))
+    return encoded, rejections
+
+
+@instrumented
+def load_orders_chunk(data: list[dict[str, Any]]) -> tuple[list['Order'], Counter[Rejection]]:
+    """
+    Validates and loads one chunk of records
+    :param data: list of dicts with raw values of Order object arguments
+    :return: loaded orders in input order and counter of rejection reasons
+    """
+    encoded, rejections = encode_orders_chunk(data)
+    return encoded.decode(Interner()), rejections
+
+
+def stream_orders_parallel(data: Iterable[dict[str, Any]], workers: int | None = None,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator['Order']:
+    """
+    Parallel version of stream_orders. Records are split into chunks that are validated and encoded in process pool.
+    Workers send back EncodedOrders, so Order objects are never pickled, and this process only converts distinct
+    customers, products and dates of chunk and creates Order objects. That part and pickling of records stay serial,
+    on 100k generated records they take about 0.4s against 1.4s spent in workers, so speedup is limited to about 4x.
+    Only 2 chunks per worker are in flight at once, so memory stays bounded also for streamed input, and chunks are
+    yielded back in input order
+    :param data: iterable of dicts with raw values of Order object arguments
+    :param workers: number of worker processes, os.cpu_count() by default
+    :param chunk_size: number of records sent to worker at once
+    :return: iterator of Order objects in the same order as input records
+    """
+    # multiprocessing takes longer to import than the rest of loader, only parallel loading needs it
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError('workers has to be positive integer')
+    loaded = total = 0
+    rejections, interner = Counter(), Interner()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks, in_flight = iter_batches(data, chunk_size), deque()
+        while True:
+            while len(in_flight) < 2 * workers and (chunk := next(chunks, None)) is not None:
+                total += len(chunk)
+                in_flight.append(executor.submit(encode_orders_chunk, chunk))
+            if not in_flight:
+                break
+            encoded, chunk_rejections = in_flight.popleft().result()
+            orders = encoded.decode(interner)
+            loaded += len(orders)
+            rejections.update(chunk_rejections)
+            yield from orders
+
+    log_loading_summary(loaded, total, rejections)
+
+
+@instrumented
+def load_orders_parallel(data: Iterable[dict[str, Any]], workers: int | None = None,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> list['Order']:
+    """
+    Same as load_orders, but records are validated and encoded in worker processes, see stream_orders_parallel
+    :param data: iterable of dicts with raw values of Order object arguments
+    :param workers: number of worker processes, os.cpu_count() by default
+    :param chunk_size: number of records sent to worker at once
+    :return: list of Order objects in input order
+    """
+    return list(stream_orders_parallel(data, workers, chunk_size))
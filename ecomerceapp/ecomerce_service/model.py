@@ -1,15 +1,16 @@
-import pytz
-
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum, auto
-from typing import Any, Self, ClassVar
+from typing import Any, Self
 
+from ecomerceapp.common.money import Money, get_scale, to_minor_units
+from ecomerceapp.common.timestamps import parse_timestamp
+from ecomerceapp.ecomerce_service.discount import get_default_discount_engine
 from ecomerceapp.settings import AppData
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Customer:
     """
     Customer stores name, surname, age, and email of service user. It provides service with few functionalities needed.
@@ -18,6 +19,17 @@ class Customer:
     surname: str
     age: int
     email: str
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, '_hash', hash((self.name, self.surname, self.age, self.email)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        # hash of str differs between processes, so it has to be computed again after unpickling
+        return self.__class__, (self.name, self.surname, self.age, self.email)
 
     def is_older_than(self, n: int) -> bool:
         """ n has to be an integer"""
@@ -36,12 +48,31 @@ class Category(Enum):
     A, B, C = [auto() for _ in range(3)]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Product:
-    """ Product stores name, price, and category of service product. It provides service with few functionalities needed. """
+    """
+    Product stores name, price, and category of service product. It provides service with few functionalities needed.
+    Price is converted once to integer price_units with price_scale digits after decimal point, which is what
+    aggregations compute with
+    """
     name: str
     price: Decimal
     category: Category
+    price_units: int = field(init=False, repr=False, compare=False)
+    price_scale: int = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        price_scale = get_scale(self.price)
+        object.__setattr__(self, 'price_units', to_minor_units(self.price, price_scale))
+        object.__setattr__(self, 'price_scale', price_scale)
+        object.__setattr__(self, '_hash', hash((self.name, self.price, self.category)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self.name, self.price, self.category)
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> Self:
@@ -51,14 +82,10 @@ class Product:
         return cls(data['name'], price, category)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Order:
     """ Order stores category, product, quantity, and order_date of service order. It provides service with few functionalities needed. """
 
-    DISCOUNT_RATE_FOR_DATE: ClassVar = AppData.DISCOUNT_RATE_FOR_DATE
-    DISCOUNT_RATE_FOR_CUSTOMER_AGE: ClassVar = AppData.DISCOUNT_RATE_FOR_CUSTOMER_AGE
-    DISCOUNT_AGE_CAP: ClassVar = AppData.DISCOUNT_AGE_CAP
-
     customer: Customer
     product: Product
     quantity: int
@@ -72,8 +99,14 @@ class Order:
 
     def get_total_price(self) -> Decimal:
         """ Calculates total value of an order"""
+        # single Decimal result is cheaper to multiply than to build from minor units, aggregations use price_units
         return self.quantity * self.product.price
 
+    def get_total_money(self) -> Money:
+        """ Total value of an order as fixed-point Money """
+        product = self.product
+        return Money(self.quantity * product.price_units, product.price_scale)
+
     def is_order_in_date_range(self, start_date: datetime, end_date: datetime) -> bool:
         """ Checks if order was made in provided range of time """
         return start_date <= self.order_date <= end_date
@@ -86,31 +119,141 @@ class Order:
         """
         return self.quantity == n
 
-    def is_customer_older_than(self, n: int = DISCOUNT_AGE_CAP) -> bool:
+    def is_customer_older_than(self, n: int | None = None) -> bool:
         """
             Checks if customer is older than 'n'- an integer provided as an argument.
-            In case of 'n' absence in parameters, method will use DISCOUNT_AGE_CAP form Order namespace
+            In case of 'n' absence in parameters, method will use DISCOUNT_AGE_CAP from AppData settings
         """
-        return self.customer.is_older_than(n)
+        return self.customer.is_older_than(AppData.DISCOUNT_AGE_CAP if n is None else n)
 
-    def get_value_after_discount(self) -> Decimal:
-        """ Calculates value of order after applied discount. If customer is younger than 25 years he will get
+    def get_value_after_discount(self, reference_time: datetime | None = None) -> Decimal:
+        """ Calculates value of order after applied discount. If customer is 25 years old or younger he will get
             x% of discount according to DISCOUNT_RATE_FOR_CUSTOMER_AGE rate, if not then order will be checked if it's
-            made within 2 days. If yes then he will get y% of discount according to DISCOUNT_RATE_FOR_DATE rate
+            made within 2 days. If yes then he will get y% of discount according to DISCOUNT_RATE_FOR_DATE rate. Rules
+            are evaluated by discount.get_default_discount_engine()
+        :param reference_time: moment that 'today' refers to, now by default
         """
-        if not self.is_customer_older_than(25):
-            return self.get_total_price() * self.DISCOUNT_RATE_FOR_CUSTOMER_AGE
-        if self.is_order_in_date_range(today := datetime.now(tz=pytz.timezone("UTC")),
-                                       today.replace(day=today.day + 2)):
-            return self.get_total_price() * self.DISCOUNT_RATE_FOR_DATE
-        return self.get_total_price()
+        return get_default_discount_engine().get_value_after_discount(self, reference_time)
 
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> Self:
-        """ Creates Order instance. No data should not be provided without previous validation"""
+    def from_dict(cls, data: dict[str, Any], interner: 'Interner | None' = None) -> Self:
+        """
+        Creates Order instance. No data should not be provided without previous validation
+        :param data: unstandardized order data
+        :param interner: optional Interner, when provided identical customers and products are shared between orders
+        """
+        if interner is None:
+            return cls(
+                Customer.from_dict(data['customer']),
+                Product.from_dict(data['product']),
+                data['quantity'],
+                parse_timestamp(data['order_date'])
+            )
         return cls(
-            Customer.from_dict(data['customer']),
-            Product.from_dict(data['product']),
+            interner.get_customer(data['customer']),
+            interner.get_product(data['product']),
             data['quantity'],
-            datetime.fromisoformat(data['order_date'])
+            parse_timestamp(data['order_date'])
         )
+
+
+class LazyOrder:
+    """
+    Order that keeps validated raw record and converts customer, product and order_date on first access. Converted
+    values are cached, so every field is converted at most once. Queries that read only some fields, like quantity
+    and category, skip conversion of the others. LazyOrder is equal to Order with the same values and has the same hash
+    """
+    __slots__ = ('_data', '_interner', '_customer', '_product', '_order_date')
+
+    def __init__(self, data: dict[str, Any], interner: 'Interner | None' = None) -> None:
+        """
+        :param data: validated unstandardized order data, it must not be changed afterwards
+        :param interner: optional Interner, when provided identical customers and products are shared between orders
+        """
+        self._data, self._interner = data, interner
+        self._customer = self._product = self._order_date = None
+
+    @property
+    def customer(self) -> Customer:
+        if self._customer is None:
+            data = self._data['customer']
+            self._customer = Customer.from_dict(data) if self._interner is None else self._interner.get_customer(data)
+        return self._customer
+
+    @property
+    def product(self) -> Product:
+        if self._product is None:
+            data = self._data['product']
+            self._product = Product.from_dict(data) if self._interner is None else self._interner.get_product(data)
+        return self._product
+
+    @property
+    def quantity(self) -> int:
+        return self._data['quantity']
+
+    @property
+    def order_date(self) -> datetime:
+        if self._order_date is None:
+            self._order_date = parse_timestamp(self._data['order_date'])
+        return self._order_date
+
+    def _get_values(self) -> tuple[Customer, Product, int, datetime]:
+        return self.customer, self.product, self.quantity, self.order_date
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (Order, LazyOrder)):
+            return self._get_values() == (other.customer, other.product, other.quantity, other.order_date)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._get_values())
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(customer={self.customer!r}, product={self.product!r}, ' \
+               f'quantity={self.quantity!r}, order_date={self.order_date!r})'
+
+    def __reduce__(self) -> tuple:
+        # interner is local to loader, raw record is all that is needed to convert fields again
+        return self.__class__, (self._data,)
+
+    get_total_price = Order.get_total_price
+    get_total_money = Order.get_total_money
+    is_order_in_date_range = Order.is_order_in_date_range
+    is_quantity_equal_to = Order.is_quantity_equal_to
+    is_customer_older_than = Order.is_customer_older_than
+    get_value_after_discount = Order.get_value_after_discount
+
+    def materialize(self) -> Order:
+        """ Converts all fields and returns regular Order """
+        return Order(*self._get_values())
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], interner: 'Interner | None' = None) -> Self:
+        """ The same as Order.from_dict, but fields are converted when they are read """
+        return cls(data, interner)
+
+
+class Interner:
+    """
+    Interner keeps one instance of every distinct Customer and Product created from unstandardized data. Instances are
+    looked up by raw values, so repeated customers and products are neither converted nor allocated again
+    """
+    __slots__ = ('customers', 'products')
+
+    def __init__(self) -> None:
+        self.customers: dict[tuple, Customer] = {}
+        self.products: dict[tuple, Product] = {}
+
+    def get_customer(self, data: dict[str, Any]) -> Customer:
+        """ Returns shared Customer instance for validated customer data """
+        key = (data['name'], data['surname'], data['age'], data['email'])
+        if (customer := self.customers.get(key)) is None:
+            customer = self.customers[key] = Customer(*key)
+        return customer
+
+    def get_product(self, data: dict[str, Any]) -> Product:
+        """ Returns shared Product instance for validated product data """
+        key = (data['name'], data['price'], data['category'])
+        if (product := self.products.get(key)) is None:
+            product = self.products[key] = Product.from_dict(data)
+        return product
@@ -0,0 +1,510 @@
+import os
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from decimal import Decimal
+from heapq import merge
+from itertools import compress, repeat
+from operator import itemgetter, mul
+from typing import Any, Callable, Final, Hashable, Iterable, Self
+
+from ecomerceapp.common.money import Money, rescale
+from ecomerceapp.common.timestamps import to_epoch_microseconds
+from ecomerceapp.common.utils import get_top_k, get_bottom_k
+from ecomerceapp.ecomerce_service.columns import CATEGORIES
+from ecomerceapp.ecomerce_service.date_index import DateIndex
+from ecomerceapp.ecomerce_service.discount import get_default_discount_engine
+from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer, Interner
+from ecomerceapp.ecomerce_service.report import REPORT_METRICS, validate_metrics
+
+
+PARTITION_KEYS: Final = ('month', 'category', 'customer')
+# key -> [value, index of first order that had this key], index is position of order in whole service
+Tally = dict[Any, list]
+
+
+def _add_to_tally(tally: Tally, key: Hashable, amount: Any, index: int) -> None:
+    if (entry := tally.get(key)) is None:
+        tally[key] = [amount, index]
+    else:
+        entry[0] += amount
+
+
+def _merge_tallies(tally: Tally, other: Tally) -> None:
+    """ Adds values of other tally to tally. Equal keys keep the instance that appeared first """
+    for key, (amount, index) in other.items():
+        if (entry := tally.get(key)) is None:
+            tally[key] = [amount, index]
+        elif index < entry[1]:
+            del tally[key]
+            tally[key] = [entry[0] + amount, index]
+        else:
+            entry[0] += amount
+
+
+def _merge_first_indices(tally: Tally, other: Tally) -> None:
+    """ Adds keys of other tally to tally. Values of equal keys are equal, so only index of the first order is kept """
+    for key, (value, index) in other.items():
+        if (entry := tally.get(key)) is None or index < entry[1]:
+            tally[key] = [value, index]
+
+
+def _get_ordered_items(tally: Tally) -> list[tuple[Any, Any]]:
+    """ (key, value) pairs in order of first appearance, like keys of Counter built from all orders """
+    return [(key, amount) for key, (amount, _) in sorted(tally.items(), key=lambda item: item[1][1])]
+
+
+def _get_top(tally: Tally, k: int | None) -> list[Any]:
+    return get_top_k(_get_ordered_items(tally), 1 if k is None else k)
+
+
+def _get_bottom(tally: Tally, k: int | None) -> list[Any]:
+    return get_bottom_k(_get_ordered_items(tally), 1 if k is None else k)
+
+
+@dataclass
+class CatalogTables:
+    """
+    Prices and categories of distinct products and ages of distinct customers, indexed by their ids. It's all that
+    workers need to know about customers and products, so Customer and Product objects never leave main process
+    """
+    price_units: list[int] = field(default_factory=list)
+    price_scales: array = field(default_factory=lambda: array('b'))
+    category_codes: array = field(default_factory=lambda: array('b'))
+    ages: array = field(default_factory=lambda: array('q'))
+
+    def get_prices(self) -> list[Money]:
+        return list(map(Money, self.price_units, self.price_scales))
+
+
+@dataclass
+class OrdersCatalog:
+    """ Distinct customers, products and order dates of service. Partitions store ids of customers and products """
+    customers: list[Customer] = field(default_factory=list)
+    products: list[Product] = field(default_factory=list)
+    # epoch -> the first order date with that instant
+    dates: dict[int, datetime] = field(default_factory=dict)
+    tables: CatalogTables = field(default_factory=CatalogTables)
+    _customer_ids: dict[Customer, int] = field(default_factory=dict, repr=False)
+    _product_ids: dict[Product, int] = field(default_factory=dict, repr=False)
+
+    def get_customer_id(self, customer: Customer) -> int:
+        if (customer_id := self._customer_ids.get(customer)) is None:
+            customer_id = self._customer_ids[customer] = len(self.customers)
+            self.customers.append(customer)
+            self.tables.ages.append(customer.age)
+        return customer_id
+
+    def get_product_id(self, product: Product) -> int:
+        if (product_id := self._product_ids.get(product)) is None:
+            product_id = self._product_ids[product] = len(self.products)
+            self.products.append(product)
+            self.tables.price_units.append(product.price_units)
+            self.tables.price_scales.append(product.price_scale)
+            self.tables.category_codes.append(CATEGORIES.index(product.category))
+        return product_id
+
+
+@dataclass
+class PartitionColumns:
+    """
+    Orders of one partition as arrays of integers, which are pickled to workers as raw bytes. Customers and products
+    are ids of CatalogTables rows, order dates are microseconds since unix epoch and indices are positions of orders in
+    service. Worker attaches tables it received, then columns provide what discount rules read from OrdersColumns
+    """
+    indices: array = field(default_factory=lambda: array('q'))
+    customer_ids: array = field(default_factory=lambda: array('q'))
+    product_ids: array = field(default_factory=lambda: array('q'))
+    quantities: array = field(default_factory=lambda: array('q'))
+    order_dates: array = field(default_factory=lambda: array('q'))
+    months: array = field(default_factory=lambda: array('b'))
+    tables: CatalogTables | None = field(default=None, repr=False, compare=False)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def append(self, index: int, customer_id: int, product_id: int, quantity: int, epoch: int, month: int) -> None:
+        self.indices.append(index)
+        self.customer_ids.append(customer_id)
+        self.product_ids.append(product_id)
+        self.quantities.append(quantity)
+        self.order_dates.append(epoch)
+        self.months.append(month)
+
+    def with_tables(self, tables: CatalogTables) -> Self:
+        return replace(self, tables=tables)
+
+    @property
+    def price_scale(self) -> int:
+        return max(self.tables.price_scales, default=0)
+
+    def get_values(self) -> Iterable[int]:
+        """ Fixed-point value of every order with price_scale digits after decimal point """
+        scale = self.price_scale
+        prices = list(map(rescale, self.tables.price_units, self.tables.price_scales, repeat(scale)))
+        return map(mul, self.quantities, map(prices.__getitem__, self.product_ids))
+
+    def get_customer_ages(self) -> array:
+        return self.tables.ages
+
+    def get_price_scale(self, mask: Iterable[bool]) -> int:
+        """ The largest number of decimal places of prices of orders selected by mask, 0 when none is selected """
+        return max(map(self.tables.price_scales.__getitem__, set(compress(self.product_ids, mask))), default=0)
+
+
+@dataclass
+class PartialAggregates:
+    """
+    Aggregates of one partition that can be merged with aggregates of other partitions. Categories are kept as their
+    codes, customers and products as their ids and dates as epochs, so partials are cheap to pickle back from workers.
+    Every key remembers index of its first order, so merged result resolves ties in the same order as OrdersService
+    does for all orders
+    """
+    categories: Tally = field(default_factory=dict)
+    dates: Tally = field(default_factory=dict)
+    # values of carts are fixed-point integers with carts_scale digits after decimal point
+    carts: Tally = field(default_factory=dict)
+    carts_scale: int = 0
+    months_quantities: Tally = field(default_factory=dict)
+    months_categories: dict[int, Tally] = field(default_factory=dict)
+    # category code -> [top price, [(index, product id) of every order with top price]]
+    most_expensive_products: dict[int, list] = field(default_factory=dict)
+    # category code -> product id -> [price, index]
+    categories_products: dict[int, Tally] = field(default_factory=dict)
+    customers_uniform_quantity: dict[int, int | None] = field(default_factory=dict)
+    date_index: DateIndex = field(default_factory=DateIndex)
+
+    @classmethod
+    def from_columns(cls, columns: PartitionColumns) -> Self:
+        """ :param columns: columns with attached tables """
+        partial, tables = cls(), columns.tables
+        prices = tables.get_prices()
+        for index, customer_id, product_id, quantity, epoch, month in zip(
+                columns.indices, columns.customer_ids, columns.product_ids, columns.quantities, columns.order_dates,
+                columns.months):
+            partial.add(index, customer_id, product_id, quantity, epoch, month, tables.category_codes[product_id],
+                        prices[product_id])
+        return partial
+
+    def add(self, index: int, customer_id: int, product_id: int, quantity: int, epoch: int, month: int,
+            category_code: int, price: Money) -> None:
+        _add_to_tally(self.categories, category_code, 1, index)
+        _add_to_tally(self.dates, epoch, 1, index)
+        if price.scale > self.carts_scale:
+            self._rescale_carts(price.scale)
+        _add_to_tally(self.carts, customer_id, rescale(quantity * price.units, price.scale, self.carts_scale), index)
+        _add_to_tally(self.months_quantities, month, quantity, index)
+        _add_to_tally(self.months_categories.setdefault(month, {}), category_code, 1, index)
+        top = self.most_expensive_products.get(category_code)
+        if top is None or price > top[0]:
+            self.most_expensive_products[category_code] = [price, [(index, product_id)]]
+        elif price == top[0]:
+            top[1].append((index, product_id))
+        self.categories_products.setdefault(category_code, {}).setdefault(product_id, [price, index])
+        if customer_id not in self.customers_uniform_quantity:
+            self.customers_uniform_quantity[customer_id] = quantity
+        elif self.customers_uniform_quantity[customer_id] != quantity:
+            self.customers_uniform_quantity[customer_id] = None
+        self.date_index.add_entry(epoch, quantity, quantity * price.units, price.scale)
+
+    def _rescale_carts(self, scale: int) -> None:
+        factor = 10 ** (scale - self.carts_scale)
+        for entry in self.carts.values():
+            entry[0] *= factor
+        self.carts_scale = scale
+
+    def merge(self, other: Self) -> None:
+        """
+        Adds other partial aggregates to these ones, both have to come from different orders of one service. Date
+        index is not merged, date range queries read indices of partitions
+        """
+        for name in ('categories', 'dates', 'months_quantities'):
+            _merge_tallies(getattr(self, name), getattr(other, name))
+        if other.carts_scale > self.carts_scale:
+            self._rescale_carts(other.carts_scale)
+        _merge_tallies(self.carts, other.carts if other.carts_scale == self.carts_scale else {
+            customer_id: [rescale(amount, other.carts_scale, self.carts_scale), index]
+            for customer_id, (amount, index) in other.carts.items()})
+        for month, categories in other.months_categories.items():
+            _merge_tallies(self.months_categories.setdefault(month, {}), categories)
+        for category_code, (price, products) in other.most_expensive_products.items():
+            top = self.most_expensive_products.get(category_code)
+            if top is None or price > top[0]:
+                self.most_expensive_products[category_code] = [price, list(products)]
+            elif price == top[0]:
+                top[1] = list(merge(top[1], products, key=lambda entry: entry[0]))
+        for category_code, products in other.categories_products.items():
+            _merge_first_indices(self.categories_products.setdefault(category_code, {}), products)
+        for customer_id, quantity in other.customers_uniform_quantity.items():
+            if customer_id not in self.customers_uniform_quantity:
+                self.customers_uniform_quantity[customer_id] = quantity
+            elif self.customers_uniform_quantity[customer_id] != quantity:
+                self.customers_uniform_quantity[customer_id] = None
+
+    def get_most_expensive_products_per_category(self, k: int | None = None) -> dict[int, list[int]]:
+        """ :return: category code -> product ids """
+        category_codes = [category_code for category_code, _ in _get_ordered_items(self.categories)]
+        if k is not None:
+            return {category_code: get_top_k(_get_ordered_items(self.categories_products[category_code]), k)
+                    for category_code in category_codes}
+        return {category_code: [product_id for _, product_id in self.most_expensive_products[category_code][1]]
+                for category_code in category_codes}
+
+    def get_date_with_most_orders_made(self, k: int | None = None) -> list[int]:
+        return _get_top(self.dates, k)
+
+    def get_date_with_least_orders_made(self, k: int | None = None) -> list[int]:
+        return _get_bottom(self.dates, k)
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[int]:
+        return _get_top(self.carts, k)
+
+    def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
+        return sum(quantity == n for quantity in self.customers_uniform_quantity.values())
+
+    def get_most_popular_category(self, k: int | None = None) -> list[int]:
+        return _get_top(self.categories, k)
+
+    def get_months_with_quantity_of_ordered_products(self) -> dict[int, int]:
+        return dict(sorted(_get_ordered_items(self.months_quantities), key=lambda m_q: m_q[1], reverse=True))
+
+    def get_most_popular_categories_for_months_that_orders_occurred(self) -> dict[int, list[int]]:
+        return {month: _get_top(self.months_categories[month], None) for month, _ in
+                _get_ordered_items(self.months_quantities)}
+
+
+def aggregate_partition(columns: PartitionColumns, tables: CatalogTables) -> PartialAggregates:
+    """ Map step executed in worker process """
+    return PartialAggregates.from_columns(columns.with_tables(tables))
+
+
+def get_partition_discounted_value(columns: PartitionColumns, tables: CatalogTables,
+                                   reference_time: datetime) -> Decimal:
+    """ Map step of discounts, rates depend on reference time, so they can't be aggregated in advance """
+    return get_default_discount_engine().get_columns_value_after_discounts(columns.with_tables(tables), reference_time)
+
+
+@dataclass
+class Partition:
+    """
+    Orders of one partition, the same orders as columns that are sent to workers, and range of their dates in
+    microseconds since unix epoch
+    """
+    orders: list[Order] = field(default_factory=list)
+    columns: PartitionColumns = field(default_factory=PartitionColumns)
+    min_date: int | None = None
+    max_date: int | None = None
+    # None when orders were added after aggregates were computed
+    partial: PartialAggregates | None = None
+
+    def add(self, order: Order, index: int, catalog: OrdersCatalog) -> None:
+        order_date = order.order_date
+        epoch = to_epoch_microseconds(order_date)
+        catalog.dates.setdefault(epoch, order_date)
+        self.orders.append(order)
+        self.columns.append(index, catalog.get_customer_id(order.customer), catalog.get_product_id(order.product),
+                            order.quantity, epoch, order_date.month)
+        if self.min_date is None or epoch < self.min_date:
+            self.min_date = epoch
+        if self.max_date is None or epoch > self.max_date:
+            self.max_date = epoch
+        self.partial = None
+
+    def is_in_date_range(self, start_date: datetime, end_date: datetime) -> bool:
+        return self.min_date is not None and self.min_date <= to_epoch_microseconds(end_date) and \
+            self.max_date >= to_epoch_microseconds(start_date)
+
+
+class PartitionedOrdersService:
+    """
+    OrdersService split into partitions by month of order date, by category or by hash of customer. Aggregates are
+    computed per partition in process pool, cached until partition changes and merged for every query. Workers get
+    integer columns of partitions and tables of prices, categories and ages, and they return tallies keyed by ids, which
+    are turned back into customers, products and dates only for results of queries. Date range queries skip partitions
+    without orders in range, month and category filters skip partitions of other months or categories when service is
+    partitioned by them
+    """
+
+    def __init__(self, orders: Iterable[Order] = (), partition_by: str = 'month', partitions_count: int = 16,
+                 workers: int | None = None) -> None:
+        """
+        :param orders: initial orders
+        :param partition_by: one of PARTITION_KEYS
+        :param partitions_count: number of partitions when orders are partitioned by customer
+        :param workers: number of worker processes, os.cpu_count() by default, 1 computes partitions in this process
+        """
+        if partition_by not in PARTITION_KEYS:
+            raise ValueError(f'partition_by has to be one of: {", ".join(PARTITION_KEYS)}')
+        if not isinstance(partitions_count, int) or partitions_count < 1:
+            raise ValueError('partitions_count has to be positive integer')
+        workers = workers or os.cpu_count() or 1
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers has to be positive integer')
+        self.partition_by, self.partitions_count, self.workers = partition_by, partitions_count, workers
+        self.partitions: dict[Hashable, Partition] = {}
+        self.orders_count = 0
+        self._interner = Interner()
+        self._catalog = OrdersCatalog()
+        self._executor: ProcessPoolExecutor | None = None
+        self._merged: PartialAggregates | None = None
+        self.add_orders(orders)
+
+    def __len__(self) -> int:
+        return self.orders_count
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ Shuts down worker processes, they are started again by next query that needs them """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def get_partition_key(self, order: Order) -> Hashable:
+        match self.partition_by:
+            case 'month':
+                return order.order_date.year, order.order_date.month
+            case 'category':
+                return order.product.category
+            case _:
+                return hash(order.customer) % self.partitions_count
+
+    def add_order_from_dict(self, order_data: dict[str, Any]) -> None:
+        """ Ads single order from unstandardized data dict to orders pool"""
+        self.add_orders([Order.from_dict(order_data, self._interner)])
+
+    def add_orders(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            key = self.get_partition_key(order)
+            if (partition := self.partitions.get(key)) is None:
+                partition = self.partitions[key] = Partition()
+            partition.add(order, self.orders_count, self._catalog)
+            self.orders_count += 1
+            self._merged = None
+
+    def _map(self, function: Callable, arguments: list[tuple]) -> list[Any]:
+        if self.workers == 1 or len(arguments) < 2:
+            return [function(*args) for args in arguments]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self._executor.map(function, *zip(*arguments)))
+
+    def _get_partitions(self, months: set[int] | None, categories: set[Category] | None) -> list[Partition] | None:
+        """ Partitions that can contain orders of given months and categories, None when filters don't skip any """
+        if months is not None and self.partition_by == 'month':
+            return [partition for (_, month), partition in self.partitions.items() if month in months]
+        if categories is not None and self.partition_by == 'category':
+            return [partition for category, partition in self.partitions.items() if category in categories]
+        return None
+
+    def _update_partials(self, partitions: Iterable[Partition]) -> None:
+        """ Computes aggregates of partitions that changed since last query in process pool """
+        outdated = [partition for partition in partitions if partition.partial is None]
+        partials = self._map(aggregate_partition,
+                             [(partition.columns, self._catalog.tables) for partition in outdated])
+        for partition, partial in zip(outdated, partials):
+            partition.partial = partial
+
+    def _get_aggregates(self, months: Iterable[int] | None = None,
+                        categories: Iterable[Category] | None = None) -> PartialAggregates:
+        """ Merged aggregates of partitions that can contain orders of given months and categories """
+        partitions = self._get_partitions(None if months is None else set(months),
+                                          None if categories is None else set(categories))
+        if partitions is None and self._merged is not None:
+            return self._merged
+        self._update_partials(self.partitions.values() if partitions is None else partitions)
+        merged = PartialAggregates()
+        for partition in self.partitions.values() if partitions is None else partitions:
+            merged.merge(partition.partial)
+        if partitions is None:
+            self._merged = merged
+        return merged
+
+    def _get_date_range_totals(self, start_date: datetime, end_date: datetime) -> tuple[int, int, Money]:
+        partitions = [p for p in self.partitions.values() if p.is_in_date_range(start_date, end_date)]
+        self._update_partials(partitions)
+        count, quantity, value = 0, 0, Money(0)
+        for partition in partitions:
+            totals = partition.partial.date_index.get_totals(start_date, end_date)
+            count, quantity, value = count + totals[0], quantity + totals[1], value + totals[2]
+        return count, quantity, value
+
+    def get_average_product_price_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal:
+        _, products_count, products_value = self._get_date_range_totals(start_date, end_date)
+        if products_count == 0:
+            raise ZeroDivisionError('product_count equals 0 therefore it cannot be valid divisor')
+        return products_value.to_decimal() / Decimal(products_count)
+
+    def get_orders_count_in_date_range(self, start_date: datetime, end_date: datetime) -> int:
+        return self._get_date_range_totals(start_date, end_date)[0]
+
+    def get_orders_value_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal:
+        return self._get_date_range_totals(start_date, end_date)[2].to_decimal()
+
+    def get_most_expensive_products_per_category(self, k: int | None = None,
+                                                 categories: Iterable[Category] | None = None
+                                                 ) -> dict[Category, list[Product]]:
+        """ :param categories: only these categories are returned, None means all of them """
+        categories = None if categories is None else set(categories)
+        result = self._get_aggregates(categories=categories).get_most_expensive_products_per_category(k)
+        products = self._catalog.products
+        return {CATEGORIES[code]: [products[product_id] for product_id in product_ids]
+                for code, product_ids in result.items() if categories is None or CATEGORIES[code] in categories}
+
+    def get_customers_orders_summary(self) -> dict[Customer, list[dict[str, Any]]]:
+        """ Summary holds every order, so it's built from orders of partitions merged back into service order """
+        summary = {}
+        for _, order in merge(*(zip(partition.columns.indices, partition.orders)
+                                for partition in self.partitions.values()), key=itemgetter(0)):
+            summary.setdefault(order.customer, []).append({"product": order.product, "quantity": order.quantity})
+        return summary
+
+    def get_date_with_most_orders_made(self, k: int | None = None) -> list[datetime]:
+        return [self._catalog.dates[epoch] for epoch in self._get_aggregates().get_date_with_most_orders_made(k)]
+
+    def get_date_with_least_orders_made(self, k: int | None = None) -> list[datetime]:
+        return [self._catalog.dates[epoch] for epoch in self._get_aggregates().get_date_with_least_orders_made(k)]
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
+        return [self._catalog.customers[customer_id]
+                for customer_id in self._get_aggregates().get_client_with_most_valuable_cart(k)]
+
+    def get_orders_value_after_discounts(self, reference_time: datetime | None = None) -> Decimal:
+        reference_time = reference_time or datetime.now(tz=timezone.utc)
+        return sum(self._map(get_partition_discounted_value,
+                             [(partition.columns, self._catalog.tables, reference_time)
+                              for partition in self.partitions.values()]),
+                   Decimal('0'))
+
+    def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
+        return self._get_aggregates().get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    def get_most_popular_category(self, k: int | None = None) -> list[Category]:
+        return [CATEGORIES[code] for code in self._get_aggregates().get_most_popular_category(k)]
+
+    def get_months_with_quantity_of_ordered_products(self, months: Iterable[int] | None = None) -> dict[int, int]:
+        """ :param months: only these months are returned, None means all of them """
+        months = None if months is None else set(months)
+        result = self._get_aggregates(months=months).get_months_with_quantity_of_ordered_products()
+        return result if months is None else {month: q for month, q in result.items() if month in months}
+
+    def get_most_popular_categories_for_months_that_orders_occurred(self, months: Iterable[int] | None = None
+                                                                    ) -> dict[int, list[Category]]:
+        """ :param months: only these months are returned, None means all of them """
+        months = None if months is None else set(months)
+        result = self._get_aggregates(months=months).get_most_popular_categories_for_months_that_orders_occurred()
+        return {month: [CATEGORIES[code] for code in codes] for month, codes in result.items()
+                if months is None or month in months}
+
+    def get_report(self, metrics: Iterable[str] = REPORT_METRICS,
+                   arguments: dict[str, tuple] | None = None) -> dict[str, Any]:
+        """ The same report as OrdersService.get_report, aggregates of partitions are merged once for all metrics """
+        arguments = arguments or {}
+        return {metric: getattr(self, metric)(*arguments.get(metric, ()))
+                for metric in validate_metrics(metrics, arguments)}
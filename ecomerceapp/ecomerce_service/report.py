@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Final, Iterable
+
+from ecomerceapp.common.money import rescale, to_decimal
+from ecomerceapp.ecomerce_service.aggregates import OrdersAggregates
+from ecomerceapp.ecomerce_service.discount import DiscountedValue, get_default_discount_engine
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+
+
+# metric name (the same as OrdersService method name) -> aggregate part that it is computed from
+AGGREGATE_METRICS: Final = {
+    'get_most_expensive_products_per_category': 'most_expensive_products',
+    'get_customers_orders_summary': 'customers_orders',
+    'get_date_with_most_orders_made': 'dates',
+    'get_date_with_least_orders_made': 'dates',
+    'get_client_with_most_valuable_cart': 'carts',
+    'get_clients_num_that_ordered_at_least_n_products_per_transaction': 'customers_quantities',
+    'get_most_popular_category': 'categories',
+    'get_months_with_quantity_of_ordered_products': 'months',
+    'get_most_popular_categories_for_months_that_orders_occurred': 'months',
+}
+DATE_RANGE_METRICS: Final = (
+    'get_average_product_price_in_date_range', 'get_orders_count_in_date_range', 'get_orders_value_in_date_range'
+)
+REPORT_METRICS: Final = (*AGGREGATE_METRICS, *DATE_RANGE_METRICS, 'get_orders_value_after_discounts')
+# metrics that accept k, number of returned elements with ties
+TOP_K_METRICS: Final = (
+    'get_most_expensive_products_per_category', 'get_date_with_most_orders_made', 'get_date_with_least_orders_made',
+    'get_client_with_most_valuable_cart', 'get_most_popular_category'
+)
+# metrics that can't be computed without arguments, with names of those arguments
+METRICS_ARGUMENTS: Final = {
+    'get_clients_num_that_ordered_at_least_n_products_per_transaction': ('n',),
+    **{metric: ('start_date', 'end_date') for metric in DATE_RANGE_METRICS},
+}
+
+
+@dataclass
+class DateRangeTotals:
+    """
+    Count, quantity and value of orders made in one date range, both ends inclusive. Value is fixed-point integer with
+    value_scale digits after decimal point, the largest scale of prices summed so far
+    """
+    start_date: datetime
+    end_date: datetime
+    count: int = 0
+    quantity: int = 0
+    value_units: int = 0
+    value_scale: int = 0
+
+    def add(self, order: Order) -> None:
+        if order.is_order_in_date_range(self.start_date, self.end_date):
+            product = order.product
+            self.count += 1
+            self.quantity += order.quantity
+            if product.price_scale > self.value_scale:
+                self.value_units = rescale(self.value_units, self.value_scale, product.price_scale)
+                self.value_scale = product.price_scale
+            self.value_units += rescale(order.quantity * product.price_units, product.price_scale, self.value_scale)
+
+    def get_metric(self, metric: str) -> int | Decimal:
+        if metric == 'get_orders_count_in_date_range':
+            return self.count
+        value = to_decimal(self.value_units, self.value_scale)
+        if metric == 'get_orders_value_in_date_range':
+            return value
+        if self.quantity == 0:
+            raise ZeroDivisionError('product_count equals 0 therefore it cannot be valid divisor')
+        return value / Decimal(self.quantity)
+
+
+def validate_metrics(metrics: Iterable[str], arguments: dict[str, tuple]) -> tuple[str, ...]:
+    """
+    Checks that every metric is known and has its arguments
+    :return: metrics as tuple, without duplicates
+    """
+    metrics = tuple(dict.fromkeys(metrics))
+    if unknown_metrics := [metric for metric in metrics if metric not in REPORT_METRICS]:
+        raise ValueError(f'Unknown metrics: {", ".join(unknown_metrics)}')
+    for metric in metrics:
+        if len(arguments.get(metric, ())) < len(METRICS_ARGUMENTS.get(metric, ())):
+            raise ValueError(f'{metric} requires arguments: {", ".join(METRICS_ARGUMENTS[metric])}')
+    return metrics
+
+
+def build_report(orders: Iterable[Order], metrics: Iterable[str] = REPORT_METRICS,
+                 arguments: dict[str, tuple] | None = None) -> dict[str, Any]:
+    """
+    Computes chosen metrics in one pass over orders. Metrics that need the same grouping share it, for example most and
+    least busy dates use one date counter. Orders can be any iterable, also stream from loader, and they are not stored
+    :param orders: iterable of orders
+    :param metrics: names of OrdersService methods, REPORT_METRICS by default
+    :param arguments: arguments of metrics that require or accept them, for example
+                      {'get_average_product_price_in_date_range': (start_date, end_date), 'get_most_popular_category': (3,)}
+    :return: dict with metric name as a key and the same value that OrdersService method returns
+    """
+    arguments = arguments or {}
+    metrics = validate_metrics(metrics, arguments)
+    parts = tuple(dict.fromkeys(AGGREGATE_METRICS[metric] for metric in metrics if metric in AGGREGATE_METRICS))
+    aggregates = OrdersAggregates(parts) if parts else None
+    date_ranges = {arguments[metric]: DateRangeTotals(*arguments[metric])
+                   for metric in metrics if metric in DATE_RANGE_METRICS}
+    discounted_value = None
+    if 'get_orders_value_after_discounts' in metrics:
+        discounted_value = DiscountedValue(
+            get_default_discount_engine().get_rate_function(*arguments.get('get_orders_value_after_discounts', ())))
+
+    updaters = [totals.add for totals in date_ranges.values()]
+    if aggregates is not None:
+        updaters.append(aggregates.add)
+    if discounted_value is not None:
+        updaters.append(discounted_value.add)
+    for order in orders:
+        for update in updaters:
+            update(order)
+
+    report = {}
+    for metric in metrics:
+        if metric in AGGREGATE_METRICS:
+            report[metric] = getattr(aggregates, metric)(*arguments.get(metric, ()))
+        elif metric in DATE_RANGE_METRICS:
+            report[metric] = date_ranges[arguments[metric]].get_metric(metric)
+        else:
+            report[metric] = discounted_value.get_value()
+    return report
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    Converts metric value into json serializable one. Decimals become strings, so no precision is lost, dates are
+    isoformat strings and categories are their names. Dicts with keys that can't be json keys, like customers,
+    become lists of {"key": ..., "value": ...} objects in the same order
+    """
+    match value:
+        case Decimal():
+            return str(value)
+        case datetime():
+            return value.isoformat()
+        case Category():
+            return value.name
+        case Customer():
+            return {'name': value.name, 'surname': value.surname, 'age': value.age, 'email': value.email}
+        case Product():
+            return {'name': value.name, 'price': str(value.price), 'category': value.category.name}
+        case dict() if all(isinstance(key, (str, int, Category)) for key in value):
+            return {to_json_value(key): to_json_value(item) for key, item in value.items()}
+        case dict():
+            return [{'key': to_json_value(key), 'value': to_json_value(item)} for key, item in value.items()]
+        case list() | tuple():
+            return [to_json_value(item) for item in value]
+    return value
@@ -1,30 +1,173 @@
 import logging
 
-from collections import defaultdict, Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable, Self
 
-from ecomerceapp.common.utils import get_n_top_elements_of_most_common_list
-from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer
+from ecomerceapp.common.cache import DEFAULT_CACHE_SIZE, CacheStats, ResultCache, cached_query
+from ecomerceapp.common.metrics import instrument_methods
+from ecomerceapp.ecomerce_service.aggregates import OrdersAggregates
+from ecomerceapp.ecomerce_service.columns import OrdersColumns
+from ecomerceapp.ecomerce_service.date_index import DateIndex
+from ecomerceapp.ecomerce_service.discount import get_default_discount_engine
+from ecomerceapp.ecomerce_service.histograms import OrdersHistograms, TimeHistogram
+from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer, Interner
+from ecomerceapp.ecomerce_service.report import REPORT_METRICS, validate_metrics
+from ecomerceapp.ecomerce_service.snapshot import read_snapshot, write_snapshot
 
 
 logger = logging.getLogger(__name__)
 
 
+@instrument_methods
 @dataclass
 class OrdersService:
-    """ OrdersService job is to manage orders pool. It has to provide certain data about orders itself according to business logic"""
+    """
+    OrdersService job is to manage orders pool. It has to provide certain data about orders itself according to business logic.
+    Orders list may be appended to or replaced as a whole, after any other change of it, like orders[i] = order,
+    invalidate has to be called
+    """
     orders: list[Order]
+    cache_size: int = DEFAULT_CACHE_SIZE
+    result_cache: ResultCache = field(init=False, repr=False, compare=False)
+    _columns: OrdersColumns = field(default_factory=OrdersColumns, init=False, repr=False, compare=False)
+    _aggregates: OrdersAggregates = field(default_factory=OrdersAggregates, init=False, repr=False, compare=False)
+    _date_index: DateIndex = field(default_factory=DateIndex, init=False, repr=False, compare=False)
+    _histograms: OrdersHistograms = field(default_factory=OrdersHistograms, init=False, repr=False, compare=False)
+    _synced_orders: list[Order] | None = field(default=None, init=False, repr=False, compare=False)
+    _interner: Interner = field(default_factory=Interner, init=False, repr=False, compare=False)
+    _version: int = field(default=0, init=False, repr=False, compare=False)
+    _versioned_orders: list[Order] | None = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
+        self.result_cache = ResultCache(self.cache_size)
         logger.info("Orders service was initialized successfully")
 
+    def _sync(self, view: OrdersColumns | OrdersAggregates | DateIndex | OrdersHistograms
+              ) -> OrdersColumns | OrdersAggregates | DateIndex | OrdersHistograms:
+        """
+        Brings view maintained next to orders pool up to date. Orders appended since last sync are added to it, view is
+        rebuilt only when orders list was replaced or shortened
+        :param view: any object with __len__, clear and extend methods
+        :return: the same view
+        """
+        self._clear_views_of_replaced_orders()
+        if len(view) > len(self.orders):
+            view.clear()
+        if len(view) < len(self.orders):
+            view.extend(self.orders[len(view):])
+        return view
+
+    def _clear_views_of_replaced_orders(self) -> None:
+        if self._synced_orders is not self.orders:
+            self._synced_orders = self.orders
+            for maintained_view in (self._columns, self._aggregates, self._date_index, self._histograms):
+                maintained_view.clear()
+
+    def _get_aggregates(self, *parts: str) -> OrdersAggregates:
+        """
+        Aggregates with chosen parts up to date, so query reads only fields of orders that its parts are built from
+        :param parts: parts of AGGREGATE_PARTS, no parts means all of them
+        """
+        self._clear_views_of_replaced_orders()
+        return self._aggregates.sync(self.orders, parts or None)
+
+    def invalidate(self) -> None:
+        """ Drops views and cached results, they are built again from orders list that was changed in place """
+        self._synced_orders = None
+        self._version += 1
+
+    def get_version(self) -> tuple[int, int]:
+        """
+        Version of orders pool that cached query results are tied to. It changes when orders are added through service,
+        appended to orders list directly, when orders list is replaced or when invalidate is called
+        """
+        if self._versioned_orders is not self.orders:
+            self._versioned_orders = self.orders
+            self._version += 1
+        return self._version, len(self.orders)
+
+    def get_cache_stats(self) -> CacheStats:
+        """ Hits, misses and evictions of query results cache """
+        return self.result_cache.get_stats()
+
+    @property
+    def columns(self) -> OrdersColumns:
+        """ Columnar copy of orders pool that provides vectorized versions of service queries """
+        return self._sync(self._columns)
+
+    @property
+    def aggregates(self) -> OrdersAggregates:
+        """
+        Running counters and sums of orders pool that answer service queries without scanning orders. Every part is
+        synced here, queries sync only parts they read
+        """
+        return self._get_aggregates()
+
+    @property
+    def date_index(self) -> DateIndex:
+        """ Orders sorted by date with prefix sums, answers date range queries in O(log n) """
+        return self._sync(self._date_index)
+
+    @property
+    def histograms(self) -> OrdersHistograms:
+        """ Hourly, daily, weekly and monthly histograms of orders with prefix sums over their buckets """
+        return self._sync(self._histograms)
+
+    def _get_histogram(self, granularity: str | None, start_date: datetime | None,
+                       end_date: datetime | None) -> TimeHistogram | None:
+        """ Histogram of granularity, None when query is about exact order dates """
+        if granularity is None:
+            if start_date is not None or end_date is not None:
+                raise ValueError('start_date and end_date require granularity')
+            return None
+        return self.histograms[granularity]
+
     def add_order_from_dict(self, order_data: dict[str, Any]) -> None:
         """ Ads single order from unstandardized data dict to orders pool"""
-        self.orders.append(Order.from_dict(order_data))
+        self.orders.append(Order.from_dict(order_data, self._interner))
+        self._version += 1
+
+    def add_orders(self, orders: Iterable[Order]) -> None:
+        """
+        Consumes any iterable of orders, for example loader.stream_orders, and appends them to orders pool. Views are
+        synced by the first query that needs them, so fields of LazyOrder objects are not converted here
+        """
+        self.orders.extend(orders)
+        self._version += 1
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Order]) -> Self:
+        """ Creates service directly from iterable of orders, so raw data doesn't have to be kept in memory """
+        service = cls([])
+        service.add_orders(orders)
+        return service
+
+    @classmethod
+    def from_snapshot(cls, filepath: str) -> Self:
+        """ Creates service from binary snapshot saved by save_snapshot. Orders in snapshot are not validated again """
+        return cls.from_orders(read_snapshot(filepath))
+
+    def save_snapshot(self, filepath: str) -> None:
+        """ Saves orders pool in compact binary snapshot, which is much faster to load than json file """
+        write_snapshot(self.orders, filepath)
+        logger.info(f'Snapshot of {len(self.orders)} orders was saved to {filepath}')
+
+    def get_report(self, metrics: Iterable[str] = REPORT_METRICS,
+                   arguments: dict[str, tuple] | None = None) -> dict[str, Any]:
+        """
+        Method returns chosen metrics at once, in the same structure as report.build_report does. Metrics are answered
+        from views maintained next to orders pool, so orders are not scanned once per metric
+        :param metrics: names of service methods, all report metrics by default
+        :param arguments: arguments of metrics that require them, with metric name as a key
+        :return: dict with metric name as a key and value returned by that method
+        """
+        arguments = arguments or {}
+        return {metric: getattr(self, metric)(*arguments.get(metric, ()))
+                for metric in validate_metrics(metrics, arguments)}
 
+    @cached_query
     def get_average_product_price_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal | None:
         """
         Method takes date range as an arguments and calculate average product price that was ordered in that period.
@@ -32,159 +175,162 @@ class OrdersService:
         :param end_date: datetime argument
         :return: average product price or None if there was no sales in that period
         """
-        valid_orders = [order for order in self.orders if order.is_order_in_date_range(start_date, end_date)]
-        products_count = Decimal(sum([order.quantity for order in valid_orders]))
-        if products_count == 0:
-            raise ZeroDivisionError('product_count equals 0 therefore it cannot be valid divisor')
-        products_value = sum([order.get_total_price() for order in valid_orders])
-
-        return products_value / products_count
-
-    def get_most_expensive_products_per_category(self) -> dict[Category, list[Product]]:
-        """ :return: dict that has a category as a key and list of most expensive products per category as a value
+        return self.date_index.get_average_product_price(start_date, end_date)
+
+    @cached_query
+    def get_orders_count_in_date_range(self, start_date: datetime, end_date: datetime) -> int:
+        """ Method returns number of orders made between start_date and end_date, both inclusive """
+        return self.date_index.get_orders_count(start_date, end_date)
+
+    @cached_query
+    def get_orders_value_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal:
+        """ Method returns total value of orders made between start_date and end_date, both inclusive """
+        return self.date_index.get_orders_value(start_date, end_date)
+
+    @cached_query
+    def get_most_expensive_products_per_category(self, k: int | None = None) -> dict[Category, list[Product]]:
+        """ :param k: number of distinct products per category, products with the same price as k-th one are included.
+                      None means only products with top price
+            :return: dict that has a category as a key and list of most expensive products per category as a value
         """
-
-        def get_many_products_if_same_price(products: list[Product]) -> list[Product]:
-            """
-            Auxiliary function that returns list of one element if there is one most common element or list of n elements
-            if there is n most common elements
-            :param products: elements that have same category
-            :return: list of n elements with highiest price
-            """
-
-            def is_price_higher_than_next_product(i: int):
-                """
-                checks if product that is next in the list is also to product with top price
-                :param i:
-                :return: True when i is first or last in list or if product under this index has same price as previous one
-                         False if price is different
-                """
-                if i == 0:
-                    return True
-                if i == len(products):
-                    return True
-                return True if products[i - 1].price == products[i].price else False
-
-            return [products[i] for i in range(len(products)) if is_price_higher_than_next_product(i)]
-
-        category_and_products = defaultdict(list)
-
-        for order in self.orders:
-            category_and_products[order.product.category].append(order.product)
-
-        for category in category_and_products:
-            category_and_products[category] = get_many_products_if_same_price(
-                sorted(category_and_products[category], reverse=True, key=lambda product: product.price))
-
-        return dict(category_and_products)
+        return self._get_aggregates('most_expensive_products').get_most_expensive_products_per_category(k)
 
     def get_customers_orders_summary(self) -> dict[Customer, list[dict[str, Any]]]:
         """
-        method that have to return summary of customers with all of their ordered products
+        method that have to return summary of customers with all of their ordered products. It's not cached, summary
+        holds every order, so copy of cached one would cost as much as building it from customer index again
         :return: dict where key is a customer and value is a list of
         """
-        customer_and_products = defaultdict(list)
+        return self._get_aggregates('customers_orders').get_customers_orders_summary()
 
-        for order in self.orders:
-            customer_and_products[order.customer].append(
-                {"product": order.product, "quantity": order.quantity})
+    @cached_query
+    def get_customer_orders(self, customer: Customer) -> list[Order]:
+        """
+        Method returns all orders of customer in order they were added, looked up in customer index instead of scanning
+        orders pool
+        """
+        positions = self._get_aggregates('customers_orders').customers.get_customer_positions(customer)
+        return [self.orders[position] for position in positions]
 
-        return dict(customer_and_products)
+    @cached_query
+    def get_orders_with_quantity(self, n: int) -> list[Order]:
+        """
+        Method returns orders with quantity equal to n, in orders pool order. Customers that never ordered n products
+        are skipped after comparing n with their lowest and highest quantity
+        """
+        positions = self._get_aggregates('customers_orders').customers.get_positions_with_quantity(n)
+        return [self.orders[position] for position in positions]
 
-    def get_date_with_most_orders_made(self) -> list[datetime]:
+    @cached_query
+    def get_date_with_most_orders_made(self, k: int | None = None, granularity: str | None = None,
+                                       start_date: datetime | None = None,
+                                       end_date: datetime | None = None) -> list[datetime]:
         """
         Method returns list of n dates that are busiest in therms of orders made
+        :param k: number of dates, dates tied with k-th one are included. None means only the busiest dates
+        :param granularity: 'hour', 'day', 'week' or 'month', orders are counted per bucket of that length (UTC) and
+                            beginnings of buckets are returned. None means exact order dates
+        :param start_date: the first bucket of searched window, requires granularity
+        :param end_date: the last bucket of searched window, requires granularity
         :return: list of n datetime objects
         """
-
-        dates_with_quantities: list = Counter([order.order_date for order in self.orders]).most_common()
-        return [date for date, _ in
-                dates_with_quantities[:get_n_top_elements_of_most_common_list(dates_with_quantities)]]
-
-    def get_date_with_least_orders_made(self) -> list[datetime]:
+        if (histogram := self._get_histogram(granularity, start_date, end_date)) is not None:
+            return histogram.get_busiest(k, start_date, end_date)
+        return self._get_aggregates('dates').get_date_with_most_orders_made(k)
+
+    @cached_query
+    def get_date_with_least_orders_made(self, k: int | None = None, granularity: str | None = None,
+                                        start_date: datetime | None = None,
+                                        end_date: datetime | None = None) -> list[datetime]:
         """
         Method returns list of n dates that are the least busy in therms of orders made
+        :param k: number of dates, dates tied with k-th one are included. None means only the least busy dates
+        :param granularity: 'hour', 'day', 'week' or 'month', orders are counted per bucket of that length (UTC) and
+                            beginnings of buckets with any orders are returned. None means exact order dates
+        :param start_date: the first bucket of searched window, requires granularity
+        :param end_date: the last bucket of searched window, requires granularity
         :return: list of datetime objects
         """
-        dates_with_quantities: list = Counter([order.order_date for order in self.orders]).most_common()
-        dates_with_quantities.reverse()
-        return [date for date, _ in
-                dates_with_quantities[:get_n_top_elements_of_most_common_list(dates_with_quantities)]]
+        if (histogram := self._get_histogram(granularity, start_date, end_date)) is not None:
+            return histogram.get_quietest(k, start_date, end_date)
+        return self._get_aggregates('dates').get_date_with_least_orders_made(k)
+
+    @cached_query
+    def get_orders_histogram(self, granularity: str, start_date: datetime | None = None,
+                             end_date: datetime | None = None) -> dict[datetime, dict[str, Any]]:
+        """
+        :param granularity: 'hour', 'day', 'week' or 'month'
+        :return: beginning of every bucket between buckets of start_date and end_date that had orders, with count,
+                 quantity and value of its orders
+        """
+        return self.histograms[granularity].get_buckets(start_date, end_date)
 
-    def get_client_with_most_valuable_cart(self) -> list[Customer]:
+    @cached_query
+    def get_orders_totals_in_buckets(self, granularity: str, start_date: datetime | None = None,
+                                     end_date: datetime | None = None) -> dict[str, Any]:
+        """
+        Count, quantity and value of orders in whole buckets from the one that contains start_date to the one that
+        contains end_date, computed from prefix sums of histogram
+        """
+        return self.histograms[granularity].get_totals(start_date, end_date)
+
+    @cached_query
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
         """
         Method returns list of n clients that have most valuable carts(orders)
+        :param k: number of clients, clients tied with k-th one are included. None means only clients with top value
         :return: list of Customer objects
         """
-        counter = Counter()
-        for order in self.orders:
-            counter[order.customer] += order.get_total_price()
-        counter = counter.most_common()
-        return [customer for customer, _ in counter[:get_n_top_elements_of_most_common_list(counter)]]
+        return self._get_aggregates('carts').get_client_with_most_valuable_cart(k)
 
-    def get_orders_value_after_discounts(self) -> Decimal:
+    def get_orders_value_after_discounts(self, reference_time: datetime | None = None) -> Decimal:
         """
         Method calculates value of all orders with discounts applied.
         Rules of discounts:
             - order that is made by a customer that is 25 years old or younger receives 3% discount
             - order that is made in two days time from today gets 2% discount
+        :param reference_time: moment that 'today' refers to, now by default
         :return: total orders value after discount
         """
-        return sum([order.get_value_after_discount() for order in self.orders])
+        if reference_time is None:
+            # result depends on current time, so it can't be cached
+            return get_default_discount_engine().get_orders_value_after_discounts(self.orders, reference_time)
+        return self._get_orders_value_after_discounts(reference_time)
+
+    @cached_query
+    def _get_orders_value_after_discounts(self, reference_time: datetime) -> Decimal:
+        return get_default_discount_engine().get_orders_value_after_discounts(self.orders, reference_time)
 
+    @cached_query
     def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
         """
         Method has to check how many clients ordered at least n products per transaction
         :param n: minimal quantity per order
         :return: number of customers that matched
         """
-        client_and_orders = defaultdict(list)
-
-        for order in self.orders:
-            client_and_orders[order.customer].append(order)
+        return self._get_aggregates('customers_quantities') \
+            .get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
 
-        valid_clients = 0
-        for client in client_and_orders:
-            if len(client_and_orders[client]) == len(
-                    [order for order in client_and_orders[client] if order.is_quantity_equal_to(n)]):
-                valid_clients += 1
-
-        return valid_clients
-
-    def get_most_popular_category(self) -> list[Category]:
+    @cached_query
+    def get_most_popular_category(self, k: int | None = None) -> list[Category]:
         """
         Method has to return list of n Category objects that where most popular in all orders
+        :param k: number of categories, categories tied with k-th one are included. None means only the most popular
         :return: list of Category objects
         """
+        return self._get_aggregates('categories').get_most_popular_category(k)
 
-        counter = Counter([order.product.category for order in self.orders]).most_common()
-
-        return [category for category, _ in counter[:get_n_top_elements_of_most_common_list(counter)]]
-
+    @cached_query
     def get_months_with_quantity_of_ordered_products(self) -> dict[int, int]:
         """
         Method returns dict with numeric representation of month as a key and sum of quantities that occurred in orders in that month
         :return: dict with number from 1 to 12 as a key and integer as a value
         """
-        months_with_products_quantities = defaultdict(int)
-
-        for order in self.orders:
-            months_with_products_quantities[order.order_date.month] += order.quantity
-
-        return dict(sorted(months_with_products_quantities.items(), key=lambda m_q: m_q[1], reverse=True))
+        return self._get_aggregates('months').get_months_with_quantity_of_ordered_products()
 
+    @cached_query
     def get_most_popular_categories_for_months_that_orders_occurred(self) -> dict[int, Category]:
         """ Method returns dict where key is month that is represented by a integer ranges from 1 to 12, value is list of
             one or more Categories that where the most popular for month that order has occurred
         """
-        months_with_categories = defaultdict(list)
-
-        for order in self.orders:
-            months_with_categories[order.order_date.month].append(order.product.category)
-
-        final_month_with_category = {}
-        for month in months_with_categories:
-            final_month_with_category[month] = Counter(months_with_categories[month]).most_common()
-            idx = get_n_top_elements_of_most_common_list(final_month_with_category[month])
-            final_month_with_category[month] = [category for category, _ in final_month_with_category[month]][:idx]
-        return final_month_with_category
+        return self._get_aggregates('months').get_most_popular_categories_for_months_that_orders_occurred()
@@ -0,0 +1,150 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, BinaryIO, Final, Iterable
+
+from ecomerceapp.common.timestamps import to_epoch_microseconds
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+
+
+# Snapshot layout (version 1):
+#     header          _HEADER
+#     tables          utf-8 json {"customers": [...], "products": [...]}, padded to 8 bytes
+#     date columns    epoch microseconds, utc offset microseconds - raw arrays, each padded to 8 bytes
+#     order columns   customer ids, product ids, date ids, quantities - raw arrays, each padded to 8 bytes
+# Customers, products and order dates are stored once and orders reference them by position in the tables. Columns are
+# written in native byte order, which is recorded in header, and they are read straight from memory mapped file.
+SNAPSHOT_MAGIC: Final = b'ECOSNAP\0'
+SNAPSHOT_VERSION: Final = 1
+# magic, version, byte order (0 little, 1 big), tables size in bytes, number of dates, number of orders
+_HEADER: Final = struct.Struct('<8sHH4xQQQ')
+_DATE_COLUMNS: Final = ('q', 'q')
+# typecodes of order columns in the order they are stored: customer id, product id, date id, quantity
+_ORDER_COLUMNS: Final = ('I', 'I', 'I', 'q')
+_ALIGNMENT: Final = 8
+
+
+def _get_padding(size: int) -> bytes:
+    return b'\0' * (-size % _ALIGNMENT)
+
+
+def _get_offset_microseconds(date: datetime) -> int:
+    return date.utcoffset() // timedelta(microseconds=1)
+
+
+def _write_columns(f: BinaryIO, columns: Iterable[array]) -> None:
+    for column in columns:
+        data = column.tobytes()
+        f.write(data + _get_padding(len(data)))
+
+
+def write_snapshot(orders: Iterable[Order], filepath: str) -> None:
+    """
+    Saves already validated orders in binary snapshot. File is written next to target and then moved in place, so
+    snapshot that is being read is never half written
+    :param orders: any iterable of orders, for example OrdersService.orders
+    :param filepath: path to snapshot file
+    """
+    customers, products, dates = {}, {}, {}
+    order_columns = [array(typecode) for typecode in _ORDER_COLUMNS]
+    customer_ids, product_ids, date_ids, quantities = order_columns
+    for order in orders:
+        customer_ids.append(customers.setdefault(order.customer, len(customers)))
+        product_ids.append(products.setdefault(order.product, len(products)))
+        date_key = (to_epoch_microseconds(order.order_date), _get_offset_microseconds(order.order_date))
+        date_ids.append(dates.setdefault(date_key, len(dates)))
+        quantities.append(order.quantity)
+
+    tables = json.dumps({
+        'customers': [[c.name, c.surname, c.age, c.email] for c in customers],
+        'products': [[p.name, str(p.price), p.category.name] for p in products],
+    }, separators=(',', ':')).encode('utf-8')
+    date_columns = [array(typecode, values) for typecode, values in zip(_DATE_COLUMNS, zip(*dates) if dates else ((), ()))]
+
+    temporary_path = f'{filepath}.tmp'
+    with open(temporary_path, 'wb') as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == 'big', len(tables), len(dates),
+                             len(quantities)))
+        f.write(tables + _get_padding(len(tables)))
+        _write_columns(f, date_columns)
+        _write_columns(f, order_columns)
+    os.replace(temporary_path, filepath)
+
+
+def _read_tables(tables: dict[str, Any]) -> tuple[list[Customer], list[Product]]:
+    customers = [Customer(*customer) for customer in tables['customers']]
+    products = [Product(name, Decimal(price), Category[category]) for name, price, category in tables['products']]
+    return customers, products
+
+
+def _read_dates(epochs: Iterable[int], offsets: Iterable[int]) -> list[datetime]:
+    timezones, dates = {}, []
+    for epoch, offset in zip(epochs, offsets):
+        if (tz := timezones.get(offset)) is None:
+            tz = timezones[offset] = timezone(timedelta(microseconds=offset))
+        seconds, microseconds = divmod(epoch, 1_000_000)
+        date = datetime.fromtimestamp(seconds, tz)
+        dates.append(date.replace(microsecond=microseconds) if microseconds else date)
+    return dates
+
+
+def read_snapshot(filepath: str) -> list[Order]:
+    """
+    Loads orders from snapshot without validation, customers, products and dates are shared between orders
+    :param filepath: path to file created by write_snapshot
+    :return: list of orders in the same order as they were saved
+    """
+    try:
+        f = open(filepath, 'rb')
+    except FileNotFoundError:
+        raise FileNotFoundError('File does not exist')
+
+    with f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            raise ValueError('File is not an orders snapshot')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _read_mapped_snapshot(mm)
+
+
+def _read_mapped_snapshot(mm: mmap.mmap) -> list[Order]:
+    magic, version, big_endian, tables_size, dates_count, orders_count = _HEADER.unpack_from(mm)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError('File is not an orders snapshot')
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f'Unsupported snapshot version {version}')
+
+    offset = _HEADER.size
+    customers, products = _read_tables(json.loads(mm[offset:offset + tables_size]))
+    offset += tables_size + len(_get_padding(tables_size))
+    layout = [(typecode, array(typecode).itemsize * dates_count) for typecode in _DATE_COLUMNS] + \
+             [(typecode, array(typecode).itemsize * orders_count) for typecode in _ORDER_COLUMNS]
+    if len(mm) < offset + sum(size + len(_get_padding(size)) for _, size in layout):
+        raise ValueError('Snapshot is truncated')
+
+    buffer, columns = memoryview(mm), []
+    try:
+        for typecode, size in layout:
+            column = buffer[offset:offset + size].cast(typecode)
+            if big_endian != (sys.byteorder == 'big'):
+                column.release()
+                column = array(typecode)
+                column.frombytes(buffer[offset:offset + size])
+                column.byteswap()
+            columns.append(column)
+            offset += size + len(_get_padding(size))
+
+        epochs, offsets, customer_ids, product_ids, date_ids, quantities = columns
+        dates = _read_dates(epochs, offsets)
+        return [Order(customers[customer_id], products[product_id], quantity, dates[date_id])
+                for customer_id, product_id, date_id, quantity in zip(customer_ids, product_ids, date_ids, quantities)]
+    finally:
+        for column in columns:
+            if isinstance(column, memoryview):
+                column.release()
+        buffer.release()
@@ -0,0 +1,321 @@
+import logging
+import sqlite3
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Final, Iterable, Iterator, Self
+
+from ecomerceapp.common.money import Money, rescale
+from ecomerceapp.common.timestamps import to_epoch_microseconds, get_utc_offset_microseconds, \
+    from_epoch_microseconds
+from ecomerceapp.ecomerce_service.discount import get_default_discount_engine
+from ecomerceapp.ecomerce_service.loader import DEFAULT_CHUNK_SIZE, iter_batches
+from ecomerceapp.ecomerce_service.model import Order, Category, Product, Customer
+from ecomerceapp.ecomerce_service.report import REPORT_METRICS, validate_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Prices are kept exactly in price column and as fixed-point integers with price_scale digits after decimal point in
+# price_units column, so sums of values are computed by SQLite on integers. price_scale of metadata is the largest
+# scale of all prices, price_scale of product is number of decimal places of its own price. Dates are microseconds since unix epoch,
+# utc_offset keeps timezone of original datetime
+SCHEMA: Final = '''
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    surname TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    email TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price TEXT NOT NULL,
+    price_units INTEGER NOT NULL,
+    price_scale INTEGER NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    product_id INTEGER NOT NULL REFERENCES products (id),
+    quantity INTEGER NOT NULL,
+    order_date INTEGER NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    month INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_order_date ON orders (order_date);
+CREATE INDEX IF NOT EXISTS orders_customer_id ON orders (customer_id);
+CREATE INDEX IF NOT EXISTS orders_product_id ON orders (product_id);
+CREATE INDEX IF NOT EXISTS products_category ON products (category);
+INSERT OR IGNORE INTO metadata (key, value) VALUES ('price_scale', 0);
+'''
+_ORDERS_WITH_PRODUCTS: Final = 'orders JOIN products ON products.id = orders.product_id'
+
+
+def _get_rank_limit(k: int | None) -> int:
+    """ Rank that selected rows can't exceed. RANK() gives tied rows the same rank, so ties with k-th row are kept """
+    if k is None:
+        return 1
+    if not isinstance(k, int) or k < 1:
+        raise ValueError('k has to be positive integer')
+    return k
+
+
+def _get_non_empty(rows: list[tuple]) -> list[tuple]:
+    """ Top and bottom queries of OrdersService raise IndexError for empty orders pool, so these do as well """
+    if not rows:
+        raise IndexError("List is empty therefor index will be invalid")
+    return rows
+
+
+class SqliteOrdersService:
+    """
+    OrdersService that keeps orders pool in SQLite database instead of memory. Customers and products are stored once
+    in their own tables, and every query is computed by SQL, so only results are turned into Python objects. Queries
+    return the same values, in the same order, as OrdersService does for the same orders
+    """
+
+    def __init__(self, database: str = ':memory:') -> None:
+        """ :param database: path to database file, created when it doesn't exist, in-memory database by default """
+        self.connection = sqlite3.connect(database)
+        self.connection.executescript(SCHEMA)
+        self.price_scale = self.connection.execute("SELECT value FROM metadata WHERE key = 'price_scale'").fetchone()[0]
+        self._customers = {customer_id: Customer(name, surname, age, email) for customer_id, name, surname, age, email
+                           in self.connection.execute('SELECT id, name, surname, age, email FROM customers')}
+        self._products = {product_id: Product(name, Decimal(price), Category[category]) for product_id, name, price,
+                          category in self.connection.execute('SELECT id, name, price, category FROM products')}
+        self._customer_ids = {customer: customer_id for customer_id, customer in self._customers.items()}
+        self._product_ids = {product: product_id for product_id, product in self._products.items()}
+        logger.info("Orders service was initialized successfully")
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Order], database: str = ':memory:') -> Self:
+        """ Creates service and stores orders from any iterable, for example loader.stream_orders """
+        service = cls(database)
+        service.add_orders(orders)
+        return service
+
+    def _to_money(self, units: int | None) -> Money:
+        return Money(units or 0, self.price_scale)
+
+    def add_order_from_dict(self, order_data: dict[str, Any]) -> None:
+        """ Ads single order from unstandardized data dict to orders pool"""
+        self.add_orders([Order.from_dict(order_data)])
+
+    def add_orders(self, orders: Iterable[Order], batch_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        Stores orders in batches, every batch is inserted with executemany in one transaction. Batch that fails is
+        rolled back as a whole, batches stored before it stay in database
+        :param orders: any iterable of orders
+        :param batch_size: number of orders inserted in one transaction
+        """
+        for batch in iter_batches(orders, batch_size):
+            self._add_batch(batch)
+
+    def _add_batch(self, orders: list[Order]) -> None:
+        new_customers, new_products, rows = {}, {}, []
+        for order in orders:
+            customer, product, date = order.customer, order.product, order.order_date
+            if (customer_id := self._customer_ids.get(customer, new_customers.get(customer))) is None:
+                customer_id = new_customers[customer] = len(self._customer_ids) + len(new_customers) + 1
+            if (product_id := self._product_ids.get(product, new_products.get(product))) is None:
+                product_id = new_products[product] = len(self._product_ids) + len(new_products) + 1
+            rows.append((customer_id, product_id, order.quantity, to_epoch_microseconds(date),
+                         get_utc_offset_microseconds(date), date.month))
+
+        price_scale = max([self.price_scale, *(product.price_scale for product in new_products)])
+        with self.connection:
+            if price_scale > self.price_scale:
+                self.connection.execute('UPDATE products SET price_units = price_units * ?',
+                                        (10 ** (price_scale - self.price_scale),))
+                self.connection.execute("UPDATE metadata SET value = ? WHERE key = 'price_scale'", (price_scale,))
+            self.connection.executemany(
+                'INSERT INTO customers (id, name, surname, age, email) VALUES (?, ?, ?, ?, ?)',
+                ((i, c.name, c.surname, c.age, c.email) for c, i in new_customers.items()))
+            self.connection.executemany(
+                'INSERT INTO products (id, name, price, price_units, price_scale, category) VALUES (?, ?, ?, ?, ?, ?)',
+                ((i, p.name, str(p.price), rescale(p.price_units, p.price_scale, price_scale), p.price_scale,
+                  p.category.name) for p, i in new_products.items()))
+            self.connection.executemany(
+                'INSERT INTO orders (customer_id, product_id, quantity, order_date, utc_offset, month) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+        self.price_scale = price_scale
+        self._customer_ids.update(new_customers)
+        self._product_ids.update(new_products)
+        self._customers.update((i, customer) for customer, i in new_customers.items())
+        self._products.update((i, product) for product, i in new_products.items())
+
+    def iter_orders(self) -> Iterator[Order]:
+        """ Yields stored orders in order they were added, customers and products are shared between orders """
+        cursor = self.connection.execute(
+            'SELECT customer_id, product_id, quantity, order_date, utc_offset FROM orders ORDER BY id')
+        for customer_id, product_id, quantity, order_date, utc_offset in cursor:
+            yield Order(self._customers[customer_id], self._products[product_id], quantity,
+                        from_epoch_microseconds(order_date, utc_offset))
+
+    def _get_date_range_totals(self, start_date: datetime, end_date: datetime) -> tuple[int, int, Decimal]:
+        """ Value has decimal places of the most precise price in range, like Decimal sum of values of its orders """
+        count, quantity, units, scale = self.connection.execute(
+            f'SELECT COUNT(*), SUM(orders.quantity), SUM(orders.quantity * products.price_units), '
+            f'MAX(products.price_scale) FROM {_ORDERS_WITH_PRODUCTS} WHERE orders.order_date BETWEEN ? AND ?',
+            (to_epoch_microseconds(start_date), to_epoch_microseconds(end_date))).fetchone()
+        scale = scale or 0
+        return count, quantity or 0, Money((units or 0) // 10 ** (self.price_scale - scale), scale).to_decimal()
+
+    def get_average_product_price_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal:
+        _, products_count, products_value = self._get_date_range_totals(start_date, end_date)
+        if products_count == 0:
+            raise ZeroDivisionError('product_count equals 0 therefore it cannot be valid divisor')
+        return products_value / Decimal(products_count)
+
+    def get_orders_count_in_date_range(self, start_date: datetime, end_date: datetime) -> int:
+        return self._get_date_range_totals(start_date, end_date)[0]
+
+    def get_orders_value_in_date_range(self, start_date: datetime, end_date: datetime) -> Decimal:
+        return self._get_date_range_totals(start_date, end_date)[2]
+
+    def get_most_expensive_products_per_category(self, k: int | None = None) -> dict[Category, list[Product]]:
+        if k is None:
+            rows = self.connection.execute(f'''
+                WITH top_prices AS (
+                    SELECT products.category, MAX(products.price_units) AS price_units, MIN(orders.id) AS first_id
+                    FROM {_ORDERS_WITH_PRODUCTS} GROUP BY products.category
+                )
+                SELECT products.category, orders.product_id FROM {_ORDERS_WITH_PRODUCTS}
+                JOIN top_prices ON top_prices.category = products.category
+                    AND top_prices.price_units = products.price_units
+                ORDER BY top_prices.first_id, orders.id''')
+        else:
+            rows = self.connection.execute(f'''
+                WITH category_products AS (
+                    SELECT products.category, orders.product_id, products.price_units, MIN(orders.id) AS first_id
+                    FROM {_ORDERS_WITH_PRODUCTS} GROUP BY orders.product_id
+                ), ranked AS (
+                    SELECT *, RANK() OVER (PARTITION BY category ORDER BY price_units DESC) AS position,
+                        MIN(first_id) OVER (PARTITION BY category) AS category_first_id
+                    FROM category_products
+                )
+                SELECT category, product_id FROM ranked WHERE position <= ?
+                ORDER BY category_first_id, price_units DESC, first_id''', (_get_rank_limit(k),))
+        result = {}
+        for category, product_id in rows:
+            result.setdefault(Category[category], []).append(self._products[product_id])
+        return result
+
+    def get_customers_orders_summary(self) -> dict[Customer, list[dict[str, Any]]]:
+        result = {}
+        for customer_id, product_id, quantity in self.connection.execute(
+                'SELECT customer_id, product_id, quantity FROM orders ORDER BY id'):
+            result.setdefault(self._customers[customer_id], []).append(
+                {"product": self._products[product_id], "quantity": quantity})
+        return result
+
+    def _get_dates_ranked_by_orders_count(self, k: int | None, least: bool) -> list[datetime]:
+        direction, ties_direction = ('ASC', 'DESC') if least else ('DESC', 'ASC')
+        rows = self.connection.execute(f'''
+            WITH dates AS (
+                SELECT order_date, COUNT(*) AS orders_count, MIN(id) AS first_id FROM orders GROUP BY order_date
+            ), ranked AS (
+                SELECT *, RANK() OVER (ORDER BY orders_count {direction}) AS position FROM dates
+            )
+            SELECT orders.order_date, orders.utc_offset FROM ranked JOIN orders ON orders.id = ranked.first_id
+            WHERE position <= ? ORDER BY ranked.orders_count {direction}, ranked.first_id {ties_direction}''',
+                                       (_get_rank_limit(k),)).fetchall()
+        return [from_epoch_microseconds(epoch, utc_offset) for epoch, utc_offset in _get_non_empty(rows)]
+
+    def get_date_with_most_orders_made(self, k: int | None = None) -> list[datetime]:
+        return self._get_dates_ranked_by_orders_count(k, least=False)
+
+    def get_date_with_least_orders_made(self, k: int | None = None) -> list[datetime]:
+        return self._get_dates_ranked_by_orders_count(k, least=True)
+
+    def get_client_with_most_valuable_cart(self, k: int | None = None) -> list[Customer]:
+        rows = self.connection.execute(f'''
+            WITH carts AS (
+                SELECT orders.customer_id, SUM(orders.quantity * products.price_units) AS cart_value,
+                    MIN(orders.id) AS first_id
+                FROM {_ORDERS_WITH_PRODUCTS} GROUP BY orders.customer_id
+            ), ranked AS (
+                SELECT *, RANK() OVER (ORDER BY cart_value DESC) AS position FROM carts
+            )
+            SELECT customer_id FROM ranked WHERE position <= ? ORDER BY cart_value DESC, first_id''',
+                                       (_get_rank_limit(k),)).fetchall()
+        return [self._customers[customer_id] for customer_id, in _get_non_empty(rows)]
+
+    def get_orders_value_after_discounts(self, reference_time: datetime | None = None) -> Decimal:
+        """ Rules of default discount engine are turned into one CASE expression, so orders are grouped by rate """
+        reference_time = reference_time or datetime.now(tz=timezone.utc)
+        rules = get_default_discount_engine().rules
+        conditions = [rule.get_sql_condition(reference_time) for rule in rules]
+        case = ' '.join(f'WHEN {condition} THEN {i}' for i, (condition, _) in enumerate(conditions))
+        rows = self.connection.execute(f'''
+            SELECT CASE {case} ELSE -1 END AS rule, SUM(orders.quantity * products.price_units)
+            FROM {_ORDERS_WITH_PRODUCTS} JOIN customers ON customers.id = orders.customer_id
+            GROUP BY rule''', [parameter for _, parameters in conditions for parameter in parameters])
+        return sum((self._to_money(units) * (Money.from_decimal(rules[rule].rate) if rule >= 0 else 1)
+                    for rule, units in rows), Money(0)).to_decimal()
+
+    def get_clients_num_that_ordered_at_least_n_products_per_transaction(self, n: int) -> int:
+        return self.connection.execute('''
+            SELECT COUNT(*) FROM (
+                SELECT customer_id FROM orders GROUP BY customer_id HAVING MIN(quantity) = ? AND MAX(quantity) = ?
+            )''', (n, n)).fetchone()[0]
+
+    def get_most_popular_category(self, k: int | None = None) -> list[Category]:
+        rows = self.connection.execute(f'''
+            WITH categories AS (
+                SELECT products.category, COUNT(*) AS orders_count, MIN(orders.id) AS first_id
+                FROM {_ORDERS_WITH_PRODUCTS} GROUP BY products.category
+            ), ranked AS (
+                SELECT *, RANK() OVER (ORDER BY orders_count DESC) AS position FROM categories
+            )
+            SELECT category FROM ranked WHERE position <= ? ORDER BY orders_count DESC, first_id''',
+                                       (_get_rank_limit(k),)).fetchall()
+        return [Category[category] for category, in _get_non_empty(rows)]
+
+    def get_months_with_quantity_of_ordered_products(self) -> dict[int, int]:
+        return dict(self.connection.execute('''
+            SELECT month, SUM(quantity) AS quantity FROM orders GROUP BY month
+            ORDER BY quantity DESC, MIN(id)'''))
+
+    def get_most_popular_categories_for_months_that_orders_occurred(self) -> dict[int, list[Category]]:
+        rows = self.connection.execute(f'''
+            WITH counts AS (
+                SELECT orders.month, products.category, COUNT(*) AS orders_count, MIN(orders.id) AS first_id
+                FROM {_ORDERS_WITH_PRODUCTS} GROUP BY orders.month, products.category
+            ), ranked AS (
+                SELECT *, RANK() OVER (PARTITION BY month ORDER BY orders_count DESC) AS position,
+                    MIN(first_id) OVER (PARTITION BY month) AS month_first_id
+                FROM counts
+            )
+            SELECT month, category FROM ranked WHERE position = 1 ORDER BY month_first_id, first_id''')
+        result = {}
+        for month, category in rows:
+            result.setdefault(month, []).append(Category[category])
+        return result
+
+    def get_report(self, metrics: Iterable[str] = REPORT_METRICS,
+                   arguments: dict[str, tuple] | None = None) -> dict[str, Any]:
+        """ The same report as OrdersService.get_report, every metric is one SQL query """
+        arguments = arguments or {}
+        return {metric: getattr(self, metric)(*arguments.get(metric, ()))
+                for metric in validate_metrics(metrics, arguments)}
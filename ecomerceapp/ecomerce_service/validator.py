@@ -1,12 +1,57 @@
+import re
+
 from decimal import Decimal
-from typing import Any
+from typing import Any, ClassVar, Final
 
-from ecomerceapp.common.validator import matches_regex, is_unstandardized_decimal_grater_or_equal_to, \
-    is_default_isoformat, is_enum_name, is_integer_grater_equal_to, are_keys_in_dict, validate_dict_structure
+from ecomerceapp.common.metrics import instrument_methods
+from ecomerceapp.common.timestamps import is_isoformat_timestamp
+from ecomerceapp.common.validator import DECIMAL_PATTERN, get_enum_names, Rejection, ValidationPlan
 from ecomerceapp.ecomerce_service.model import Category
 from ecomerceapp.settings import AppData
 
+
+NAME_PATTERN: Final = re.compile(r'^[A-Z]+( ?[A-Z]+)*$')
+EMAIL_PATTERN: Final = re.compile(r'^[\w\-.]+@([\w-]+\.)+[\w-]{2,4}$')
+
+
+def _is_str(value: Any) -> bool:
+    return isinstance(value, str)
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int)
+
+
+def _is_allowed_age(value: int) -> bool:
+    # setting is read when first customer is validated, not when module is imported
+    return AppData.MINIMAL_CUSTOMER_AGE <= value
+
+
+@instrument_methods
 class ServiceDataValidator:
+    """
+    Validates unstandardized data (Decimal, Enum names, and Datetime are represented by a str) before it is turned into
+    objects by from_dict methods. Plans are compiled once, when module is imported
+    """
+    CUSTOMER_PLAN: ClassVar[ValidationPlan] = ValidationPlan((
+        ('name', (('type', _is_str), ('pattern', NAME_PATTERN.match))),
+        ('surname', (('type', _is_str), ('pattern', NAME_PATTERN.match))),
+        ('age', (('type', _is_int), ('min_value', _is_allowed_age))),
+        ('email', (('type', _is_str), ('pattern', EMAIL_PATTERN.match))),
+    ))
+    PRODUCT_PLAN: ClassVar[ValidationPlan] = ValidationPlan((
+        ('name', (('type', _is_str), ('pattern', NAME_PATTERN.match))),
+        ('price', (('type', _is_str), ('pattern', DECIMAL_PATTERN.match),
+                   ('min_value', lambda price: Decimal(price) >= Decimal('0')))),
+        ('category', (('type', _is_str), ('enum', get_enum_names(Category).__contains__))),
+    ))
+    ORDER_PLAN: ClassVar[ValidationPlan] = ValidationPlan((
+        ('customer', CUSTOMER_PLAN),
+        ('product', PRODUCT_PLAN),
+        ('quantity', (('type', _is_int), ('min_value', (0).__le__))),
+        ('order_date', (('type', _is_str), ('pattern', is_isoformat_timestamp))),
+    ))
+
     @staticmethod
     def is_customer_data_valid(customer_data: dict[str, Any]) -> bool:
         """
@@ -14,18 +59,7 @@ class ServiceDataValidator:
         :param customer_data: Data where Decimal, Enum names, and Datetime are represented by a str
         :return: if data is valid
         """
-        customer_keys_in_order = ('name', 'surname', 'age', 'email')
-        if are_keys_in_dict(set(customer_keys_in_order), customer_data):
-            keys_iterator = iter(customer_keys_in_order)
-            return validate_dict_structure(
-                validator_and_params_in_order=(
-                    (matches_regex, (r'^[A-Z]+( ?[A-Z]+)*$', customer_data[next(keys_iterator)])),
-                    (matches_regex, (r'^[A-Z]+( ?[A-Z]+)*$', customer_data[next(keys_iterator)])),
-                    (is_integer_grater_equal_to, (AppData.MINIMAL_CUSTOMER_AGE, customer_data[next(keys_iterator)])),
-                    (matches_regex, (r'^[\w\-.]+@([\w-]+\.)+[\w-]{2,4}$', customer_data[next(keys_iterator)])),
-                )
-            )
-        return False
+        return ServiceDataValidator.CUSTOMER_PLAN.is_valid(customer_data)
 
     @staticmethod
     def is_product_data_valid(product_data: dict[str, Any]) -> bool:
@@ -34,20 +68,17 @@ class ServiceDataValidator:
         :param product_data: Data where Decimal, Enum names, and Datetime are represented by a str
         :return: if data is valid
         """
-        product_keys_in_order = ('name', 'price', 'category')
-        if are_keys_in_dict(set(product_keys_in_order), product_data):
-            try:
-                keys_iterator = iter(product_keys_in_order)
-                return validate_dict_structure(
-                    validator_and_params_in_order=(
-                        (matches_regex, (r'^[A-Z]+( ?[A-Z]+)*$', product_data[next(keys_iterator)])),
-                        (is_unstandardized_decimal_grater_or_equal_to, (Decimal('0'), product_data[next(keys_iterator)])),
-                        (is_enum_name, (Category, product_data[next(keys_iterator)]))
-                    )
-                )
-            except ValueError:
-                return False
-        return False
+        return ServiceDataValidator.PRODUCT_PLAN.is_valid(product_data)
+
+    @staticmethod
+    def get_order_data_rejection(order_data: dict[str, Any]) -> Rejection | None:
+        """
+        Validates order data in one pass and explains why it was rejected
+        :param order_data: Data where Decimal, Enum names, and Datetime are represented by a str
+        :return: None if data is valid, otherwise Rejection with path of invalid field and name of failed rule,
+                 for example Rejection(field='customer.age', rule='min_value')
+        """
+        return ServiceDataValidator.ORDER_PLAN.check(order_data)
 
     @staticmethod
     def validate_order_data(order_data: dict[str, Any]) -> bool:
@@ -56,15 +87,4 @@ class ServiceDataValidator:
         :param order_data: Data where Decimal, Enum names, and Datetime are represented by a str
         :return: if data is valid
         """
-        order_keys_in_order = ('customer', 'product', 'quantity', 'order_date')
-        if are_keys_in_dict(set(order_keys_in_order), order_data):
-            keys_iterator = iter(order_keys_in_order)
-            return validate_dict_structure(
-                validator_and_params_in_order=(
-                    (ServiceDataValidator.is_customer_data_valid, (order_data[next(keys_iterator)],)),
-                    (ServiceDataValidator.is_product_data_valid, (order_data[next(keys_iterator)],)),
-                    (is_integer_grater_equal_to, (0, order_data[next(keys_iterator)])),
-                    (is_default_isoformat, (order_data[next(keys_iterator)],)),
-                )
-            )
-        return False
+        return ServiceDataValidator.ORDER_PLAN.is_valid(order_data)
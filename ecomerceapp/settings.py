@@ -1,13 +1,57 @@
 import os
 
 from decimal import Decimal
-from dotenv import load_dotenv
-from typing import Final
+from functools import cache
+from typing import Any, Callable, Final
 
-class AppData:
-    """ Class AppData is created to distribute data stored in .env file  """
+# name of setting -> function that converts its value from .env file
+SETTINGS_TYPES: Final[dict[str, Callable[[str], Any]]] = {
+    'ORDERS_FILE_PATH': str,
+    'MINIMAL_CUSTOMER_AGE': int,
+    'DISCOUNT_RATE_FOR_DATE': Decimal,
+    'DISCOUNT_RATE_FOR_CUSTOMER_AGE': Decimal,
+    'DISCOUNT_AGE_CAP': int,
+}
+
+
+@cache
+def load_settings() -> dict[str, Any]:
+    """
+    Reads .env file and converts settings once per process. Settings that are missing stay None until they are read,
+    then reading them raises an error
+    """
+    # dotenv imports logging, pathlib and tempfile, short jobs that don't read settings shouldn't pay for it
+    from dotenv import load_dotenv
     load_dotenv()
-    MINIMAL_CUSTOMER_AGE: Final = int(os.getenv('MINIMAL_CUSTOMER_AGE'))
-    DISCOUNT_RATE_FOR_DATE = Decimal(os.getenv('DISCOUNT_RATE_FOR_DATE'))
-    DISCOUNT_RATE_FOR_CUSTOMER_AGE = Decimal(os.getenv('DISCOUNT_RATE_FOR_CUSTOMER_AGE'))
-    DISCOUNT_AGE_CAP = int(os.getenv('DISCOUNT_AGE_CAP'))
+    return {name: None if (value := os.getenv(name)) is None else convert(value)
+            for name, convert in SETTINGS_TYPES.items()}
+
+
+class _LazySettings(type):
+    """ Loads settings on first read of any of them and stores them as plain class attributes afterwards """
+
+    def __getattr__(cls, name: str) -> Any:
+        if name not in SETTINGS_TYPES:
+            raise AttributeError(f'{cls.__name__} has no setting {name}')
+        settings = load_settings()
+        if settings[name] is None:
+            raise KeyError(f'Setting {name} is not defined in environment or .env file')
+        for setting, value in settings.items():
+            if value is not None:
+                setattr(cls, setting, value)
+        return settings[name]
+
+
+class AppData(metaclass=_LazySettings):
+    """ Class AppData is created to distribute data stored in .env file. File is read when first setting is needed """
+
+    @classmethod
+    def reload(cls) -> None:
+        """
+        Forgets loaded settings, they are read from environment again on next access. Objects already built from
+        settings, like default discount engine, keep values they were built with
+        """
+        for setting in SETTINGS_TYPES:
+            if setting in vars(cls):
+                delattr(cls, setting)
+        load_settings.cache_clear()
@@ -0,0 +1,151 @@
+import json
+
+import pytest
+
+from ecomerceapp.app import main, get_peak_rss, PhaseTimer
+from ecomerceapp.common.metrics import METRICS
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig
+from ecomerceapp.ecomerce_service.loader import stream_orders_from_file
+from ecomerceapp.ecomerce_service.report import to_json_value
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+@pytest.fixture
+def orders_file(tmp_path) -> str:
+    filepath = str(tmp_path / 'orders.jsonl')
+    OrdersGenerator(OrdersGeneratorConfig(customers=15, products=8, invalid_rate=0.1, seed=3)).write(filepath, 300)
+    return filepath
+
+
+@pytest.fixture
+def run(tmp_path):
+    def run_main(*argv: str) -> None:
+        main([*argv, '--log-file', str(tmp_path / 'logs.log'), '--log-level', 'ERROR'])
+    return run_main
+
+
+def get_expected(filepath: str, metrics: list[str], arguments: dict[str, tuple] | None = None) -> dict:
+    report = OrdersService.from_orders(stream_orders_from_file(filepath)).get_report(metrics, arguments)
+    return json.loads(json.dumps({metric: to_json_value(value) for metric, value in report.items()}))
+
+
+class TestBatchReportCommand:
+    @pytest.mark.parametrize('workers, chunk_size', [('1', '7'), ('2', '50')])
+    def test_report_of_all_metrics_without_arguments(self, run, orders_file, tmp_path, workers, chunk_size):
+        output = tmp_path / 'report.json'
+        run('--input', orders_file, '--output', str(output), '--workers', workers, '--chunk-size', chunk_size,
+            '--reference-time', '2023-01-01T00:00:00+00:00')
+        report = json.loads(output.read_text())
+        assert 'get_orders_count_in_date_range' not in report
+        assert report == get_expected(orders_file, list(report),
+                                      {'get_orders_value_after_discounts': (get_reference_time(),)})
+
+    def test_chosen_metrics_with_arguments_to_stdout(self, run, orders_file, capsys):
+        run('--input', orders_file, '--metrics', 'get_most_popular_category', 'get_orders_count_in_date_range',
+            'get_clients_num_that_ordered_at_least_n_products_per_transaction',
+            '--k', '2', '--n', '3', '--start-date', '2022-01-01', '--end-date', '2022-06-30T23:59:59+00:00')
+        start_date, end_date = parse_dates('2022-01-01T00:00:00+00:00', '2022-06-30T23:59:59+00:00')
+        assert json.loads(capsys.readouterr().out) == get_expected(orders_file, [
+            'get_most_popular_category', 'get_orders_count_in_date_range',
+            'get_clients_num_that_ordered_at_least_n_products_per_transaction'
+        ], {'get_most_popular_category': (2,), 'get_orders_count_in_date_range': (start_date, end_date),
+            'get_clients_num_that_ordered_at_least_n_products_per_transaction': (3,)})
+
+    def test_timing_summary(self, run, orders_file, capsys):
+        run('--input', orders_file, '--metrics', 'get_most_popular_category', '--timing')
+        phases = [line.split()[0] for line in capsys.readouterr().err.splitlines()]
+        assert phases == ['phase', 'load', 'report', 'write', 'total']
+
+    def test_instrumentation_file(self, run, orders_file, tmp_path):
+        try:
+            run('--input', orders_file, '--metrics', 'get_most_popular_category',
+                '--instrumentation-file', str(tmp_path / 'metrics.json'))
+        finally:
+            METRICS.disable()
+            METRICS.reset()
+        counters = json.loads((tmp_path / 'metrics.json').read_text())['counters']
+        assert {'name': 'ecommerce_records_total', 'labels': {'status': 'loaded'},
+                'value': len(list(stream_orders_from_file(orders_file)))} in counters
+
+    @pytest.mark.parametrize('argv, message', [
+        (['--start-date', '2022-01-01'], '--start-date and --end-date have to be given together'),
+        (['--metrics', 'get_orders_count_in_date_range'],
+         'get_orders_count_in_date_range requires arguments: start_date, end_date'),
+        (['--workers', '0'], "argument --workers: 0 is not positive integer"),
+    ])
+    def test_invalid_arguments(self, run, orders_file, capsys, argv, message):
+        with pytest.raises(SystemExit) as e:
+            run('--input', orders_file, *argv)
+        assert e.value.code == 2
+        assert message in capsys.readouterr().err
+
+    def test_memory_limit(self, run, orders_file, capsys):
+        with pytest.raises(SystemExit) as e:
+            run('--input', orders_file, '--max-memory', '1', '--chunk-size', '100')
+        assert e.value.code == 1
+        assert 'Memory limit of 1 MB was exceeded after 100 orders' in capsys.readouterr().err
+
+    def test_missing_file(self, run, capsys):
+        with pytest.raises(SystemExit) as e:
+            run('--input', 'xyz.json')
+        assert e.value.code == 1
+        assert 'File does not exist' in capsys.readouterr().err
+
+    @pytest.mark.parametrize('file_name, content', [
+        ('orders.jsonl', ''),
+        ('orders.jsonl', '{"quantity": -1}\n{}\n'),
+        ('orders.json', '[]'),
+    ])
+    def test_file_without_valid_orders(self, run, tmp_path, capsys, file_name, content):
+        filepath = tmp_path / file_name
+        filepath.write_text(content)
+        with pytest.raises(SystemExit) as e:
+            run('--input', str(filepath))
+        assert e.value.code == 1
+        assert capsys.readouterr().err.endswith(
+            f'error: No valid orders were loaded from {filepath}, top metrics can not be computed\n')
+
+    @pytest.mark.parametrize('file_name, content', [
+        ('orders.json', '[{"quantity": 1}, {"quantity": '),
+        ('orders.json', '{"orders": []}'),
+        ('orders.jsonl', '{"quantity": 1}\n{"quantity"\n'),
+    ])
+    @pytest.mark.parametrize('workers', ['1', '2'])
+    def test_malformed_json(self, run, tmp_path, capsys, file_name, content, workers):
+        filepath = tmp_path / file_name
+        filepath.write_text(content)
+        with pytest.raises(SystemExit) as e:
+            run('--input', str(filepath), '--workers', workers)
+        assert e.value.code == 1
+        error = capsys.readouterr().err
+        assert f'error: {filepath} is not valid json: ' in error
+        assert 'Traceback' not in error
+
+
+class TestReportJsonValues:
+    def test_values_of_every_metric_are_json_serializable(self, random_orders):
+        dates = [order.order_date for order in random_orders]
+        report = OrdersService(random_orders).get_report(
+            arguments={'get_clients_num_that_ordered_at_least_n_products_per_transaction': (1,),
+                       **{metric: (min(dates), max(dates)) for metric in
+                          ('get_average_product_price_in_date_range', 'get_orders_count_in_date_range',
+                           'get_orders_value_in_date_range')}})
+        summary = to_json_value(report['get_customers_orders_summary'])
+        assert summary[0]['key'] == to_json_value(random_orders[0].customer)
+        assert json.loads(json.dumps(to_json_value(report)))['get_orders_value_in_date_range'] == \
+               str(report['get_orders_value_in_date_range'])
+
+    def test_phase_timer(self):
+        timer = PhaseTimer()
+        assert timer.run('phase', sum, [1, 2]) == 3
+        assert timer.phases[0]['peak_rss'] == get_peak_rss() > 0
+
+
+def get_reference_time():
+    return parse_dates('2023-01-01T00:00:00+00:00')[0]
+
+
+def parse_dates(*values: str) -> list:
+    from datetime import datetime
+    return [datetime.fromisoformat(value) for value in values]
@@ -0,0 +1,36 @@
+from benchmarks.suite import run_benchmarks, compare_reports, measure, build_service
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig
+
+
+class TestBenchmarkSuite:
+    def test_run_benchmarks_reports_every_case(self):
+        report = run_benchmarks([50], OrdersGeneratorConfig(customers=10, products=5), workers=1, profile_memory=True)
+        names = {result['name'] for result in report['results']}
+        assert {'load_orders', 'validate_order_data', 'get_most_popular_category', 'build_report',
+                'report_workers_1'} <= names
+        assert all(result['size'] == 50 and result['peak_memory'] is not None for result in report['results'])
+        assert set(report) == {'metadata', 'config', 'results'}
+
+    def test_reset_is_called_before_profiled_call(self):
+        cache = {}
+        seconds, peak_memory, result = measure(lambda: cache.setdefault('result', list(range(10_000))), True,
+                                               cache.clear)
+        assert result == list(range(10_000))
+        assert peak_memory > 10_000 * 8
+
+    def test_build_service_syncs_every_lazy_view(self, tmp_path):
+        filepath = str(tmp_path / 'orders.json')
+        OrdersGenerator(OrdersGeneratorConfig(customers=10, products=5)).write(filepath, 50)
+        service = build_service(filepath)
+        assert len(service.orders) == 50
+        assert all(len(view) == 50 for view in (service._columns, service._aggregates, service._date_index,
+                                                service._histograms))
+
+    def test_compare_reports_marks_regressions(self):
+        baseline = {'results': [{'group': 'g', 'name': 'a', 'size': 1, 'seconds': 1.0},
+                                {'group': 'g', 'name': 'b', 'size': 1, 'seconds': 1.0}]}
+        current = {'results': [{'group': 'g', 'name': 'a', 'size': 1, 'seconds': 1.05},
+                               {'group': 'g', 'name': 'b', 'size': 1, 'seconds': 2.0},
+                               {'group': 'g', 'name': 'c', 'size': 1, 'seconds': 2.0}]}
+        comparison = compare_reports(baseline, current, threshold=0.1)
+        assert [(case['name'], case['regression']) for case in comparison] == [('a', False), ('b', True)]
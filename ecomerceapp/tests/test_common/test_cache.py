@@ -0,0 +1,52 @@
+import unittest
+
+from ecomerceapp.common.cache import ResultCache, CacheStats, copy_result
+
+
+class TestResultCache(unittest.TestCase):
+    def test_result_is_computed_once_per_version(self):
+        cache, calls = ResultCache(), []
+        compute = lambda: calls.append(1) or len(calls)
+        self.assertEqual(cache.get_or_compute('key', 1, compute), 1)
+        self.assertEqual(cache.get_or_compute('key', 1, compute), 1)
+        self.assertEqual(cache.get_or_compute('key', 2, compute), 2)
+        self.assertEqual(cache.get_stats(), CacheStats(hits=1, misses=2, evictions=0, size=1, max_size=128))
+
+    def test_least_recently_used_result_is_evicted(self):
+        cache = ResultCache(max_size=2)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get_or_compute(key, 0, lambda: key)
+        cache.get_or_compute('b', 0, lambda: 'new b')
+        self.assertEqual(cache.get_or_compute('a', 0, lambda: 'new a'), 'new a')
+        self.assertEqual(cache.get_stats().evictions, 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_cached_result_cannot_be_changed_by_caller(self):
+        cache = ResultCache()
+        result = cache.get_or_compute('key', 0, lambda: {'a': [1, 2], 'b': [{'c': 3}]})
+        result['a'].append(3)
+        result['b'][0]['c'] = 4
+        del result['b']
+        self.assertEqual(cache.get_or_compute('key', 0, lambda: None), {'a': [1, 2], 'b': [{'c': 3}]})
+
+    def test_unhashable_key_bypasses_cache(self):
+        cache = ResultCache()
+        self.assertEqual(cache.get_or_compute(('key', [1]), 0, lambda: 1), 1)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.get_stats().misses, 1)
+
+    def test_zero_size_disables_cache(self):
+        cache = ResultCache(max_size=0)
+        cache.get_or_compute('key', 0, lambda: 1)
+        self.assertEqual(cache.get_or_compute('key', 0, lambda: 2), 2)
+
+    def test_invalid_max_size(self):
+        with self.assertRaises(ValueError) as e:
+            ResultCache(max_size=-1)
+        self.assertEqual('max_size has to be non negative integer', str(e.exception))
+
+    def test_copy_result_keeps_immutable_objects(self):
+        item = (1, 'a')
+        copied = copy_result([item, {item}])
+        self.assertIs(copied[0], item)
+        self.assertEqual(copied[1], {item})
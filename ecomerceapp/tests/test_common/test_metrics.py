@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from ecomerceapp.common.metrics import MetricsRegistry, Histogram, METRICS, instrumented, instrument_methods
+from ecomerceapp.ecomerce_service.loader import load_orders
+from ecomerceapp.ecomerce_service.service import OrdersService
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry(enabled=True, buckets=(0.1, 1.0))
+
+
+@pytest.fixture
+def global_metrics() -> MetricsRegistry:
+    METRICS.reset()
+    METRICS.enable()
+    yield METRICS
+    METRICS.disable()
+    METRICS.reset()
+
+
+class TestMetricsRegistry:
+    def test_counters_with_labels(self, registry):
+        registry.increment('ecommerce_records_total', 3, status='loaded')
+        registry.increment('ecommerce_records_total', status='loaded')
+        registry.increment('ecommerce_records_total', status='rejected')
+        assert registry.counters == {('ecommerce_records_total', (('status', 'loaded'),)): 4,
+                                     ('ecommerce_records_total', (('status', 'rejected'),)): 1}
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.get_cumulative_counts() == [('0.1', 2), ('1.0', 3), ('+Inf', 4)]
+        assert (histogram.sum, histogram.count) == (3.65, 4)
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry()
+        registry.increment('ecommerce_calls_total')
+        registry.observe('ecommerce_call_duration_seconds', 1.0)
+        assert registry.get_snapshot() == {'counters': [], 'histograms': []}
+
+    def test_prometheus_text_format(self, registry):
+        registry.increment('ecommerce_rejections_total', 2, field='customer.age', rule='min_value')
+        registry.observe('ecommerce_call_duration_seconds', 0.5, function='load "orders"')
+        assert registry.to_prometheus() == '\n'.join([
+            '# HELP ecommerce_rejections_total Number of records rejected by loader, by field and failed rule',
+            '# TYPE ecommerce_rejections_total counter',
+            'ecommerce_rejections_total{field="customer.age",rule="min_value"} 2',
+            '# HELP ecommerce_call_duration_seconds Latency of instrumented function',
+            '# TYPE ecommerce_call_duration_seconds histogram',
+            'ecommerce_call_duration_seconds_bucket{function="load \\"orders\\"",le="0.1"} 0',
+            'ecommerce_call_duration_seconds_bucket{function="load \\"orders\\"",le="1.0"} 1',
+            'ecommerce_call_duration_seconds_bucket{function="load \\"orders\\"",le="+Inf"} 1',
+            'ecommerce_call_duration_seconds_sum{function="load \\"orders\\""} 0.5',
+            'ecommerce_call_duration_seconds_count{function="load \\"orders\\""} 1',
+        ]) + '\n'
+
+    def test_write_files(self, registry, tmp_path):
+        registry.increment('ecommerce_calls_total', function='f')
+        registry.write_json(str(tmp_path / 'metrics.json'))
+        registry.write_prometheus(str(tmp_path / 'metrics.prom'))
+        assert json.loads((tmp_path / 'metrics.json').read_text()) == registry.get_snapshot()
+        assert (tmp_path / 'metrics.prom').read_text() == registry.to_prometheus()
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['metrics.json', 'metrics.prom']
+
+    def test_instrumented_function(self, registry):
+        @instrumented(registry=registry)
+        def divide(a, b):
+            return a / b
+
+        assert divide(4, 2) == 2
+        with pytest.raises(ZeroDivisionError):
+            divide(1, 0)
+        label = (('function', divide.__qualname__),)
+        assert registry.counters[('ecommerce_calls_total', label)] == 2
+        assert registry.counters[('ecommerce_errors_total', label)] == 1
+        assert registry.histograms[('ecommerce_call_duration_seconds', label)].count == 2
+
+    def test_instrument_methods(self, registry):
+        @instrument_methods(registry=registry)
+        class Service:
+            @staticmethod
+            def static():
+                return 1
+
+            @property
+            def value(self):
+                return 2
+
+            def _private(self):
+                return 3
+
+        Service.static(), Service().value, Service()._private()
+        assert list(registry.counters) == [('ecommerce_calls_total', (('function', Service.static.__qualname__),))]
+
+
+class TestInstrumentedModules:
+    def test_loader_records_and_rejections(self, global_metrics):
+        record = {"customer": {"name": "MARIA", "surname": "SMOLKE", "age": 18, "email": "smolke@gmail.com"},
+                  "product": {"name": "CAR", "price": "200.00", "category": "A"},
+                  "quantity": 3, "order_date": "2022-12-20T00:00:00+00:00"}
+        load_orders([record, {**record, 'quantity': -1}, {}])
+        counters = global_metrics.counters
+        assert counters[('ecommerce_records_total', (('status', 'loaded'),))] == 1
+        assert counters[('ecommerce_records_total', (('status', 'rejected'),))] == 2
+        assert counters[('ecommerce_rejections_total', (('field', 'quantity'), ('rule', 'min_value')))] == 1
+        assert counters[('ecommerce_calls_total', (('function', 'load_orders'),))] == 1
+        assert counters[('ecommerce_calls_total', (('function', 'ServiceDataValidator.get_order_data_rejection'),))] \
+               == 3
+
+    def test_service_methods(self, global_metrics):
+        service = OrdersService([])
+        service.get_orders_value_after_discounts()
+        with pytest.raises(IndexError):
+            service.get_most_popular_category()
+        counters = global_metrics.counters
+        assert counters[('ecommerce_calls_total', (('function', 'OrdersService.get_most_popular_category'),))] == 1
+        assert counters[('ecommerce_errors_total', (('function', 'OrdersService.get_most_popular_category'),))] == 1
+        assert ('ecommerce_call_duration_seconds',
+                (('function', 'OrdersService.get_orders_value_after_discounts'),)) in global_metrics.histograms
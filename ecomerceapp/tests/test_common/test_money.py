@@ -0,0 +1,50 @@
+import unittest
+from decimal import Decimal, ROUND_HALF_UP
+
+from ecomerceapp.common.money import Money, get_scale, to_decimal, rescale
+
+
+class TestMoney(unittest.TestCase):
+    def test_get_scale(self):
+        for value, scale in [(Decimal('1.50'), 2), (Decimal('15'), 0), (Decimal('1E+2'), 0), (Decimal('7.'), 0)]:
+            self.assertEqual(get_scale(value), scale)
+
+    def test_decimal_round_trip_keeps_decimal_places(self):
+        for value in ['12.50', '0.10', '7', '0.000', '99.999']:
+            money = Money.from_decimal(Decimal(value))
+            self.assertEqual(str(money.to_decimal()), value)
+        self.assertEqual(Money.from_decimal(Decimal('12.50')), Money(1250, 2))
+
+    def test_arithmetic_has_the_same_digits_as_decimal_arithmetic(self):
+        prices, rates = ['1.5', '2.25', '3', '10.125', '0.10', '12.5000'], ['0.98', '0.8', '1', '1.0']
+        for price in prices:
+            for quantity in (0, 1, 7):
+                self.assertEqual(repr((Money.from_decimal(Decimal(price)) * quantity).to_decimal()),
+                                 repr(Decimal(price) * quantity))
+            for rate in rates:
+                self.assertEqual(repr((Money.from_decimal(Decimal(price)) * Money.from_decimal(Decimal(rate)))
+                                      .to_decimal()), repr(Decimal(price) * Decimal(rate)))
+        self.assertEqual(repr(sum(map(Money.from_decimal, map(Decimal, prices)), Money(0)).to_decimal()),
+                         repr(sum(map(Decimal, prices), Decimal('0'))))
+        self.assertEqual(repr((Money(150, 2) - Money(25, 1)).to_decimal()), repr(Decimal('1.50') - Decimal('2.5')))
+
+    def test_comparison_and_hash_ignore_scale(self):
+        self.assertEqual(Money(150, 2), Money(15, 1))
+        self.assertEqual(hash(Money(150, 2)), hash(Money(15, 1)))
+        self.assertEqual(Money(300, 2), 3)
+        self.assertLess(Money(299, 2), Money(3))
+        self.assertGreater(Money(1, 3), 0)
+        self.assertEqual(len({Money(1, 0), Money(10, 1), Money(100, 2)}), 1)
+
+    def test_quantize_rounds_half_to_even_by_default(self):
+        self.assertEqual(Money(1225, 3).quantize(2), Money(122, 2))
+        self.assertEqual(Money(1235, 3).quantize(2), Money(124, 2))
+        self.assertEqual(Money(1225, 3).quantize(2, ROUND_HALF_UP), Money(123, 2))
+        self.assertEqual(Money(-1225, 3).quantize(2, ROUND_HALF_UP), Money(-123, 2))
+        self.assertEqual(Money(12, 1).quantize(3), Money(1200, 3))
+
+    def test_scale_can_not_be_decreased_by_rescale(self):
+        self.assertEqual(rescale(12, 1, 3), 1200)
+        self.assertEqual(str(to_decimal(0, 2)), '0.00')
+        with self.assertRaises(ValueError):
+            Money(1250, 2).rescale(1)
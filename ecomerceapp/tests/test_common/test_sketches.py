@@ -0,0 +1,165 @@
+import pickle
+import random
+import unittest
+from collections import Counter
+
+from ecomerceapp.common.sketches import CountMinSketch, HeavyHitters, HyperLogLog, QuantileSketch, hash_key
+
+
+def get_zipf_keys(count: int, distinct: int, seed: int = 0) -> list[str]:
+    """ Keys whose popularity falls like in real shop, key-0 is the most popular """
+    rng = random.Random(seed)
+    return [f'key-{i}' for i in rng.choices(range(distinct), weights=[1 / (i + 1) for i in range(distinct)], k=count)]
+
+
+class TestHashKey(unittest.TestCase):
+    def test_hash_is_stable_between_processes(self):
+        # hash() of str is salted per process, sketches can't rely on it
+        self.assertEqual(hash_key('customer'), 7684015199182067155)
+        self.assertLess(hash_key('customer', 16), 2 ** 128)
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_count_is_within_error(self):
+        for distinct in (0, 10, 1_000, 50_000):
+            sketch = HyperLogLog(0.02)
+            for i in range(distinct):
+                sketch.add(f'customer-{i}')
+                sketch.add(f'customer-{i}')
+            self.assertLessEqual(abs(sketch.count() - distinct), 3 * 0.02 * distinct + 1)
+
+    def test_memory_follows_error(self):
+        self.assertEqual(len(HyperLogLog(0.01).registers), 2 ** 14)
+        self.assertEqual(len(HyperLogLog(0.5).registers), 2 ** 4)
+        with self.assertRaises(ValueError):
+            HyperLogLog(0.001)
+        with self.assertRaises(ValueError):
+            HyperLogLog(0)
+
+    def test_merge_equals_sketch_of_all_keys(self):
+        keys = [f'customer-{i}' for i in range(5_000)]
+        whole, first, second = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for key in keys:
+            whole.add(key)
+        for key in keys[:3_000]:
+            first.add(key)
+        for key in keys[2_000:]:
+            second.add(key)
+        first.merge(pickle.loads(pickle.dumps(second)))
+        self.assertEqual(first.registers, whole.registers)
+        with self.assertRaises(ValueError):
+            first.merge(HyperLogLog(0.1))
+
+
+class TestCountMinSketch(unittest.TestCase):
+    def test_estimates_are_within_bounds(self):
+        keys = get_zipf_keys(20_000, 2_000)
+        sketch = CountMinSketch(0.001, 0.01)
+        for key in keys:
+            sketch.add(key)
+        self.assertEqual(sketch.total, len(keys))
+        for key, count in Counter(keys).items():
+            self.assertGreaterEqual(sketch.estimate(key), count)
+            self.assertLessEqual(sketch.estimate(key), count + 0.001 * len(keys) * 10)
+        self.assertLessEqual(sketch.estimate('missing'), 0.001 * len(keys) * 10)
+
+    def test_weighted_counts(self):
+        sketch = CountMinSketch()
+        self.assertEqual(sketch.add('a', 5), 5)
+        self.assertEqual(sketch.add('a', 7), 12)
+        self.assertEqual(sketch.estimate('a'), 12)
+
+    def test_merge_adds_counters(self):
+        keys = get_zipf_keys(5_000, 500)
+        whole, first, second = CountMinSketch(), CountMinSketch(), CountMinSketch()
+        for key in keys:
+            whole.add(key)
+        for i, key in enumerate(keys):
+            (first if i % 2 else second).add(key)
+        first.merge(second)
+        self.assertEqual(first.counters, whole.counters)
+        self.assertEqual(first.total, whole.total)
+        with self.assertRaises(ValueError):
+            first.merge(CountMinSketch(0.01))
+
+
+class TestHeavyHitters(unittest.TestCase):
+    def test_top_items_of_skewed_stream(self):
+        keys = get_zipf_keys(30_000, 5_000)
+        tracker = HeavyHitters(capacity=50)
+        for key in keys:
+            tracker.add(key)
+        expected = [key for key, _ in Counter(keys).most_common(5)]
+        self.assertEqual(tracker.get_top(5), expected)
+        self.assertEqual(tracker.get_top(), ['key-0'])
+        self.assertEqual(len(tracker.candidates), 50)
+
+    def test_ties_are_included(self):
+        tracker = HeavyHitters(capacity=10)
+        for key, count in [('a', 3), ('b', 5), ('c', 5), ('d', 1)]:
+            tracker.add(key, count)
+        self.assertEqual(tracker.get_top(), ['b', 'c'])
+        self.assertEqual(tracker.get_top(2), ['b', 'c'])
+        self.assertEqual(tracker.get_top(3), ['b', 'c', 'a'])
+        self.assertEqual(HeavyHitters().get_top(), [])
+        with self.assertRaises(ValueError):
+            tracker.get_top(0)
+
+    def test_merge_of_shards(self):
+        keys = get_zipf_keys(30_000, 5_000, seed=1)
+        shards = [HeavyHitters(capacity=50) for _ in range(4)]
+        for i, key in enumerate(keys):
+            shards[i % 4].add(key)
+        merged = shards[0]
+        for shard in shards[1:]:
+            merged.merge(pickle.loads(pickle.dumps(shard)))
+        self.assertEqual(merged.get_top(5), [key for key, _ in Counter(keys).most_common(5)])
+        self.assertEqual(len(merged.candidates), 50)
+        with self.assertRaises(ValueError):
+            merged.merge(HeavyHitters(capacity=10))
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_quantiles_are_within_relative_error(self):
+        rng = random.Random(3)
+        values = [rng.lognormvariate(5, 2) for _ in range(20_000)] + [0] * 100
+        sketch = QuantileSketch(0.01)
+        for value in values:
+            sketch.add(value)
+        values.sort()
+        for q in (0, 0.001, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1):
+            expected = values[int(q * (len(values) - 1))]
+            self.assertLessEqual(abs(sketch.get_quantile(q) - expected), 0.01 * expected + 1e-9)
+        self.assertEqual(sketch.get_quantile(1), values[-1])
+
+    def test_buckets_are_limited(self):
+        sketch = QuantileSketch(0.01, max_buckets=100)
+        for i in range(1, 10_000):
+            sketch.add(i * 1.5)
+        self.assertEqual(len(sketch.buckets), 100)
+        self.assertEqual(sketch.count, 9_999)
+        self.assertAlmostEqual(sketch.get_quantile(0.99), 9_899 * 1.5, delta=0.01 * 9_899 * 1.5)
+
+    def test_empty_and_invalid(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.get_quantile(0.5))
+        with self.assertRaises(ValueError):
+            sketch.get_quantile(1.5)
+        with self.assertRaises(ValueError):
+            sketch.add(-1)
+
+    def test_merge_equals_sketch_of_all_values(self):
+        rng = random.Random(5)
+        values = [rng.uniform(0, 1_000) for _ in range(5_000)]
+        whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in values:
+            whole.add(value)
+        for value in values[:1_000]:
+            first.add(value)
+        for value in values[1_000:]:
+            second.add(value)
+        first.merge(second)
+        self.assertEqual((first.buckets, first.count, first.minimum, first.maximum),
+                         (whole.buckets, whole.count, whole.minimum, whole.maximum))
+        with self.assertRaises(ValueError):
+            first.merge(QuantileSketch(0.05))
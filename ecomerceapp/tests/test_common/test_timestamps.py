@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+from ecomerceapp.common.timestamps import parse_timestamp, is_isoformat_timestamp, get_timestamp_keys, \
+    TimestampKeys, clear_timestamps_cache, to_epoch_microseconds
+
+
+class TestMemoizedTimestamps(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_timestamps_cache()
+
+    def test_repeated_timestamp_is_parsed_once(self):
+        first = parse_timestamp('2022-12-20T10:00:00+02:00')
+        self.assertIs(parse_timestamp('2022-12-20T10:00:00+02:00'), first)
+        self.assertEqual(first, datetime.fromisoformat('2022-12-20T10:00:00+02:00'))
+        self.assertEqual(parse_timestamp.cache_info().hits, 1)
+
+    def test_invalid_timestamp_is_not_memoized(self):
+        with self.assertRaises(ValueError):
+            parse_timestamp('2022-13-20T10:00:00+02:00')
+        self.assertEqual(parse_timestamp.cache_info().currsize, 0)
+
+    def test_is_isoformat_timestamp(self):
+        self.assertTrue(is_isoformat_timestamp('2022-12-20T10:00:00+02:00'))
+        self.assertFalse(is_isoformat_timestamp('2022-12-20 10:00:00'))
+        self.assertFalse(is_isoformat_timestamp('2022-12-20 10:00:00'))
+        self.assertEqual(is_isoformat_timestamp.cache_info().hits, 1)
+
+    def test_timestamp_keys(self):
+        moment = datetime(2022, 12, 31, 23, 30, tzinfo=timezone(timedelta(hours=-2)))
+        self.assertEqual(get_timestamp_keys(moment),
+                         TimestampKeys(to_epoch_microseconds(moment), 12))
+
+    def test_equal_instants_in_different_timezones_have_own_keys(self):
+        local = datetime(2023, 1, 1, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+        utc = local.astimezone(pytz.utc)
+        self.assertEqual(local, utc)
+        self.assertEqual(get_timestamp_keys(local).month, 1)
+        self.assertEqual(get_timestamp_keys(utc).month, 12)
+        self.assertEqual(get_timestamp_keys(local).epoch, get_timestamp_keys(utc).epoch)
@@ -1,5 +1,8 @@
+import random
 import unittest
-from ecomerceapp.common.utils import get_n_top_elements_of_most_common_list
+from collections import Counter
+
+from ecomerceapp.common.utils import get_n_top_elements_of_most_common_list, TieCounter, get_top_k, get_bottom_k
 
 class TestGetNElementOfMostCommonList(unittest.TestCase):
     @classmethod
@@ -28,5 +31,93 @@ class TestGetNElementOfMostCommonList(unittest.TestCase):
         self.assertEqual(get_n_top_elements_of_most_common_list(self.one_element_list), 1)
 
 
+class TestTieCounter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.counter = TieCounter()
+        for key in 'abcab':
+            self.counter.add(key)
+
+    def test_top_keys_in_order_of_first_appearance(self):
+        self.assertEqual(self.counter.get_top(), ['a', 'b'])
+
+    def test_bottom_keys(self):
+        self.counter.add('c')
+        self.counter.add('d')
+        self.assertEqual(self.counter.get_bottom(), ['d'])
+
+    def test_bottom_keys_are_reversed_like_most_common(self):
+        self.counter.add('c')
+        self.assertEqual(self.counter.get_bottom(), ['c', 'b', 'a'])
+
+    def test_top_follows_decreased_value(self):
+        self.counter.add('a', 5)
+        self.counter.add('a', -6)
+        self.assertEqual(self.counter.get_top(), ['b'])
+        self.assertEqual(self.counter.get_bottom(), ['c', 'a'])
+
+    def test_adding_zero_to_new_key(self):
+        self.counter.add('z', 0)
+        self.assertEqual(self.counter.get_bottom(), ['z'])
+        self.assertEqual(self.counter.counts['z'], 0)
+
+    def test_empty_counter(self):
+        with self.assertRaises(IndexError) as e:
+            TieCounter().get_top()
+        self.assertEqual("List is empty therefor index will be invalid", str(e.exception))
+
+    def test_top_k_with_ties(self):
+        self.counter.add('c')
+        self.counter.add('d')
+        self.assertEqual(self.counter.get_top(1), ['a', 'b', 'c'])
+        self.assertEqual(self.counter.get_bottom(1), ['d'])
+        self.assertEqual(self.counter.get_bottom(2), ['d', 'c', 'b', 'a'])
+
+    def test_multiply_keeps_order_and_ties(self):
+        self.counter.add('c', 3)
+        self.counter.multiply(100)
+        self.assertEqual(self.counter.counts, {'a': 200, 'b': 200, 'c': 400})
+        self.counter.add('a', 200)
+        self.assertEqual(self.counter.get_top(), ['a', 'c'])
+        self.assertEqual(self.counter.get_bottom(), ['b'])
+
+
+class TestTopK(unittest.TestCase):
+    @staticmethod
+    def select_by_sorting(counter: Counter, k: int, bottom: bool) -> list:
+        """ Reference selection, full sort cut after k-th element and its ties """
+        ordered = counter.most_common()
+        if bottom:
+            ordered.reverse()
+        cut = ordered[k - 1][1] if k <= len(ordered) else ordered[-1][1]
+        return [key for i, (key, value) in enumerate(ordered) if i < k or value == cut]
+
+    def test_matches_full_sort(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            counter = Counter(rng.choices(range(30), k=rng.randint(1, 80)))
+            k = rng.randint(1, 35)
+            self.assertEqual(get_top_k(counter.items(), k), self.select_by_sorting(counter, k, bottom=False))
+            self.assertEqual(get_bottom_k(counter.items(), k), self.select_by_sorting(counter, k, bottom=True))
+
+    def test_ties_of_kth_element_are_kept(self):
+        items = [('a', 1), ('b', 3), ('c', 2), ('d', 3), ('e', 2), ('f', 2)]
+        self.assertEqual(get_top_k(items, 1), ['b', 'd'])
+        self.assertEqual(get_top_k(items, 3), ['b', 'd', 'c', 'e', 'f'])
+        self.assertEqual(get_bottom_k(items, 2), ['a', 'f', 'e', 'c'])
+
+    def test_keys_are_never_compared(self):
+        self.assertEqual(get_top_k([({1}, 2), ({2}, 2), ({3}, 1)], 1), [{1}, {2}])
+
+    def test_invalid_k(self):
+        for k in (0, -1, 1.5):
+            with self.assertRaises(ValueError) as e:
+                get_top_k([('a', 1)], k)
+            self.assertEqual('k has to be positive integer', str(e.exception))
+
+    def test_empty_items(self):
+        with self.assertRaises(IndexError):
+            get_bottom_k([], 3)
+
+
 if __name__ == "__main__":
     unittest.main()
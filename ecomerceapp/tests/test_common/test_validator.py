@@ -1,9 +1,10 @@
+import re
 from decimal import Decimal
 
 import pytest
 
 from ecomerceapp.common.validator import is_enum_name, is_unstandardized_decimal_grater_or_equal_to, matches_regex, \
-    is_default_isoformat, is_integer_grater_equal_to
+    is_default_isoformat, is_integer_grater_equal_to, get_enum_names, Rejection, ValidationPlan
 
 from ecomerceapp.tests.test_common.common_fixtures import enum_with_red, empty_enum, correct_regex_exp_pairs, \
     incorrect_regex_exp_pairs, correct_iso_strings, incorrect_iso_strings
@@ -28,6 +29,14 @@ class TestIsEnumName:
         assert e.value.args[0] == "Name is not a string"
 
 
+class TestGetEnumNames:
+    def test_with_correct_enum(self, enum_with_red):
+        assert get_enum_names(enum_with_red) == frozenset({'RED', 'BLACK', 'WHITE'})
+
+    def test_result_is_computed_once(self, enum_with_red):
+        assert get_enum_names(enum_with_red) is get_enum_names(enum_with_red)
+
+
 class TestIsUnstandardizedDecimalGraterOrEqualTo:
     @pytest.mark.parametrize(('comp_value', 'value'), [
         (Decimal('0'), '0.1'),
@@ -85,6 +94,10 @@ class TestMatchesRegex:
     def test_with_incorrect_regex_exp_pairs(self, incorrect_regex_exp_pairs):
         assert not matches_regex(*incorrect_regex_exp_pairs)
 
+    def test_with_compiled_pattern(self, correct_regex_exp_pairs):
+        regex, expression = correct_regex_exp_pairs
+        assert matches_regex(re.compile(regex), expression)
+
     def test_with_expression_not_being_string(self):
         with pytest.raises(TypeError) as e:
             matches_regex(r'', 1)
@@ -102,3 +115,33 @@ class TestIsDefaultIsoFormat:
         with pytest.raises(TypeError) as e:
             is_default_isoformat(("2022-11-24T00:10:50+00:00",))
         assert e.value.args[0] == 'Expression should be string'
+
+
+class TestValidationPlan:
+    plan = ValidationPlan((
+        ('point', ValidationPlan((
+            ('x', (('type', lambda value: isinstance(value, int)), ('min_value', (0).__le__))),
+        ))),
+        ('label', (('type', lambda value: isinstance(value, str)),)),
+    ))
+
+    def test_with_valid_data(self):
+        assert self.plan.check({'point': {'x': 1}, 'label': 'A'}) is None
+        assert self.plan.is_valid({'point': {'x': 1}, 'label': 'A'})
+
+    @pytest.mark.parametrize(('data', 'rejection'), [
+        ({'point': {'x': 1}}, Rejection('', 'keys')),
+        ({'point': {'y': 1}, 'label': 'A'}, Rejection('point', 'keys')),
+        ({'point': 1, 'label': 'A'}, Rejection('point', 'type')),
+        ({'point': {'x': '1'}, 'label': 'A'}, Rejection('point.x', 'type')),
+        ({'point': {'x': -1}, 'label': 'A'}, Rejection('point.x', 'min_value')),
+        ({'point': {'x': -1}, 'label': 1}, Rejection('point.x', 'min_value')),
+        ({'point': {'x': 1}, 'label': 1}, Rejection('label', 'type')),
+    ])
+    def test_with_invalid_data(self, data, rejection):
+        assert self.plan.check(data) == rejection
+        assert not self.plan.is_valid(data)
+
+    def test_with_data_not_being_dict(self):
+        with pytest.raises(AttributeError):
+            self.plan.check('data')
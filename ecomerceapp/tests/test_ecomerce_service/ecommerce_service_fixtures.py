@@ -1,7 +1,14 @@
+import random
+
 import pytest
+import pytz
 
+from datetime import datetime
+from decimal import Decimal
 from typing import Any
 
+from ecomerceapp.ecomerce_service.model import Customer, Product, Category, Order
+
 @pytest.fixture
 def valid_customer_data() -> dict[str, int]:
     """ { "name": "D", "surname": "S", "age": 18, "email": "d.smolczynski1@gmail.pl" }"""
@@ -79,3 +86,15 @@ def invalid_order_data() -> dict[str, Any]:
 def invalid_structured_data(request) -> dict:
     """ {"A": 1} | {}"""
     return request.param
+
+
+@pytest.fixture
+def random_orders() -> list[Order]:
+    """ 300 orders with repeating customers, products and dates, so every query has ties to resolve """
+    rng = random.Random(7)
+    customers = [Customer(f'NAME{chr(65 + i)}', 'SURNAME', 18 + i * 3, f'c{i}@gmail.com') for i in range(8)]
+    products = [Product(f'PRODUCT{chr(65 + i)}', Decimal(price), rng.choice(list(Category)))
+                for i, price in enumerate(['10', '10.5', '3.25', '100', '7.125', '10.50'])]
+    dates = [datetime(2022, rng.randint(1, 12), rng.randint(1, 28), tzinfo=pytz.timezone('UTC')) for _ in range(20)]
+    return [Order(rng.choice(customers), rng.choice(products), rng.randint(0, 5), rng.choice(dates))
+            for _ in range(300)]
@@ -0,0 +1,108 @@
+import pytest
+
+from ecomerceapp.ecomerce_service.aggregates import OrdersAggregates
+from ecomerceapp.ecomerce_service.columns import OrdersColumns
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+QUERIES = [
+    'get_most_expensive_products_per_category', 'get_customers_orders_summary', 'get_date_with_most_orders_made',
+    'get_date_with_least_orders_made', 'get_client_with_most_valuable_cart', 'get_most_popular_category',
+    'get_months_with_quantity_of_ordered_products', 'get_most_popular_categories_for_months_that_orders_occurred'
+]
+
+
+class TestOrdersAggregates:
+    @pytest.mark.parametrize('query', QUERIES)
+    def test_query_matches_full_rescan_after_every_add(self, random_orders, query):
+        aggregates, columns = OrdersAggregates(), OrdersColumns()
+        for order in random_orders[:60]:
+            aggregates.add(order)
+            columns.append(order)
+            result, expected = getattr(aggregates, query)(), getattr(columns, query)()
+            assert result == expected
+            if isinstance(expected, dict):
+                assert list(result) == list(expected)
+
+    @pytest.mark.parametrize('n', [0, 1, 2, 5])
+    def test_clients_num_matches_full_rescan(self, random_orders, n):
+        aggregates = OrdersAggregates()
+        aggregates.extend(random_orders)
+        assert aggregates.get_clients_num_that_ordered_at_least_n_products_per_transaction(n) == \
+               OrdersColumns.from_orders(random_orders).get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    @pytest.mark.parametrize('query', [
+        'get_most_expensive_products_per_category', 'get_date_with_most_orders_made', 'get_date_with_least_orders_made',
+        'get_client_with_most_valuable_cart', 'get_most_popular_category'
+    ])
+    @pytest.mark.parametrize('k', [1, 3, 10])
+    def test_top_k_matches_full_rescan(self, random_orders, query, k):
+        aggregates = OrdersAggregates()
+        aggregates.extend(random_orders)
+        assert getattr(aggregates, query)(k) == getattr(OrdersColumns.from_orders(random_orders), query)(k)
+
+    def test_top_k_customers_by_cart_value(self, random_orders):
+        aggregates = OrdersAggregates()
+        aggregates.extend(random_orders)
+        carts = dict(zip(aggregates.customers.customers, aggregates.customers.values))
+        top_customers = aggregates.get_client_with_most_valuable_cart(5)
+        assert len(top_customers) >= 5
+        assert [carts[customer] for customer in top_customers] == sorted(carts.values(), reverse=True)[:len(top_customers)]
+
+    def test_returned_structures_can_be_modified_safely(self, random_orders):
+        aggregates = OrdersAggregates()
+        aggregates.extend(random_orders)
+        summary = aggregates.get_customers_orders_summary()
+        next(iter(summary.values()))[0]['quantity'] = -1
+        summary.clear()
+        aggregates.get_most_expensive_products_per_category().popitem()[1].clear()
+        assert aggregates.get_customers_orders_summary() == OrdersColumns.from_orders(random_orders).get_customers_orders_summary()
+        assert aggregates.get_most_expensive_products_per_category() == \
+               OrdersColumns.from_orders(random_orders).get_most_expensive_products_per_category()
+
+    def test_only_chosen_parts_are_maintained(self, random_orders):
+        aggregates = OrdersAggregates(('dates', 'months'))
+        aggregates.extend(random_orders)
+        columns = OrdersColumns.from_orders(random_orders)
+        assert aggregates.get_date_with_least_orders_made() == columns.get_date_with_least_orders_made()
+        assert aggregates.get_months_with_quantity_of_ordered_products() == \
+               columns.get_months_with_quantity_of_ordered_products()
+        assert not aggregates.categories.counts and not aggregates.customers
+
+    def test_parts_are_synced_separately(self, random_orders):
+        aggregates = OrdersAggregates()
+        aggregates.sync(random_orders[:100], ['categories'])
+        assert len(aggregates) == 0 and not aggregates.dates.counts and not aggregates.customers
+        aggregates.sync(random_orders, ['carts', 'categories'])
+        assert len(aggregates.customers) == len(set(order.customer for order in random_orders))
+        assert aggregates.get_most_popular_category(2) == \
+               OrdersColumns.from_orders(random_orders).get_most_popular_category(2)
+        assert len(aggregates.sync(random_orders)) == 300
+        expected = OrdersAggregates()
+        expected.extend(random_orders)
+        assert aggregates.get_customers_orders_summary() == expected.get_customers_orders_summary()
+        assert aggregates.get_date_with_most_orders_made(3) == expected.get_date_with_most_orders_made(3)
+        with pytest.raises(ValueError, match='Aggregate parts are not maintained: carts'):
+            OrdersAggregates(('dates',)).sync(random_orders, ['carts'])
+
+    def test_unknown_part_raises(self):
+        with pytest.raises(ValueError, match='Unknown aggregate parts: prices'):
+            OrdersAggregates(('dates', 'prices'))
+
+
+class TestOrdersServiceAggregates:
+    def test_aggregates_follow_add_orders(self, random_orders):
+        service = OrdersService([])
+        service.add_orders(random_orders[:150])
+        service.add_orders(random_orders[150:])
+        assert len(service.aggregates) == 300
+        assert service.get_most_popular_category() == OrdersColumns.from_orders(random_orders).get_most_popular_category()
+
+    def test_aggregates_follow_direct_appends_and_replaced_list(self, random_orders):
+        service = OrdersService(random_orders[:100])
+        assert len(service.aggregates) == 100
+        service.orders.append(random_orders[100])
+        assert len(service.aggregates) == 101
+        service.orders = random_orders[200:]
+        assert service.get_date_with_most_orders_made() == \
+               OrdersColumns.from_orders(random_orders[200:]).get_date_with_most_orders_made()
@@ -0,0 +1,82 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.ecomerce_service.approximate import ApproximateOrdersService, SketchConfig
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig
+from ecomerceapp.ecomerce_service.loader import stream_orders
+from ecomerceapp.ecomerce_service.model import Order
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+@pytest.fixture(scope='module')
+def generated_orders() -> list[Order]:
+    return list(stream_orders(OrdersGenerator(OrdersGeneratorConfig(customers=5_000, products=300)).generate(30_000)))
+
+
+def get_quantile(orders: list[Order], q: float) -> Decimal:
+    values = sorted(order.get_total_price() for order in orders)
+    return values[int(q * (len(values) - 1))]
+
+
+class TestApproximateOrdersService:
+    def test_answers_of_small_stream_are_exact(self, random_orders):
+        service, exact = ApproximateOrdersService.from_orders(random_orders), OrdersService(random_orders)
+        assert len(service) == len(random_orders)
+        assert service.get_distinct_customers_count() == len({order.customer for order in random_orders})
+        for k in (None, 1, 2, 3):
+            assert service.get_most_popular_category(k) == exact.get_most_popular_category(k)
+            assert service.get_client_with_most_valuable_cart(k) == exact.get_client_with_most_valuable_cart(k)
+
+    def test_answers_of_large_stream_are_within_error(self, generated_orders):
+        service, exact = ApproximateOrdersService.from_orders(generated_orders), OrdersService(generated_orders)
+        distinct = len({order.customer for order in generated_orders})
+        assert abs(service.get_distinct_customers_count() - distinct) <= 0.03 * distinct
+        assert service.get_client_with_most_valuable_cart(10) == exact.get_client_with_most_valuable_cart(10)
+        assert service.get_most_popular_category(3) == exact.get_most_popular_category(3)
+        quantities = {}
+        for order in generated_orders:
+            quantities[order.product] = quantities.get(order.product, 0) + order.quantity
+        assert service.get_most_popular_products(5) == sorted(quantities, key=quantities.get, reverse=True)[:5]
+        for q in (0, 0.1, 0.5, 0.9, 0.99, 1):
+            expected = get_quantile(generated_orders, q)
+            assert abs(service.get_order_value_quantile(q) - expected) <= expected * Decimal('0.01') + Decimal('0.01')
+
+    def test_memory_does_not_grow_with_orders(self, generated_orders):
+        config = SketchConfig(heavy_hitters=20)
+        sizes = [len(pickle.dumps(ApproximateOrdersService.from_orders(generated_orders[:count], config)))
+                 for count in (10_000, 30_000)]
+        assert sizes[1] <= sizes[0] * 1.01
+
+    def test_merged_shards_equal_service_of_all_orders(self, generated_orders):
+        whole = ApproximateOrdersService.from_orders(generated_orders)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            shards = list(executor.map(ApproximateOrdersService.from_orders,
+                                       [generated_orders[i::3] for i in range(3)]))
+        merged = ApproximateOrdersService.from_services(shards)
+        assert len(merged) == len(whole)
+        assert merged.customers.registers == whole.customers.registers
+        assert merged.values.buckets == whole.values.buckets
+        assert merged.get_distinct_customers_count() == whole.get_distinct_customers_count()
+        assert merged.get_client_with_most_valuable_cart(10) == whole.get_client_with_most_valuable_cart(10)
+        assert merged.get_order_value_quantile(0.5) == whole.get_order_value_quantile(0.5)
+
+    def test_empty_service(self):
+        service = ApproximateOrdersService()
+        assert service.get_distinct_customers_count() == 0
+        assert service.get_client_with_most_valuable_cart() == []
+        assert service.get_order_value_quantile(0.5) is None
+
+    def test_invalid_merges_and_configs(self, random_orders):
+        service = ApproximateOrdersService.from_orders(random_orders)
+        with pytest.raises(ValueError, match='different sketch configs'):
+            service.merge(ApproximateOrdersService(SketchConfig(distinct_error=0.05)))
+        with pytest.raises(ValueError, match='At least one service'):
+            ApproximateOrdersService.from_services([])
+        with pytest.raises(ValueError, match='value_scale'):
+            ApproximateOrdersService(SketchConfig(value_scale=-1))
+        with pytest.raises(ValueError, match='epsilon'):
+            ApproximateOrdersService(SketchConfig(frequency_epsilon=2))
@@ -0,0 +1,80 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ecomerceapp.ecomerce_service.async_loader import ingest_files, load_files_into_service
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig
+from ecomerceapp.ecomerce_service.loader import stream_orders_from_file
+from ecomerceapp.ecomerce_service.service import OrdersService
+
+
+@pytest.fixture
+def order_files(tmp_path) -> list[str]:
+    filepaths = []
+    for seed, file_name in enumerate(['first.json', 'second.jsonl', 'third.json']):
+        filepath = str(tmp_path / file_name)
+        config = OrdersGeneratorConfig(customers=20, products=10, invalid_rate=0.2, seed=seed)
+        OrdersGenerator(config).write(filepath, 40 + 10 * seed)
+        filepaths.append(filepath)
+    return filepaths
+
+
+class FailingOrdersService(OrdersService):
+    def add_orders(self, orders):
+        raise RuntimeError('service is not available')
+
+
+class TestIngestFiles:
+    @pytest.mark.parametrize('workers, chunk_size, queue_size', [(1, 7, 1), (3, 5, 2), (2, 1000, 8)])
+    def test_all_valid_orders_are_added(self, order_files, workers, chunk_size, queue_size):
+        service = OrdersService([])
+        load_files_into_service(service, order_files, workers, chunk_size, queue_size)
+        expected = [order for filepath in order_files for order in stream_orders_from_file(filepath)]
+        assert Counter(service.orders) == Counter(expected)
+        assert len(service.aggregates) == len(expected)
+
+    def test_orders_of_one_file_keep_file_order(self, order_files):
+        service = OrdersService([])
+        load_files_into_service(service, order_files[:1], chunk_size=3)
+        assert service.orders == list(stream_orders_from_file(order_files[0]))
+
+    def test_summaries_and_logs_per_file(self, order_files, caplog):
+        with caplog.at_level('INFO'):
+            summaries = load_files_into_service(OrdersService([]), order_files, workers=2, chunk_size=4)
+        assert [summary.filepath for summary in summaries] == order_files
+        for summary in summaries:
+            assert summary.loaded == len(list(stream_orders_from_file(summary.filepath)))
+            assert summary.total - summary.loaded == sum(summary.rejections.values())
+            assert f'File {summary.filepath} was successfully loaded' in caplog.messages
+            assert f"{summary.total - summary.loaded} json objects weren't loaded correctly" in caplog.messages
+
+    def test_with_process_pool(self, order_files):
+        service = OrdersService([])
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            asyncio.run(ingest_files(service, order_files, workers=2, chunk_size=10, executor=executor))
+        assert len(service.orders) == sum(len(list(stream_orders_from_file(path))) for path in order_files)
+
+    def test_with_missing_file(self, order_files):
+        with pytest.raises(FileNotFoundError) as e:
+            load_files_into_service(OrdersService([]), [*order_files, 'xyz.json'])
+        assert e.value.args[0] == 'File does not exist'
+
+        async def ingest_with_missing_file() -> set[asyncio.Task]:
+            # producers of other files are still reading when missing file fails
+            with pytest.raises(FileNotFoundError):
+                await ingest_files(OrdersService([]), ['xyz.json', *order_files], workers=4, chunk_size=1,
+                                   queue_size=1)
+            return asyncio.all_tasks() - {asyncio.current_task()}
+
+        assert asyncio.run(ingest_with_missing_file()) == set()
+
+    def test_service_error_stops_producers(self, order_files):
+        with pytest.raises(RuntimeError, match='service is not available'):
+            load_files_into_service(FailingOrdersService([]), order_files, chunk_size=1, queue_size=1)
+
+    @pytest.mark.parametrize('workers, queue_size', [(-1, 1), (1, 0)])
+    def test_with_invalid_arguments(self, order_files, workers, queue_size):
+        with pytest.raises(ValueError):
+            load_files_into_service(OrdersService([]), order_files, workers, queue_size=queue_size)
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytz
+
+from ecomerceapp.ecomerce_service.columns import OrdersColumns, to_epoch_microseconds
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+class TestHelpers:
+    def test_to_epoch_microseconds_respects_offset(self):
+        utc_date = datetime.fromisoformat('2022-12-20T00:00:00+00:00')
+        shifted_date = datetime.fromisoformat('2022-12-20T02:00:00+02:00')
+        assert to_epoch_microseconds(utc_date) == to_epoch_microseconds(shifted_date) == 1671494400000000
+
+
+class TestOrdersColumns:
+    def test_prices_are_rescaled_when_more_precise_price_arrives(self, random_orders):
+        columns = OrdersColumns.from_orders(random_orders)
+        assert columns.price_scale == 3
+        assert [columns.to_decimal(price) for price in columns.prices] == [order.product.price for order in random_orders]
+
+    def test_customers_and_products_are_stored_once(self, random_orders):
+        columns = OrdersColumns.from_orders(random_orders)
+        assert len(columns) == 300
+        assert len(columns.customers) == len(set(order.customer for order in random_orders))
+        assert len(columns.products) == len(set(order.product for order in random_orders))
+
+    @pytest.mark.parametrize('query', [
+        'get_most_expensive_products_per_category', 'get_customers_orders_summary', 'get_date_with_most_orders_made',
+        'get_date_with_least_orders_made', 'get_client_with_most_valuable_cart', 'get_orders_value_after_discounts',
+        'get_most_popular_category', 'get_months_with_quantity_of_ordered_products',
+        'get_most_popular_categories_for_months_that_orders_occurred'
+    ])
+    def test_query_matches_orders_service(self, random_orders, query):
+        service = OrdersService(random_orders)
+        expected = getattr(service, query)()
+        result = getattr(service.columns, query)()
+        assert result == expected
+        if isinstance(expected, dict):
+            assert list(result) == list(expected)
+
+    @pytest.mark.parametrize('n', [0, 1, 3])
+    def test_clients_num_matches_orders_service(self, random_orders, n):
+        service = OrdersService(random_orders)
+        assert service.columns.get_clients_num_that_ordered_at_least_n_products_per_transaction(n) == \
+               service.get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    def test_average_price_matches_orders_service(self, random_orders):
+        service = OrdersService(random_orders)
+        start_date = datetime(2022, 3, 1, tzinfo=pytz.timezone('UTC'))
+        end_date = datetime(2022, 9, 1, tzinfo=pytz.timezone('UTC'))
+        assert service.columns.get_average_product_price_in_date_range(start_date, end_date) == \
+               service.get_average_product_price_in_date_range(start_date, end_date)
+
+    def test_average_price_when_out_of_range(self, random_orders):
+        date = datetime(2010, 1, 1, tzinfo=pytz.timezone('UTC'))
+        with pytest.raises(ZeroDivisionError) as e:
+            OrdersColumns.from_orders(random_orders).get_average_product_price_in_date_range(date, date)
+        assert e.value.args[0] == 'product_count equals 0 therefore it cannot be valid divisor'
+
+    def test_discounts_for_recent_orders(self, random_orders):
+        now = datetime.now(tz=pytz.timezone('UTC'))
+        recent_orders = [Order(order.customer, order.product, order.quantity, now + timedelta(days=1))
+                         for order in random_orders]
+        service = OrdersService(recent_orders)
+        assert repr(service.columns.get_orders_value_after_discounts()) == \
+               repr(service.get_orders_value_after_discounts())
+
+    def test_discounts_have_decimal_places_of_orders_service(self, random_orders):
+        service = OrdersService(random_orders)
+        for reference_time in [order.order_date for order in random_orders[:10]]:
+            assert repr(service.columns.get_orders_value_after_discounts(reference_time)) == \
+                   repr(service.get_orders_value_after_discounts(reference_time))
+
+    def test_rules_that_match_no_order_add_no_decimal_places(self):
+        date = datetime(2022, 1, 1, tzinfo=pytz.timezone('UTC'))
+        order = Order(Customer('ADAM', 'SMITH', 40, 'adam@gmail.com'), Product('PEN', Decimal('1.00'), Category.A), 3,
+                      date)
+        service = OrdersService([order])
+        assert repr(service.columns.get_orders_value_after_discounts(date + timedelta(days=10))) == \
+               repr(service.get_orders_value_after_discounts(date + timedelta(days=10))) == "Decimal('3.00')"
+
+    def test_average_price_has_decimal_places_of_prices_in_range(self):
+        date = datetime(2022, 1, 1, tzinfo=pytz.timezone('UTC'))
+        customer = Customer('ADAM', 'SMITH', 33, 'adam@gmail.com')
+        service = OrdersService([
+            Order(customer, Product('TV', Decimal('10.505'), Category.A), 1, date),
+            Order(customer, Product('RADIO', Decimal('7'), Category.A), 2, date + timedelta(days=1))])
+        for start_date, end_date in [(date + timedelta(days=1), date + timedelta(days=1)), (date, date),
+                                     (date, date + timedelta(days=1))]:
+            assert repr(service.columns.get_average_product_price_in_date_range(start_date, end_date)) == \
+                   repr(service.get_average_product_price_in_date_range(start_date, end_date))
+        assert repr(service.columns.get_average_product_price_in_date_range(date + timedelta(days=1),
+                                                                           date + timedelta(days=1))) == "Decimal('7')"
+
+
+class TestOrdersServiceColumns:
+    def test_columns_follow_appended_orders(self, random_orders):
+        service = OrdersService(random_orders[:100])
+        assert len(service.columns) == 100
+        service.orders.extend(random_orders[100:])
+        assert len(service.columns) == 300
+        assert service.columns.get_most_popular_category() == service.get_most_popular_category()
+
+    def test_columns_are_rebuilt_when_orders_are_replaced(self, random_orders):
+        service = OrdersService(random_orders)
+        assert len(service.columns) == 300
+        service.orders = random_orders[:10]
+        assert len(service.columns) == 10
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.ecomerce_service.aggregates import OrdersAggregates
+from ecomerceapp.ecomerce_service.columns import OrdersColumns
+from ecomerceapp.ecomerce_service.customer_index import CustomerIndex
+from ecomerceapp.ecomerce_service.model import Category, Customer, Order, Product
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+def get_expected_totals(orders: list[Order], customer: Customer) -> dict:
+    quantities = [order.quantity for order in orders if order.customer == customer]
+    return {'count': len(quantities), 'quantity': sum(quantities),
+            'value': sum((order.get_total_price() for order in orders if order.customer == customer), Decimal('0')),
+            'min_quantity': min(quantities), 'max_quantity': max(quantities)}
+
+
+class TestCustomerIndex:
+    def test_totals_follow_every_add(self, random_orders):
+        index = CustomerIndex()
+        for position, order in enumerate(random_orders[:80]):
+            index.add(order, position)
+            totals = index.get_customer_totals(order.customer)
+            assert totals == get_expected_totals(random_orders[:position + 1], order.customer)
+        assert index.customers == list(dict.fromkeys(order.customer for order in random_orders[:80]))
+        assert index.get_customer_totals(Customer('NOBODY', 'SURNAME', 30, 'nobody@gmail.com')) is None
+
+    def test_customer_positions(self, random_orders):
+        index = CustomerIndex()
+        index.extend(random_orders)
+        for customer in index.customers:
+            assert index.get_customer_positions(customer) == \
+                   [position for position, order in enumerate(random_orders) if order.customer == customer]
+
+    @pytest.mark.parametrize('n', [0, 1, 3, 5, 6])
+    def test_positions_with_quantity(self, random_orders, n):
+        index = CustomerIndex()
+        index.extend(random_orders[100:], start=100)
+        assert index.get_positions_with_quantity(n) == \
+               [position for position, order in enumerate(random_orders) if position >= 100 and order.quantity == n]
+
+    @pytest.mark.parametrize('n', [0, 1, 2, 5])
+    def test_uniform_quantity_customers(self, n):
+        customers = [Customer(f'NAME{chr(65 + i)}', 'SURNAME', 30, f'c{i}@gmail.com') for i in range(3)]
+        product, date = Product('PRODUCTA', Decimal('1.00'), Category.A), datetime(2022, 1, 1, tzinfo=timezone.utc)
+        index = CustomerIndex()
+        for position, (customer, quantity) in enumerate([(0, 2), (1, 2), (0, 2), (2, 5), (1, 3), (2, 5)]):
+            index.add(Order(customers[customer], product, quantity, date), position)
+        assert index.get_clients_num_that_ordered_at_least_n_products_per_transaction(n) == {2: 1, 5: 1}.get(n, 0)
+
+    def test_queries_match_full_rescan(self, random_orders):
+        index, columns = CustomerIndex(), OrdersColumns.from_orders(random_orders)
+        index.extend(random_orders)
+        assert index.get_customers_orders_summary() == columns.get_customers_orders_summary()
+        for k in (None, 1, 3, 10):
+            assert index.get_client_with_most_valuable_cart(k) == columns.get_client_with_most_valuable_cart(k)
+        for n in range(7):
+            assert index.get_clients_num_that_ordered_at_least_n_products_per_transaction(n) == \
+                   columns.get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    def test_orders_are_kept_only_when_needed(self, random_orders):
+        aggregates = OrdersAggregates(('carts',))
+        aggregates.extend(random_orders)
+        assert not aggregates.customers.keep_orders and not aggregates.customers.positions
+        assert aggregates.get_client_with_most_valuable_cart() == \
+               OrdersColumns.from_orders(random_orders).get_client_with_most_valuable_cart()
+        with pytest.raises(ValueError, match='keep_orders'):
+            aggregates.customers.get_customer_positions(random_orders[0].customer)
+
+
+class TestOrdersServiceCustomerIndex:
+    def test_customer_orders_follow_added_orders(self, random_orders):
+        service = OrdersService(random_orders[:100])
+        customer = random_orders[0].customer
+        assert service.get_customer_orders(customer) == [order for order in random_orders[:100]
+                                                         if order.customer == customer]
+        service.add_orders(random_orders[100:])
+        assert service.get_customer_orders(customer) == [order for order in random_orders if order.customer == customer]
+        assert service.get_customer_orders(Customer('NOBODY', 'SURNAME', 30, 'nobody@gmail.com')) == []
+
+    def test_orders_with_quantity(self, random_orders):
+        service = OrdersService(list(random_orders))
+        for n in range(7):
+            assert service.get_orders_with_quantity(n) == [order for order in random_orders if order.quantity == n]
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import pytz
+
+from ecomerceapp.ecomerce_service.date_index import DateIndex
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+def get_expected_totals(orders: list[Order], start_date: datetime, end_date: datetime) -> tuple[int, int, Decimal]:
+    valid_orders = [order for order in orders if order.is_order_in_date_range(start_date, end_date)]
+    return (len(valid_orders), sum(order.quantity for order in valid_orders),
+            sum((order.get_total_price() for order in valid_orders), Decimal('0')))
+
+
+@pytest.fixture
+def date_ranges() -> list[tuple[datetime, datetime]]:
+    rng = random.Random(3)
+    start = datetime(2021, 12, 1, tzinfo=pytz.timezone('UTC'))
+    ranges = []
+    for _ in range(50):
+        first, second = sorted(start + timedelta(days=rng.randint(0, 420)) for _ in range(2))
+        ranges.append((first, second))
+    return ranges
+
+
+class TestDateIndex:
+    @pytest.mark.parametrize('max_pending', [0, 5, 1024])
+    def test_totals_match_full_scan_for_unsorted_appends(self, random_orders, date_ranges, max_pending):
+        date_index = DateIndex(max_pending)
+        date_index.extend(random_orders)
+        assert len(date_index) == len(random_orders)
+        for start_date, end_date in date_ranges:
+            assert (date_index.get_orders_count(start_date, end_date),
+                    date_index.get_products_quantity(start_date, end_date),
+                    date_index.get_orders_value(start_date, end_date)) == \
+                   get_expected_totals(random_orders, start_date, end_date)
+
+    @pytest.mark.parametrize('max_pending', [0, 5, 1024])
+    def test_values_have_digits_of_decimal_sum_of_range(self, random_orders, date_ranges, max_pending):
+        # prices have 0 to 3 decimal places, only orders inside range may decide number of decimal places
+        date_index = DateIndex(max_pending)
+        date_index.extend(random_orders)
+        for start_date, end_date in date_ranges:
+            assert repr(date_index.get_orders_value(start_date, end_date)) == \
+                   repr(get_expected_totals(random_orders, start_date, end_date)[2])
+
+    def test_sorted_appends_do_not_use_pending_buffer(self, random_orders):
+        date_index = DateIndex()
+        date_index.extend(sorted(random_orders, key=lambda order: order.order_date))
+        assert date_index.pending == []
+
+    def test_boundaries_are_inclusive(self, random_orders):
+        date_index = DateIndex()
+        date_index.extend(random_orders)
+        date = random_orders[0].order_date
+        assert date_index.get_orders_count(date, date) == get_expected_totals(random_orders, date, date)[0] > 0
+
+    def test_reversed_range_is_empty(self, random_orders):
+        date_index = DateIndex()
+        date_index.extend(random_orders)
+        assert date_index.get_orders_count(datetime(2023, 1, 1, tzinfo=pytz.timezone('UTC')),
+                                           datetime(2022, 1, 1, tzinfo=pytz.timezone('UTC'))) == 0
+
+    def test_average_product_price_matches_full_scan(self, random_orders, date_ranges):
+        service = OrdersService(random_orders)
+        for start_date, end_date in date_ranges:
+            _, quantity, value = get_expected_totals(random_orders, start_date, end_date)
+            if quantity:
+                assert service.get_average_product_price_in_date_range(start_date, end_date) == value / quantity
+
+    @pytest.mark.parametrize('max_pending', [0, 1024])
+    @pytest.mark.parametrize('reverse', [False, True])
+    def test_values_have_decimal_places_of_orders_in_range(self, max_pending, reverse):
+        customer = Customer('ADAM', 'SMITH', 30, 'adam@gmail.com')
+        date = datetime(2022, 1, 1, tzinfo=pytz.timezone('UTC'))
+        orders = [Order(customer, Product(name, Decimal(price), Category.A), 1, date + timedelta(days=day))
+                  for name, price, day in [('TV', '10.50', 1), ('RADIO', '7', 2), ('PHONE', '7', 3)]]
+        date_index = DateIndex(max_pending)
+        date_index.extend(reversed(orders) if reverse else orders)
+        # neither 10.50 order outside range nor order of inserting decides number of decimal places
+        assert repr(date_index.get_orders_value(date + timedelta(days=2), date + timedelta(days=2))) == "Decimal('7')"
+        assert repr(date_index.get_orders_value(date + timedelta(days=2), date + timedelta(days=3))) == "Decimal('14')"
+        assert repr(date_index.get_orders_value(date, date + timedelta(days=3))) == "Decimal('24.50')"
+
+    def test_average_product_price_without_orders(self):
+        date = datetime(2022, 1, 1, tzinfo=pytz.timezone('UTC'))
+        with pytest.raises(ZeroDivisionError) as e:
+            DateIndex().get_average_product_price(date, date)
+        assert e.value.args[0] == 'product_count equals 0 therefore it cannot be valid divisor'
+
+
+class TestOrdersServiceDateRange:
+    def test_count_and_value_follow_added_orders(self, random_orders, date_ranges):
+        service = OrdersService(random_orders[:100])
+        service.add_orders(random_orders[100:])
+        for start_date, end_date in date_ranges[:10]:
+            count, _, value = get_expected_totals(random_orders, start_date, end_date)
+            assert service.get_orders_count_in_date_range(start_date, end_date) == count
+            assert service.get_orders_value_in_date_range(start_date, end_date) == value
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.ecomerce_service.columns import OrdersColumns
+from ecomerceapp.ecomerce_service.discount import DEFAULT_DISCOUNT_ENGINE, DiscountEngine, CustomerAgeRule, \
+    OrderDateRule
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+REFERENCE_TIME = datetime(2023, 1, 30, 15, 30, tzinfo=timezone.utc)
+
+
+def create_order(age: int, order_date: datetime) -> Order:
+    return Order(Customer('ADAM', 'SMITH', age, 'adam@gmail.com'), Product('TV', Decimal('100'), Category.A), 2,
+                 order_date)
+
+
+class TestOrderDateRule:
+    @pytest.mark.parametrize('order_date, is_matched', [
+        (datetime(2023, 1, 30, 15, 30, tzinfo=timezone.utc), True),
+        (datetime(2023, 2, 1, 15, 30, tzinfo=timezone.utc), True),
+        (datetime(2023, 2, 1, 15, 31, tzinfo=timezone.utc), False),
+        (datetime(2023, 1, 30, 15, 29, tzinfo=timezone.utc), False),
+    ])
+    def test_window_crosses_month_end(self, order_date, is_matched):
+        is_in_window = OrderDateRule(Decimal('0.98')).get_predicate(REFERENCE_TIME)
+        assert is_in_window(create_order(30, order_date)) is is_matched
+        columns = OrdersColumns.from_orders([create_order(30, order_date)])
+        assert OrderDateRule(Decimal('0.98')).get_mask(columns, REFERENCE_TIME) == [is_matched]
+
+    def test_window_is_two_days_from_reference_time(self):
+        reference_time = datetime(2023, 1, 31, 1, 0, tzinfo=timezone(timedelta(hours=3)))
+        assert OrderDateRule(Decimal('0.98')).get_window(reference_time) == \
+               (reference_time, datetime(2023, 2, 1, 22, 0, tzinfo=timezone.utc))
+
+
+class TestDiscountEngine:
+    def test_first_matching_rule_sets_rate(self):
+        young_recent_order = create_order(20, REFERENCE_TIME)
+        assert young_recent_order.get_value_after_discount(REFERENCE_TIME) == Decimal('200') * Decimal('0.97')
+        assert create_order(30, REFERENCE_TIME).get_value_after_discount(REFERENCE_TIME) == \
+               Decimal('200') * Decimal('0.98')
+        assert create_order(30, datetime(2020, 1, 1, tzinfo=timezone.utc)).get_value_after_discount(REFERENCE_TIME) \
+               == Decimal('200')
+
+    def test_custom_rules_table(self):
+        engine = DiscountEngine((OrderDateRule(Decimal('0.5'), days=0), CustomerAgeRule(Decimal('0.9'), 40)))
+        orders = [create_order(20, REFERENCE_TIME), create_order(30, REFERENCE_TIME + timedelta(days=1)),
+                  create_order(50, REFERENCE_TIME)]
+        assert [engine.get_value_after_discount(order, REFERENCE_TIME) for order in orders] == \
+               [Decimal('100.0'), Decimal('180.0'), Decimal('100.0')]
+        assert engine.get_orders_value_after_discounts(orders, REFERENCE_TIME) == Decimal('380')
+
+    def test_batch_matches_per_order_values(self, random_orders):
+        reference_time = random_orders[0].order_date
+        assert DEFAULT_DISCOUNT_ENGINE.get_orders_value_after_discounts(random_orders, reference_time) == \
+               sum(order.get_value_after_discount(reference_time) for order in random_orders)
+
+    def test_columns_match_orders(self, random_orders):
+        for reference_time in {order.order_date for order in random_orders[:20]}:
+            assert DEFAULT_DISCOUNT_ENGINE.get_columns_value_after_discounts(
+                OrdersColumns.from_orders(random_orders), reference_time) == \
+                   OrdersService(random_orders).get_orders_value_after_discounts(reference_time)
+
+    def test_empty_batch(self):
+        assert DEFAULT_DISCOUNT_ENGINE.get_orders_value_after_discounts([]) == 0
+        assert DEFAULT_DISCOUNT_ENGINE.get_columns_value_after_discounts(OrdersColumns()) == 0
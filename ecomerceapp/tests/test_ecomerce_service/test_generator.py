@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig, _get_letters
+from ecomerceapp.ecomerce_service.loader import iter_json_records, load_orders
+from ecomerceapp.ecomerce_service.validator import ServiceDataValidator
+
+
+class TestOrdersGenerator:
+    @pytest.mark.parametrize(('n', 'letters'), [(0, 'A'), (25, 'Z'), (26, 'AA'), (701, 'ZZ'), (702, 'AAA')])
+    def test_get_letters(self, n, letters):
+        assert _get_letters(n) == letters
+
+    def test_valid_records_pass_validation(self):
+        records = list(OrdersGenerator(OrdersGeneratorConfig(customers=50, products=10)).generate(500))
+        assert all(map(ServiceDataValidator.validate_order_data, records))
+
+    def test_cardinality_is_respected(self):
+        orders = load_orders(OrdersGenerator(OrdersGeneratorConfig(customers=5, products=3)).generate(500))
+        assert len({order.customer for order in orders}) <= 5
+        assert len({order.product for order in orders}) <= 3
+
+    def test_invalid_rate(self):
+        config = OrdersGeneratorConfig(invalid_rate=0.2, seed=1)
+        records = list(OrdersGenerator(config).generate(2000))
+        invalid = len(records) - len(load_orders(records))
+        assert 300 < invalid < 500
+
+    def test_same_seed_gives_same_records(self):
+        config = OrdersGeneratorConfig(seed=5)
+        assert list(OrdersGenerator(config).generate(100)) == list(OrdersGenerator(config).generate(100))
+
+    @pytest.mark.parametrize('file_name', ['orders.json', 'orders.jsonl'])
+    def test_write(self, tmp_path, file_name):
+        path = str(tmp_path / file_name)
+        OrdersGenerator().write(path, 20)
+        assert list(iter_json_records(path)) == list(OrdersGenerator().generate(20))
+
+    def test_write_json_array_is_valid_json(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        OrdersGenerator().write(str(path), 0)
+        assert json.loads(path.read_text()) == []
+
+    @pytest.mark.parametrize('config', [OrdersGeneratorConfig(customers=0), OrdersGeneratorConfig(invalid_rate=2)])
+    def test_invalid_config(self, config):
+        with pytest.raises(ValueError):
+            OrdersGenerator(config)
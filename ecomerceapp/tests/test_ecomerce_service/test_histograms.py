@@ -0,0 +1,118 @@
+import random
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.common.utils import get_top_k, get_bottom_k
+from ecomerceapp.ecomerce_service.histograms import GRANULARITIES, OrdersHistograms, TimeHistogram, get_bucket_start
+from ecomerceapp.ecomerce_service.model import Order
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+def get_bucket(granularity: str, moment: datetime) -> datetime:
+    """ Beginning of bucket computed with datetime arithmetic, independently of bucket ids """
+    moment = moment.astimezone(timezone.utc)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def get_expected_buckets(orders: list[Order], granularity: str) -> dict[datetime, dict]:
+    buckets = defaultdict(lambda: {'count': 0, 'quantity': 0, 'value': Decimal('0')})
+    for order in orders:
+        bucket = buckets[get_bucket(granularity, order.order_date)]
+        bucket['count'] += 1
+        bucket['quantity'] += order.quantity
+        bucket['value'] += order.get_total_price()
+    return dict(sorted(buckets.items()))
+
+
+@pytest.fixture
+def histograms(random_orders) -> OrdersHistograms:
+    histograms = OrdersHistograms()
+    histograms.extend(random_orders)
+    return histograms
+
+
+@pytest.fixture
+def windows(random_orders) -> list[tuple[datetime, datetime]]:
+    rng = random.Random(7)
+    dates = [order.order_date for order in random_orders]
+    return [tuple(sorted(rng.sample(dates, 2))) for _ in range(30)]
+
+
+class TestTimeHistogram:
+    @pytest.mark.parametrize('granularity', GRANULARITIES)
+    def test_buckets_match_full_scan(self, random_orders, histograms, granularity):
+        assert histograms[granularity].get_buckets() == get_expected_buckets(random_orders, granularity)
+
+    @pytest.mark.parametrize('granularity', GRANULARITIES)
+    def test_window_totals_match_full_scan(self, random_orders, histograms, windows, granularity):
+        expected_buckets = get_expected_buckets(random_orders, granularity)
+        for start_date, end_date in windows:
+            window = [bucket for start, bucket in expected_buckets.items()
+                      if get_bucket(granularity, start_date) <= start <= get_bucket(granularity, end_date)]
+            assert histograms[granularity].get_totals(start_date, end_date) == {
+                'count': sum(bucket['count'] for bucket in window),
+                'quantity': sum(bucket['quantity'] for bucket in window),
+                'value': sum((bucket['value'] for bucket in window), Decimal('0'))}
+
+    @pytest.mark.parametrize('granularity', GRANULARITIES)
+    @pytest.mark.parametrize('k', [None, 1, 3])
+    def test_busiest_and_quietest_buckets_of_window(self, random_orders, histograms, windows, granularity, k):
+        for start_date, end_date in windows[:10]:
+            counts = Counter({start: bucket['count'] for start, bucket in get_expected_buckets(
+                random_orders, granularity).items() if get_bucket(granularity, start_date) <= start <=
+                get_bucket(granularity, end_date)})
+            histogram = histograms[granularity]
+            assert histogram.get_busiest(k, start_date, end_date) == get_top_k(counts.items(), k or 1)
+            assert histogram.get_quietest(k, start_date, end_date) == get_bottom_k(counts.items(), k or 1)
+
+    def test_bucket_starts(self):
+        assert get_bucket_start('week', 0) == datetime(1969, 12, 29, tzinfo=timezone.utc)
+        assert get_bucket_start('month', 2023 * 12 + 1) == datetime(2023, 2, 1, tzinfo=timezone.utc)
+        assert get_bucket_start('hour', 1) == datetime(1970, 1, 1, 1, tzinfo=timezone.utc)
+
+    def test_reversed_window_is_empty(self, histograms, random_orders):
+        dates = sorted(order.order_date for order in random_orders)
+        assert histograms['month'].get_totals(dates[-1], dates[0]) == {'count': 0, 'quantity': 0,
+                                                                        'value': Decimal('0.000')}
+        with pytest.raises(IndexError):
+            histograms['day'].get_busiest(None, dates[-1], dates[0])
+
+    def test_unknown_granularity(self, histograms):
+        with pytest.raises(ValueError) as e:
+            TimeHistogram('year')
+        assert e.value.args[0] == 'Unknown granularity: year, available: hour, day, week, month'
+        with pytest.raises(ValueError):
+            histograms['minute']
+
+
+class TestOrdersServiceHistograms:
+    def test_histograms_follow_added_orders(self, random_orders):
+        service = OrdersService(random_orders[:50])
+        assert service.get_orders_totals_in_buckets('day')['count'] == 50
+        service.add_orders(random_orders[50:])
+        assert service.get_orders_histogram('week') == get_expected_buckets(random_orders, 'week')
+        assert service.get_orders_totals_in_buckets('day')['count'] == len(random_orders)
+
+    def test_date_queries_with_granularity(self, random_orders):
+        service = OrdersService(random_orders)
+        # ties of buckets are in time order
+        counts = sorted(Counter(get_bucket('month', order.order_date) for order in random_orders).items())
+        assert service.get_date_with_most_orders_made(2, granularity='month') == get_top_k(counts, 2)
+        assert service.get_date_with_least_orders_made(granularity='month') == get_bottom_k(counts, 1)
+        assert service.get_date_with_most_orders_made() == OrdersService(random_orders).aggregates.dates.get_top()
+
+    def test_window_requires_granularity(self, random_orders):
+        with pytest.raises(ValueError) as e:
+            OrdersService(random_orders).get_date_with_most_orders_made(start_date=random_orders[0].order_date)
+        assert e.value.args[0] == 'start_date and end_date require granularity'
@@ -1,11 +1,14 @@
 import json
+import pickle
 import pytest
 
 from typing import Final
 
 from ecomerceapp.common.validator import matches_regex
-from ecomerceapp.ecomerce_service.model import Order
-from ecomerceapp.ecomerce_service.loader import load_json_file, load_orders
+from ecomerceapp.ecomerce_service.model import Order, LazyOrder, Interner
+from ecomerceapp.ecomerce_service.loader import load_json_file, load_orders, iter_json_array, iter_json_lines, \
+    stream_orders, stream_orders_from_file, iter_batches, load_orders_chunk, load_orders_parallel, \
+    encode_orders_chunk
 
 
 class TestJsonLoader:
@@ -78,3 +81,161 @@ class TestOrdersLoader:
             load_orders(self.incorrect_data_type)
 
         assert matches_regex(r"^.*object has no attribute 'keys'", e.value.args[0])
+
+
+class TestStreamingLoader:
+    valid_record = TestOrdersLoader.correct_data[0]
+
+    @pytest.mark.parametrize('content', ['[1, 2, 3]', '  [1,2,3]\n', '[\n  1,\n  2 ,\n  3\n]'])
+    def test_iter_json_array_with_correct_file(self, tmp_path, content):
+        path = tmp_path / 'file.json'
+        path.write_text(content)
+        assert list(iter_json_array(str(path))) == [1, 2, 3]
+
+    def test_iter_json_array_with_elements_split_between_chunks(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text(json.dumps(TestOrdersLoader.correct_data + [12345, "a,]b"]))
+        assert list(iter_json_array(str(path), chunk_size=3)) == TestOrdersLoader.correct_data + [12345, "a,]b"]
+
+    def test_iter_json_array_with_empty_array(self, tmp_path):
+        path = tmp_path / 'file.json'
+        path.write_text(' [ ] ')
+        assert list(iter_json_array(str(path))) == []
+
+    def test_iter_json_array_with_object_on_top_level(self, tmp_path):
+        path = tmp_path / 'file.json'
+        path.write_text('{"a": 1}')
+        with pytest.raises(json.decoder.JSONDecodeError):
+            list(iter_json_array(str(path)))
+
+    @pytest.mark.parametrize('content', [
+        '[\n  {"a": 1},\n  {"b": 2},\n  {"c": x}\n]',
+        '[\n  {"a": 1},\n  {"b": 2}\n  {"c": 3}\n]',
+        '[{"a": 1}, {"b": 2}, {"c": 3}, {"d": }]',
+        '[\n  {"a": 1},\n  {"b": "2\n"}]',
+    ])
+    @pytest.mark.parametrize('chunk_size', [1, 5, 16, 1024])
+    def test_iter_json_array_error_has_position_in_file(self, tmp_path, content, chunk_size):
+        path = tmp_path / 'file.json'
+        path.write_text(content)
+        with pytest.raises(json.decoder.JSONDecodeError) as e:
+            list(iter_json_array(str(path), chunk_size))
+        with pytest.raises(json.decoder.JSONDecodeError) as expected:
+            json.loads(content)
+        assert (e.value.msg, e.value.lineno, e.value.colno, e.value.pos) == \
+               (expected.value.msg, expected.value.lineno, expected.value.colno, expected.value.pos)
+        assert str(e.value) == str(expected.value)
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+    def test_iter_json_array_without_array_error_has_position_in_file(self, tmp_path, chunk_size):
+        path = tmp_path / 'file.json'
+        path.write_text('\n\n  {"a": 1}')
+        with pytest.raises(json.decoder.JSONDecodeError) as e:
+            list(iter_json_array(str(path), chunk_size))
+        assert (e.value.msg, e.value.lineno, e.value.colno, e.value.pos) == ('Expecting top-level array', 3, 3, 4)
+
+    def test_iter_json_array_does_not_read_rest_of_file_after_malformed_element(self, tmp_path):
+        path = tmp_path / 'file.json'
+        path.write_text('[{"a": x}, ' + ', '.join(['{"b": 2}'] * 100_000) + ']')
+        with pytest.raises(json.decoder.JSONDecodeError) as e:
+            list(iter_json_array(str(path), chunk_size=64))
+        assert (e.value.msg, e.value.pos) == ('Expecting value', 7)
+        assert len(e.value.doc) <= 64
+
+    @pytest.mark.parametrize('element', ['"' + 'a' * 200_000 + '"', '-Infinity', 'true', '"\\u00e9"', '1.5e10'])
+    def test_iter_json_array_with_elements_longer_than_chunk(self, tmp_path, element):
+        path = tmp_path / 'file.json'
+        path.write_text(f'[{element}, {{"a": [{element}]}}]')
+        assert list(iter_json_array(str(path), chunk_size=4)) == json.loads(path.read_text())
+
+    def test_iter_json_array_with_incorrect_path(self):
+        with pytest.raises(FileNotFoundError) as e:
+            list(iter_json_array('xyz.json'))
+        assert 'File does not exist' == e.value.args[0]
+
+    def test_iter_json_lines(self, tmp_path):
+        path = tmp_path / 'orders.jsonl'
+        path.write_text('\n'.join(json.dumps(record) for record in TestOrdersLoader.correct_data) + '\n\n')
+        assert list(iter_json_lines(str(path))) == TestOrdersLoader.correct_data
+
+    def test_stream_orders_skips_invalid_records(self):
+        assert list(stream_orders([{}, self.valid_record, {}])) == [Order.from_dict(self.valid_record)]
+
+    def test_stream_orders_shares_customers_and_products(self):
+        orders = list(stream_orders([self.valid_record, self.valid_record]))
+        assert orders[0].customer is orders[1].customer
+        assert orders[0].product is orders[1].product
+
+    def test_stream_orders_logs_rejection_reasons(self, caplog):
+        invalid_record = {**self.valid_record, 'quantity': -1}
+        with caplog.at_level('WARNING'):
+            list(stream_orders([invalid_record, {}, invalid_record]))
+        assert caplog.messages == ["3 json objects weren't loaded correctly",
+                                   "2 rejected by rule 'min_value' of field 'quantity'",
+                                   "1 rejected by rule 'keys' of field ''"]
+
+    def test_stream_orders_is_lazy(self):
+        def records():
+            yield self.valid_record
+            raise AssertionError('Second record should not be requested')
+
+        assert next(stream_orders(records())) == Order.from_dict(self.valid_record)
+
+    @pytest.mark.parametrize('file_name', ['orders.json', 'orders.jsonl'])
+    def test_stream_orders_from_file(self, tmp_path, file_name):
+        path = tmp_path / file_name
+        if file_name.endswith('.jsonl'):
+            path.write_text('\n'.join(json.dumps(record) for record in TestOrdersLoader.correct_data))
+        else:
+            path.write_text(json.dumps(TestOrdersLoader.correct_data))
+        assert list(stream_orders_from_file(str(path))) == load_orders(TestOrdersLoader.correct_data)
+
+    def test_stream_lazy_orders(self):
+        orders = list(stream_orders([self.valid_record, {}, self.valid_record], lazy=True))
+        assert all(isinstance(order, LazyOrder) for order in orders)
+        assert orders == load_orders([self.valid_record, self.valid_record])
+        assert orders[0].product is orders[1].product
+
+    def test_iter_batches(self):
+        assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_iter_batches_with_invalid_batch_size(self):
+        with pytest.raises(ValueError) as e:
+            list(iter_batches(range(5), 0))
+        assert e.value.args[0] == 'batch_size has to be positive integer'
+
+
+class TestParallelOrdersLoader:
+    records = [{}] + TestOrdersLoader.correct_data * 10 + [{**TestOrdersLoader.correct_data[0], 'quantity': -1}]
+
+    def test_load_orders_chunk(self):
+        orders, rejections = load_orders_chunk(self.records)
+        assert orders == load_orders(self.records)
+        assert sum(rejections.values()) == 2
+
+    def test_encode_orders_chunk_keeps_distinct_values_once(self):
+        encoded, rejections = encode_orders_chunk(self.records)
+        assert len(encoded) == len(self.records) - 2
+        assert sum(rejections.values()) == 2
+        assert len(encoded.customers) == len({str(record['customer']) for record in TestOrdersLoader.correct_data})
+        assert len(encoded.products) == len({str(record['product']) for record in TestOrdersLoader.correct_data})
+        orders = pickle.loads(pickle.dumps(encoded)).decode(Interner())
+        assert orders == load_orders(self.records)
+        assert orders[0].customer is orders[len(TestOrdersLoader.correct_data)].customer
+
+    @pytest.mark.parametrize(('workers', 'chunk_size'), [(1, 100), (2, 3), (3, 1)])
+    def test_result_is_the_same_as_sequential_loading(self, workers, chunk_size):
+        assert load_orders_parallel(iter(self.records), workers, chunk_size) == load_orders(self.records)
+
+    def test_summary_is_the_same_as_sequential_loading(self, caplog):
+        with caplog.at_level('INFO'):
+            load_orders(self.records)
+            sequential_messages = list(caplog.messages)
+            caplog.clear()
+            load_orders_parallel(self.records, workers=2, chunk_size=4)
+        assert caplog.messages == sequential_messages
+
+    def test_with_invalid_workers_number(self):
+        with pytest.raises(ValueError) as e:
+            load_orders_parallel(self.records, workers=-1)
+        assert e.value.args[0] == 'workers has to be positive integer'
@@ -1,12 +1,14 @@
+import pickle
 import unittest
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
 
 import pytest
 
-from ecomerceapp.ecomerce_service.model import Customer, Product, Category, Order
+from ecomerceapp.common.money import Money
+from ecomerceapp.ecomerce_service.model import Customer, Product, Category, Order, Interner, LazyOrder
 
 
 # CUSTOMER
@@ -111,6 +113,16 @@ class TestOrder:
     def test_get_total_price(self):
         assert self.valid_order.get_total_price() == Decimal('200.00') * 3
 
+    @pytest.mark.parametrize('price', ['200.00', '7.', '0.125', '15', '0'])
+    def test_total_price_has_the_same_digits_as_decimal_product(self, price):
+        product = Product('CAR', Decimal(price), Category.A)
+        assert repr(Order(self.valid_customer, product, 3, self.valid_order_date).get_total_price()) == \
+               repr(Decimal(price) * 3)
+
+    def test_price_is_converted_to_minor_units_once(self):
+        assert (self.valid_product.price_units, self.valid_product.price_scale) == (20000, 2)
+        assert self.valid_order.get_total_money() == Money(60000, 2)
+
     def test_is_order_in_date_range_with_correct_range(self, correct_date_ranges):
         assert self.valid_order.is_order_in_date_range(*correct_date_ranges)
 
@@ -133,7 +145,8 @@ class TestOrder:
         assert self.valid_order.get_value_after_discount() == correct_value
 
     def test_get_value_after_discount_for_customer_with_date_matched(self):
-        order = Order(Customer("TESTER", "TEST", 26, 'test@gmail.com'), self.valid_product, self.valid_quantity, datetime.now(tz=pytz.timezone("UTC")))
+        # order is made a bit later than now, so it's still in window when discount reads the clock
+        order = Order(Customer("TESTER", "TEST", 26, 'test@gmail.com'), self.valid_product, self.valid_quantity, datetime.now(tz=pytz.timezone("UTC")) + timedelta(hours=1))
         assert order.get_value_after_discount() == (Decimal('600') * Decimal('0.98'))
 
     def test_get_value_after_discount_for_both_condition_matched(self):
@@ -150,3 +163,81 @@ class TestOrder:
             Order(self.valid_customer, 'Product', self.valid_quantity, self.valid_order_date)
         assert 'product is not Product instance' == e.value.args[0]
 
+
+class TestSlottedModels:
+    @pytest.mark.parametrize('instance', [
+        Customer("MARIA", 'SMOLKE', 18, 'smolke@gmail.com'),
+        Product('CAR', Decimal('200.00'), Category.A),
+        TestOrder.valid_order
+    ])
+    def test_instances_have_no_dict(self, instance):
+        assert not hasattr(instance, '__dict__')
+
+    def test_hash_is_consistent_with_equality(self):
+        assert hash(Customer("MARIA", 'SMOLKE', 18, 'a@gmail.com')) == hash(Customer("MARIA", 'SMOLKE', 18, 'a@gmail.com'))
+        assert hash(Product('CAR', Decimal('200.00'), Category.A)) == hash(Product('CAR', Decimal('200'), Category.A))
+
+    def test_pickling_keeps_equality_and_hash(self):
+        order = pickle.loads(pickle.dumps(TestOrder.valid_order))
+        assert order == TestOrder.valid_order
+        assert hash(order.customer) == hash(TestOrder.valid_customer)
+
+
+class TestInterner:
+    order_data = {
+        "customer": {"name": "MARIA", "surname": "SMOLKE", "age": 18, "email": "smolke@gmail.com"},
+        "product": {"name": "CAR", "price": "200.00", "category": "A"},
+        "quantity": 3,
+        "order_date": "2022-12-20T00:00:00+00:00"
+    }
+
+    def test_identical_customers_and_products_are_shared(self):
+        interner = Interner()
+        first_order = Order.from_dict(self.order_data, interner)
+        second_order = Order.from_dict({**self.order_data, "quantity": 1}, interner)
+        assert first_order.customer is second_order.customer
+        assert first_order.product is second_order.product
+
+    def test_interned_order_equals_not_interned_one(self):
+        assert Order.from_dict(self.order_data, Interner()) == Order.from_dict(self.order_data) == TestOrder.valid_order
+
+    def test_different_customers_are_not_shared(self):
+        interner = Interner()
+        customer = interner.get_customer(self.order_data['customer'])
+        assert interner.get_customer({**self.order_data['customer'], "age": 19}) is not customer
+
+
+class TestLazyOrder:
+    order_data = TestInterner.order_data
+
+    def test_lazy_order_equals_order(self):
+        lazy_order = LazyOrder.from_dict(self.order_data, Interner())
+        assert lazy_order == TestOrder.valid_order
+        assert TestOrder.valid_order == lazy_order
+        assert hash(lazy_order) == hash(TestOrder.valid_order)
+        assert lazy_order.materialize() == TestOrder.valid_order
+        assert LazyOrder({**self.order_data, "quantity": 1}) != lazy_order
+
+    def test_fields_are_converted_on_first_access_only(self):
+        lazy_order = LazyOrder(self.order_data)
+        assert lazy_order.quantity == 3
+        assert (lazy_order._customer, lazy_order._product, lazy_order._order_date) == (None, None, None)
+        assert lazy_order.product.category == Category.A
+        assert lazy_order.product is lazy_order.product
+        assert lazy_order._customer is None and lazy_order._order_date is None
+
+    def test_methods_of_order(self):
+        lazy_order, order = LazyOrder(self.order_data), TestOrder.valid_order
+        assert lazy_order.get_total_price() == order.get_total_price()
+        assert lazy_order.is_customer_older_than() == order.is_customer_older_than()
+        assert lazy_order.is_quantity_equal_to(3)
+        assert lazy_order.get_value_after_discount(order.order_date) == order.get_value_after_discount(order.order_date)
+
+    def test_fields_cannot_be_set(self):
+        with pytest.raises(AttributeError):
+            LazyOrder(self.order_data).quantity = 1
+
+    def test_pickling(self):
+        lazy_order = pickle.loads(pickle.dumps(LazyOrder(self.order_data, Interner())))
+        assert lazy_order == TestOrder.valid_order
+        assert hash(lazy_order.customer) == hash(TestOrder.valid_customer)
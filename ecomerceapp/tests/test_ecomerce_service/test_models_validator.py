@@ -1,3 +1,6 @@
+import pytest
+
+from ecomerceapp.common.validator import Rejection
 from ecomerceapp.ecomerce_service.validator import ServiceDataValidator
 from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import valid_customer_data, \
     invalid_customer_data, invalid_structured_data, valid_product_data, invalid_product_data, valid_order_data
@@ -30,3 +33,29 @@ class TestServiceDataValidator:
 
         def test_for_invalid_structured_dict(self, invalid_structured_data):
             assert ServiceDataValidator.validate_order_data(invalid_structured_data) is False
+
+    class TestGetOrderDataRejection:
+        def test_for_valid_data(self, valid_order_data):
+            assert ServiceDataValidator.get_order_data_rejection(valid_order_data) is None
+
+        def test_for_invalid_structured_dict(self, invalid_structured_data):
+            assert ServiceDataValidator.get_order_data_rejection(invalid_structured_data) == Rejection('', 'keys')
+
+        @pytest.mark.parametrize(('section', 'key', 'value', 'rejection'), [
+            ('customer', 'name', 'Da', Rejection('customer.name', 'pattern')),
+            ('customer', 'age', 17, Rejection('customer.age', 'min_value')),
+            ('customer', 'age', '18', Rejection('customer.age', 'type')),
+            ('customer', 'email', 'd.smolczynski1gmail.com', Rejection('customer.email', 'pattern')),
+            ('product', 'price', '1$', Rejection('product.price', 'pattern')),
+            ('product', 'category', 'Aa', Rejection('product.category', 'enum')),
+            (None, 'quantity', -1, Rejection('quantity', 'min_value')),
+            (None, 'order_date', '2022-12-20', Rejection('order_date', 'pattern')),
+        ])
+        def test_for_invalid_field(self, valid_order_data, section, key, value, rejection):
+            (valid_order_data[section] if section else valid_order_data)[key] = value
+            assert ServiceDataValidator.get_order_data_rejection(valid_order_data) == rejection
+            assert ServiceDataValidator.validate_order_data(valid_order_data) is False
+
+        def test_for_nested_data_not_being_dict(self, valid_order_data):
+            valid_order_data['customer'] = 1
+            assert ServiceDataValidator.get_order_data_rejection(valid_order_data) == Rejection('customer', 'type')
@@ -0,0 +1,199 @@
+import pickle
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+from ecomerceapp.ecomerce_service.partitioned import PartitionedOrdersService, PartialAggregates, Partition, \
+    OrdersCatalog
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders, valid_order_data, \
+    valid_product_data, valid_customer_data
+
+QUERIES = [
+    'get_most_expensive_products_per_category', 'get_customers_orders_summary', 'get_date_with_most_orders_made',
+    'get_date_with_least_orders_made', 'get_client_with_most_valuable_cart', 'get_most_popular_category',
+    'get_months_with_quantity_of_ordered_products', 'get_most_popular_categories_for_months_that_orders_occurred'
+]
+TOP_K_QUERIES = [
+    'get_most_expensive_products_per_category', 'get_date_with_most_orders_made', 'get_date_with_least_orders_made',
+    'get_client_with_most_valuable_cart', 'get_most_popular_category'
+]
+
+
+@pytest.fixture(params=['month', 'category', 'customer'])
+def services(request, random_orders) -> tuple[OrdersService, PartitionedOrdersService]:
+    with PartitionedOrdersService(random_orders, partition_by=request.param, partitions_count=5,
+                                  workers=1) as partitioned_service:
+        yield OrdersService(random_orders), partitioned_service
+
+
+def assert_same_result(result, expected):
+    assert result == expected
+    if isinstance(expected, dict):
+        assert list(result) == list(expected)
+
+
+class TestPartitionedOrdersService:
+    @pytest.mark.parametrize('query', QUERIES)
+    def test_query_matches_in_memory_service(self, services, query):
+        service, partitioned_service = services
+        assert_same_result(getattr(partitioned_service, query)(), getattr(service, query)())
+
+    @pytest.mark.parametrize('query', TOP_K_QUERIES)
+    @pytest.mark.parametrize('k', [1, 3, 10])
+    def test_top_k_query_matches_in_memory_service(self, services, query, k):
+        service, partitioned_service = services
+        assert_same_result(getattr(partitioned_service, query)(k), getattr(service, query)(k))
+
+    @pytest.mark.parametrize('start_date, end_date', [
+        (datetime(2022, 3, 1, tzinfo=timezone.utc), datetime(2022, 8, 31, tzinfo=timezone.utc)),
+        (datetime(2000, 1, 1, tzinfo=timezone.utc), datetime(2100, 1, 1, tzinfo=timezone.utc)),
+    ])
+    def test_date_range_queries(self, services, start_date, end_date):
+        service, partitioned_service = services
+        for query in ('get_average_product_price_in_date_range', 'get_orders_count_in_date_range',
+                      'get_orders_value_in_date_range'):
+            assert getattr(partitioned_service, query)(start_date, end_date) == \
+                   getattr(service, query)(start_date, end_date)
+
+    def test_average_price_when_out_of_range(self, services):
+        date = datetime(2010, 1, 1, tzinfo=timezone.utc)
+        with pytest.raises(ZeroDivisionError) as e:
+            services[1].get_average_product_price_in_date_range(date, date)
+        assert e.value.args[0] == 'product_count equals 0 therefore it cannot be valid divisor'
+
+    @pytest.mark.parametrize('n', [0, 1, 2, 5])
+    def test_clients_num(self, services, n):
+        service, partitioned_service = services
+        assert partitioned_service.get_clients_num_that_ordered_at_least_n_products_per_transaction(n) == \
+               service.get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    def test_discounts(self, services, random_orders):
+        service, partitioned_service = services
+        for reference_time in [order.order_date for order in random_orders[:10]]:
+            # repr, because Decimals with different number of decimal places are equal
+            assert repr(partitioned_service.get_orders_value_after_discounts(reference_time)) == \
+                   repr(service.get_orders_value_after_discounts(reference_time))
+
+    def test_discount_rules_that_match_no_order_add_no_decimal_places(self):
+        date = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        customer = Customer('ADAM', 'SMITH', 40, 'adam@gmail.com')
+        orders = [Order(customer, Product('PEN', Decimal('1.00'), Category.A), 3, date),
+                  Order(customer, Product('BOOK', Decimal('5.125'), Category.B), 1, date + timedelta(days=40))]
+        with PartitionedOrdersService(orders, workers=1) as partitioned_service:
+            reference_time = date + timedelta(days=10)
+            assert repr(partitioned_service.get_orders_value_after_discounts(reference_time)) == \
+                   repr(OrdersService(orders).get_orders_value_after_discounts(reference_time)) == "Decimal('8.125')"
+            assert repr(partitioned_service.get_orders_value_after_discounts(date + timedelta(days=100))) == \
+                   "Decimal('8.125')"
+
+    def test_report(self, services):
+        service, partitioned_service = services
+        arguments = {'get_clients_num_that_ordered_at_least_n_products_per_transaction': (2,),
+                     'get_most_popular_category': (2,)}
+        metrics = [*QUERIES, 'get_clients_num_that_ordered_at_least_n_products_per_transaction']
+        assert partitioned_service.get_report(metrics, arguments) == service.get_report(metrics, arguments)
+
+    def test_orders_added_after_query(self, services, random_orders):
+        _, partitioned_service = services
+        partitioned_service.get_most_popular_category()
+        partitioned_service.add_orders(random_orders[:50])
+        service = OrdersService([*random_orders, *random_orders[:50]])
+        for query in QUERIES:
+            assert_same_result(getattr(partitioned_service, query)(), getattr(service, query)())
+        assert len(partitioned_service) == len(service.orders)
+
+    def test_with_process_pool(self, random_orders):
+        service = OrdersService(random_orders)
+        with PartitionedOrdersService(random_orders, workers=2) as partitioned_service:
+            for query in QUERIES:
+                assert_same_result(getattr(partitioned_service, query)(), getattr(service, query)())
+            reference_time = random_orders[0].order_date
+            assert partitioned_service.get_orders_value_after_discounts(reference_time) == \
+                   service.get_orders_value_after_discounts(reference_time)
+
+    def test_month_filter_skips_other_partitions(self, random_orders):
+        service = OrdersService(random_orders)
+        months = {random_orders[0].order_date.month, random_orders[1].order_date.month}
+        with PartitionedOrdersService(random_orders, workers=1) as partitioned_service:
+            result = partitioned_service.get_months_with_quantity_of_ordered_products(months=months)
+            assert_same_result(result, {month: quantity for month, quantity in
+                                        service.get_months_with_quantity_of_ordered_products().items()
+                                        if month in months})
+            assert {month for (_, month), partition in partitioned_service.partitions.items()
+                    if partition.partial is not None} == months
+            month = random_orders[0].order_date.month
+            assert partitioned_service.get_most_popular_categories_for_months_that_orders_occurred([month]) == \
+                   {month: service.get_most_popular_categories_for_months_that_orders_occurred()[month]}
+
+    def test_category_filter_skips_other_partitions(self, random_orders):
+        service = OrdersService(random_orders)
+        category = random_orders[0].product.category
+        with PartitionedOrdersService(random_orders, partition_by='category', workers=1) as partitioned_service:
+            assert partitioned_service.get_most_expensive_products_per_category(2, [category]) == \
+                   {category: service.get_most_expensive_products_per_category(2)[category]}
+            assert [key for key, partition in partitioned_service.partitions.items()
+                    if partition.partial is not None] == [category]
+
+    def test_date_range_skips_other_partitions(self, random_orders):
+        with PartitionedOrdersService(random_orders, workers=1) as partitioned_service:
+            partitioned_service.get_orders_count_in_date_range(datetime(2022, 2, 1, tzinfo=timezone.utc),
+                                                               datetime(2022, 2, 28, tzinfo=timezone.utc))
+            assert [key for key, partition in partitioned_service.partitions.items()
+                    if partition.partial is not None] == [(2022, 2)]
+
+    def test_add_order_from_dict(self, valid_order_data):
+        with PartitionedOrdersService(workers=1) as partitioned_service:
+            partitioned_service.add_order_from_dict(valid_order_data)
+            assert partitioned_service.partitions.popitem()[1].orders == [Order.from_dict(valid_order_data)]
+
+    def test_top_queries_of_empty_service(self):
+        with PartitionedOrdersService(workers=1) as partitioned_service:
+            with pytest.raises(IndexError):
+                partitioned_service.get_most_popular_category()
+            assert partitioned_service.get_most_expensive_products_per_category() == {}
+            with pytest.raises(ValueError, match='k has to be positive integer'):
+                partitioned_service.get_date_with_most_orders_made(0)
+
+    @pytest.mark.parametrize('arguments, message', [
+        ({'partition_by': 'product'}, 'partition_by has to be one of: month, category, customer'),
+        ({'partitions_count': 0}, 'partitions_count has to be positive integer'),
+        ({'workers': -1}, 'workers has to be positive integer'),
+    ])
+    def test_with_invalid_arguments(self, arguments, message):
+        with pytest.raises(ValueError) as e:
+            PartitionedOrdersService(**arguments)
+        assert e.value.args[0] == message
+
+
+class TestPartialAggregates:
+    @staticmethod
+    def get_partial(partition: Partition, catalog: OrdersCatalog) -> PartialAggregates:
+        return PartialAggregates.from_columns(partition.columns.with_tables(catalog.tables))
+
+    def test_merge_of_partials_matches_aggregates_of_all_orders(self, random_orders):
+        catalog, whole, parts = OrdersCatalog(), Partition(), {start: Partition() for start in (200, 0, 100)}
+        for index, order in enumerate(random_orders):
+            whole.add(order, index, catalog)
+            parts[index // 100 * 100].add(order, index, catalog)
+        expected = self.get_partial(whole, catalog)
+        merged = PartialAggregates()
+        for part in parts.values():
+            merged.merge(self.get_partial(part, catalog))
+        for query in QUERIES:
+            if query != 'get_customers_orders_summary':
+                assert_same_result(getattr(merged, query)(), getattr(expected, query)())
+        for query in TOP_K_QUERIES:
+            assert_same_result(getattr(merged, query)(3), getattr(expected, query)(3))
+
+    def test_workers_get_no_orders(self, random_orders):
+        catalog, partition = OrdersCatalog(), Partition()
+        for index, order in enumerate(random_orders):
+            partition.add(order, index, catalog)
+        arguments = pickle.dumps((partition.columns, catalog.tables))
+        partial = pickle.dumps(self.get_partial(partition, catalog))
+        for name in (b'Order', b'Customer', b'Product'):
+            assert name not in arguments and name not in partial
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from ecomerceapp.ecomerce_service.report import build_report, REPORT_METRICS
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+START_DATE = datetime(2022, 2, 1, tzinfo=timezone.utc)
+END_DATE = datetime(2022, 6, 30, tzinfo=timezone.utc)
+ARGUMENTS = {
+    'get_average_product_price_in_date_range': (START_DATE, END_DATE),
+    'get_orders_count_in_date_range': (START_DATE, END_DATE),
+    'get_orders_value_in_date_range': (START_DATE, END_DATE),
+    'get_clients_num_that_ordered_at_least_n_products_per_transaction': (3,),
+}
+
+
+class TestBuildReport:
+    def test_full_report_matches_service_methods(self, random_orders):
+        service = OrdersService(random_orders)
+        report = build_report(random_orders, arguments=ARGUMENTS)
+        assert list(report) == list(REPORT_METRICS)
+        for metric, value in report.items():
+            assert value == getattr(service, metric)(*ARGUMENTS.get(metric, ()))
+
+    def test_orders_are_consumed_in_one_pass(self, random_orders):
+        report = build_report((order for order in random_orders), ['get_most_popular_category',
+                                                                   'get_date_with_most_orders_made'])
+        service = OrdersService(random_orders)
+        assert report == {
+            'get_most_popular_category': service.get_most_popular_category(),
+            'get_date_with_most_orders_made': service.get_date_with_most_orders_made(),
+        }
+
+    def test_date_range_metrics_for_empty_range(self, random_orders):
+        arguments = {metric: (END_DATE, START_DATE) for metric in
+                     ('get_orders_count_in_date_range', 'get_orders_value_in_date_range')}
+        assert build_report(random_orders, list(arguments), arguments) == {
+            'get_orders_count_in_date_range': 0, 'get_orders_value_in_date_range': 0
+        }
+        with pytest.raises(ZeroDivisionError):
+            build_report(random_orders, ['get_average_product_price_in_date_range'],
+                         {'get_average_product_price_in_date_range': (END_DATE, START_DATE)})
+
+    def test_unknown_metric_raises(self, random_orders):
+        with pytest.raises(ValueError, match='Unknown metrics: get_everything'):
+            build_report(random_orders, ['get_most_popular_category', 'get_everything'])
+
+    def test_missing_arguments_raise(self, random_orders):
+        with pytest.raises(ValueError, match='requires arguments: n'):
+            build_report(random_orders, ['get_clients_num_that_ordered_at_least_n_products_per_transaction'])
+
+
+class TestServiceReport:
+    def test_service_report_matches_one_pass_report(self, random_orders):
+        service = OrdersService(random_orders[:200])
+        service.orders.extend(random_orders[200:])
+        assert service.get_report(arguments=ARGUMENTS) == build_report(random_orders, arguments=ARGUMENTS)
+
+    def test_service_report_with_chosen_metrics(self, random_orders):
+        service = OrdersService(random_orders)
+        assert service.get_report(['get_most_popular_category']) == \
+               {'get_most_popular_category': service.get_most_popular_category()}
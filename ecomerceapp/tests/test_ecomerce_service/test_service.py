@@ -4,7 +4,7 @@ import pytest
 import pytz
 from datetime import datetime
 
-from ecomerceapp.ecomerce_service.model import Product, Category, Order, Customer
+from ecomerceapp.ecomerce_service.model import Product, Category, Order, Customer, LazyOrder
 from ecomerceapp.ecomerce_service.service import OrdersService
 # TODO adult_customer is used as fixture
 from .test_models import adult_customer
@@ -54,6 +54,10 @@ class TestOrdersService:
         })
         assert len(orders_service.orders) == 1
 
+    def test_from_orders_consumes_iterable(self, order1, order2, order3):
+        orders_service = OrdersService.from_orders(order for order in (order1, order2, order3))
+        assert orders_service.orders == [order1, order2, order3]
+
     def test_get_average_product_price_when_within_range(self, order_service_with_distinct_valued_orders):
         date_min = datetime(2022, 11, 11, 0, 0, 0, 0, pytz.timezone('UTC'))
         date_max = datetime(2023, 1, 11, 0, 0, 0, 0, pytz.timezone('UTC'))
@@ -106,6 +110,14 @@ class TestOrdersService:
         assert order_service_with_distinct_valued_orders.get_client_with_most_valuable_cart() == [
             order1.customer, order2.customer]
 
+    def test_get_top_k_clients_with_most_valuable_cart(self, order_service_with_distinct_valued_orders, order1, order2,
+                                                       order3):
+        service = order_service_with_distinct_valued_orders
+        assert service.get_client_with_most_valuable_cart(1) == [order1.customer, order2.customer]
+        assert service.get_client_with_most_valuable_cart(3) == [order1.customer, order2.customer, order3.customer]
+        with pytest.raises(ValueError, match='k has to be positive integer'):
+            service.get_client_with_most_valuable_cart(0)
+
     def test_get_orders_value_after_discounts(self, order_service_with_distinct_valued_orders):
         assert order_service_with_distinct_valued_orders.get_orders_value_after_discounts() == Decimal('6346.5')
 
@@ -130,3 +142,117 @@ class TestOrdersService:
             12: [Category.B],
             1: [Category.C]
         }
+
+
+class TestOrdersServiceCache:
+    def test_repeated_query_is_answered_from_cache(self, order_service_with_distinct_valued_orders):
+        service = order_service_with_distinct_valued_orders
+        first = service.get_most_popular_category(2)
+        assert service.get_most_popular_category(2) == first
+        service.get_most_popular_category(1)
+        assert (service.get_cache_stats().hits, service.get_cache_stats().misses) == (1, 2)
+
+    def test_cache_is_invalidated_when_orders_are_added(self, order_service_with_distinct_valued_orders, order1):
+        service = order_service_with_distinct_valued_orders
+        assert service.get_months_with_quantity_of_ordered_products() == {11: 1, 12: 2, 1: 3}
+        service.add_orders([order1])
+        assert service.get_months_with_quantity_of_ordered_products() == {11: 2, 12: 2, 1: 3}
+        service.orders.append(order1)
+        assert service.get_months_with_quantity_of_ordered_products() == {11: 3, 12: 2, 1: 3}
+        service.orders = [order1]
+        assert service.get_months_with_quantity_of_ordered_products() == {11: 1}
+        assert service.get_cache_stats().hits == 0
+
+    def test_cache_is_invalidated_by_add_order_from_dict(self, order_service_with_distinct_valued_orders):
+        service = order_service_with_distinct_valued_orders
+        assert service.get_date_with_most_orders_made(3) == [datetime(2022, 11, 11, tzinfo=pytz.utc),
+                                                            datetime(2022, 12, 11, tzinfo=pytz.utc),
+                                                            datetime(2023, 1, 11, tzinfo=pytz.utc)]
+        service.add_order_from_dict({
+            "customer": {"name": "ADAM", "surname": "SMITH", "age": 33, "email": "adam@gmail.com"},
+            "product": {"name": "TV", "price": "3000", "category": "A"},
+            "quantity": 1, "order_date": "2023-01-11 00:00:00"
+        })
+        assert len(service.get_date_with_most_orders_made(3)) == 4
+
+    def test_cached_result_is_copied(self, order_service_with_distinct_valued_orders):
+        service = order_service_with_distinct_valued_orders
+        products = service.get_most_expensive_products_per_category(2)
+        next(iter(products.values())).clear()
+        products.clear()
+        assert service.get_most_expensive_products_per_category(2) == \
+               OrdersService(service.orders).get_most_expensive_products_per_category(2)
+        assert service.get_cache_stats().hits == 1
+
+    def test_summary_of_every_order_is_not_cached(self, order_service_with_distinct_valued_orders):
+        service = order_service_with_distinct_valued_orders
+        summary = service.get_customers_orders_summary()
+        assert service.get_customers_orders_summary() is not summary
+        assert service.get_cache_stats().size == 0
+
+    def test_discounts_are_cached_only_for_reference_time(self, order_service_with_distinct_valued_orders, order1):
+        service = order_service_with_distinct_valued_orders
+        service.get_orders_value_after_discounts()
+        service.get_orders_value_after_discounts()
+        assert service.get_cache_stats().size == 0
+        service.get_orders_value_after_discounts(order1.order_date)
+        service.get_orders_value_after_discounts(order1.order_date)
+        assert service.get_cache_stats().hits == 1
+
+    def test_positional_keyword_and_default_arguments_share_result(self, order_service_with_distinct_valued_orders):
+        service = order_service_with_distinct_valued_orders
+        service.get_most_popular_category(2)
+        service.get_most_popular_category(k=2)
+        service.get_most_popular_category()
+        service.get_most_popular_category(None)
+        assert (service.get_cache_stats().hits, service.get_cache_stats().size) == (2, 2)
+
+    def test_invalidate_after_order_was_replaced(self, order_service_with_distinct_valued_orders, order1):
+        service = order_service_with_distinct_valued_orders
+        assert service.get_months_with_quantity_of_ordered_products() == {11: 1, 12: 2, 1: 3}
+        service.orders[1] = order1
+        service.invalidate()
+        assert service.get_months_with_quantity_of_ordered_products() == \
+               OrdersService(list(service.orders)).get_months_with_quantity_of_ordered_products()
+        assert service.aggregates.get_most_popular_category() == \
+               OrdersService(list(service.orders)).get_most_popular_category()
+
+    def test_cache_size(self, order1):
+        service = OrdersService([order1], cache_size=1)
+        service.get_most_popular_category()
+        service.get_months_with_quantity_of_ordered_products()
+        assert service.get_cache_stats().evictions == 1
+
+
+class TestOrdersServiceWithLazyOrders:
+    @staticmethod
+    def get_records(*orders: Order) -> list[dict]:
+        return [{"customer": {"name": o.customer.name, "surname": o.customer.surname, "age": o.customer.age,
+                              "email": o.customer.email},
+                 "product": {"name": o.product.name, "price": str(o.product.price),
+                             "category": o.product.category.name},
+                 "quantity": o.quantity, "order_date": o.order_date.isoformat()} for o in orders]
+
+    def test_fields_are_not_converted_before_query(self, order1, order2, order3):
+        records = self.get_records(order1, order2, order3)
+        lazy_orders = [LazyOrder(record) for record in records]
+        service = OrdersService.from_orders(lazy_orders)
+        service.add_orders([LazyOrder(records[0])])
+        assert all((order._customer, order._product, order._order_date) == (None, None, None)
+                   for order in service.orders)
+        assert service.get_most_popular_category() == OrdersService([order1, order2, order3, order1]) \
+            .get_most_popular_category()
+        assert all(order._product is not None for order in service.orders)
+        # only products are read by categories counter, customers and dates stay unconverted
+        assert all((order._customer, order._order_date) == (None, None) for order in service.orders)
+        service.get_date_with_most_orders_made()
+        assert all(order._order_date is not None and order._customer is None for order in service.orders)
+
+    def test_queries_match_eager_orders(self, order1, order2, order3):
+        records = self.get_records(order1, order2, order3)
+        service = OrdersService([order1, order2, order3])
+        lazy_service = OrdersService.from_orders(LazyOrder(record) for record in records)
+        assert lazy_service.get_customers_orders_summary() == service.get_customers_orders_summary()
+        assert lazy_service.get_date_with_most_orders_made() == service.get_date_with_most_orders_made()
+        assert lazy_service.get_orders_value_after_discounts(order1.order_date) == \
+               service.get_orders_value_after_discounts(order1.order_date)
@@ -0,0 +1,80 @@
+import struct
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from ecomerceapp.ecomerce_service.generator import OrdersGenerator, OrdersGeneratorConfig
+from ecomerceapp.ecomerce_service.loader import load_orders
+from ecomerceapp.ecomerce_service.model import Order
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.ecomerce_service.snapshot import write_snapshot, read_snapshot, SNAPSHOT_MAGIC
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders
+
+
+class TestSnapshot:
+    def test_round_trip(self, tmp_path, random_orders):
+        path = str(tmp_path / 'orders.snapshot')
+        write_snapshot(random_orders, path)
+        assert read_snapshot(path) == random_orders
+
+    @pytest.mark.parametrize('count', [0, 1, 3])
+    def test_round_trip_of_small_pools(self, tmp_path, random_orders, count):
+        path = str(tmp_path / 'orders.snapshot')
+        write_snapshot(random_orders[:count], path)
+        assert read_snapshot(path) == random_orders[:count]
+
+    def test_round_trip_keeps_offsets_and_price_exponents(self, tmp_path):
+        orders = load_orders(OrdersGenerator(OrdersGeneratorConfig(customers=20, products=5)).generate(50))
+        shifted_date = datetime(2022, 5, 1, 10, 30, tzinfo=timezone(timedelta(hours=-5, minutes=-30)))
+        orders.append(Order(orders[0].customer, orders[0].product, 1, shifted_date))
+        path = str(tmp_path / 'orders.snapshot')
+        write_snapshot(orders, path)
+        restored = read_snapshot(path)
+        assert restored == orders
+        assert restored[-1].order_date.utcoffset() == shifted_date.utcoffset()
+        assert [str(order.product.price) for order in restored] == [str(order.product.price) for order in orders]
+
+    def test_restored_orders_share_customers_and_products(self, tmp_path, random_orders):
+        path = str(tmp_path / 'orders.snapshot')
+        write_snapshot(random_orders, path)
+        restored = read_snapshot(path)
+        assert len({id(order.customer) for order in restored}) == len({order.customer for order in random_orders})
+
+    def test_file_that_is_not_snapshot(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text('[1, 2, 3]' * 10)
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == 'File is not an orders snapshot'
+
+    def test_unsupported_version(self, tmp_path, random_orders):
+        path = tmp_path / 'orders.snapshot'
+        write_snapshot(random_orders, str(path))
+        data = bytearray(path.read_bytes())
+        struct.pack_into('<H', data, len(SNAPSHOT_MAGIC), 99)
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == 'Unsupported snapshot version 99'
+
+    def test_truncated_snapshot(self, tmp_path, random_orders):
+        path = tmp_path / 'orders.snapshot'
+        write_snapshot(random_orders, str(path))
+        path.write_bytes(path.read_bytes()[:-100])
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == 'Snapshot is truncated'
+
+    def test_incorrect_path(self):
+        with pytest.raises(FileNotFoundError) as e:
+            read_snapshot('xyz.snapshot')
+        assert e.value.args[0] == 'File does not exist'
+
+
+class TestOrdersServiceSnapshot:
+    def test_service_from_snapshot(self, tmp_path, random_orders):
+        path = str(tmp_path / 'orders.snapshot')
+        OrdersService(random_orders).save_snapshot(path)
+        service = OrdersService.from_snapshot(path)
+        assert service.orders == random_orders
+        assert service.get_client_with_most_valuable_cart() == OrdersService(random_orders).get_client_with_most_valuable_cart()
@@ -0,0 +1,146 @@
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.ecomerce_service.model import Order, Customer, Product, Category
+from ecomerceapp.ecomerce_service.service import OrdersService
+from ecomerceapp.ecomerce_service.sqlite_service import SqliteOrdersService
+from ecomerceapp.tests.test_ecomerce_service.ecommerce_service_fixtures import random_orders, valid_order_data, \
+    valid_product_data, valid_customer_data
+
+QUERIES = [
+    'get_most_expensive_products_per_category', 'get_customers_orders_summary', 'get_date_with_most_orders_made',
+    'get_date_with_least_orders_made', 'get_client_with_most_valuable_cart', 'get_most_popular_category',
+    'get_months_with_quantity_of_ordered_products', 'get_most_popular_categories_for_months_that_orders_occurred'
+]
+TOP_K_QUERIES = [
+    'get_most_expensive_products_per_category', 'get_date_with_most_orders_made', 'get_date_with_least_orders_made',
+    'get_client_with_most_valuable_cart', 'get_most_popular_category'
+]
+
+
+@pytest.fixture
+def services(random_orders) -> tuple[OrdersService, SqliteOrdersService]:
+    with SqliteOrdersService.from_orders(random_orders) as sqlite_service:
+        yield OrdersService(random_orders), sqlite_service
+
+
+def assert_same_result(result, expected):
+    assert result == expected
+    if isinstance(expected, dict):
+        assert list(result) == list(expected)
+
+
+class TestSqliteOrdersService:
+    @pytest.mark.parametrize('query', QUERIES)
+    def test_query_matches_in_memory_service(self, services, query):
+        service, sqlite_service = services
+        assert_same_result(getattr(sqlite_service, query)(), getattr(service, query)())
+
+    @pytest.mark.parametrize('query', TOP_K_QUERIES)
+    @pytest.mark.parametrize('k', [1, 3, 10])
+    def test_top_k_query_matches_in_memory_service(self, services, query, k):
+        service, sqlite_service = services
+        assert_same_result(getattr(sqlite_service, query)(k), getattr(service, query)(k))
+
+    @pytest.mark.parametrize('start_date, end_date', [
+        (datetime(2022, 3, 1, tzinfo=timezone.utc), datetime(2022, 8, 31, tzinfo=timezone.utc)),
+        (datetime(2000, 1, 1, tzinfo=timezone.utc), datetime(2100, 1, 1, tzinfo=timezone.utc)),
+        *((datetime(2022, month, 1, tzinfo=timezone.utc), datetime(2022, month, 28, tzinfo=timezone.utc))
+          for month in range(1, 13)),
+    ])
+    def test_date_range_queries(self, services, start_date, end_date):
+        service, sqlite_service = services
+        if service.get_orders_count_in_date_range(start_date, end_date) == 0:
+            with pytest.raises(ZeroDivisionError):
+                sqlite_service.get_average_product_price_in_date_range(start_date, end_date)
+        else:
+            assert repr(sqlite_service.get_average_product_price_in_date_range(start_date, end_date)) == \
+                   repr(service.get_average_product_price_in_date_range(start_date, end_date))
+        for query in ('get_orders_count_in_date_range', 'get_orders_value_in_date_range'):
+            # repr, because Decimals with different number of decimal places are equal
+            assert repr(getattr(sqlite_service, query)(start_date, end_date)) == \
+                   repr(getattr(service, query)(start_date, end_date))
+
+    def test_date_range_value_has_decimal_places_of_prices_in_range(self):
+        date = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        customer = Customer('ADAM', 'SMITH', 33, 'adam@gmail.com')
+        with SqliteOrdersService() as sqlite_service:
+            sqlite_service.add_orders([
+                Order(customer, Product('TV', Decimal('10.50'), Category.A), 1, date),
+                Order(customer, Product('RADIO', Decimal('7'), Category.A), 1, date + timedelta(days=1)),
+                Order(customer, Product('PHONE', Decimal('7'), Category.A), 1, date + timedelta(days=2))])
+            assert repr(sqlite_service.get_orders_value_in_date_range(date + timedelta(days=1),
+                                                                      date + timedelta(days=1))) == "Decimal('7')"
+            assert repr(sqlite_service.get_orders_value_in_date_range(date + timedelta(days=1),
+                                                                      date + timedelta(days=2))) == "Decimal('14')"
+            assert repr(sqlite_service.get_orders_value_in_date_range(date, date + timedelta(days=2))) == \
+                   "Decimal('24.50')"
+
+    def test_average_price_when_out_of_range(self, services):
+        date = datetime(2010, 1, 1, tzinfo=timezone.utc)
+        with pytest.raises(ZeroDivisionError) as e:
+            services[1].get_average_product_price_in_date_range(date, date)
+        assert e.value.args[0] == 'product_count equals 0 therefore it cannot be valid divisor'
+
+    @pytest.mark.parametrize('n', [0, 1, 2, 5])
+    def test_clients_num(self, services, n):
+        service, sqlite_service = services
+        assert sqlite_service.get_clients_num_that_ordered_at_least_n_products_per_transaction(n) == \
+               service.get_clients_num_that_ordered_at_least_n_products_per_transaction(n)
+
+    def test_discounts(self, services, random_orders):
+        service, sqlite_service = services
+        for reference_time in [None, *(order.order_date for order in random_orders[:10])]:
+            assert sqlite_service.get_orders_value_after_discounts(reference_time) == \
+                   service.get_orders_value_after_discounts(reference_time)
+
+    def test_report(self, services):
+        service, sqlite_service = services
+        arguments = {'get_clients_num_that_ordered_at_least_n_products_per_transaction': (2,),
+                     'get_most_popular_category': (2,)}
+        metrics = [*QUERIES, 'get_clients_num_that_ordered_at_least_n_products_per_transaction']
+        assert sqlite_service.get_report(metrics, arguments) == service.get_report(metrics, arguments)
+
+    def test_orders_are_read_back(self, services, random_orders):
+        stored_orders = list(services[1].iter_orders())
+        assert stored_orders == random_orders
+        assert [order.order_date.utcoffset() for order in stored_orders] == \
+               [order.order_date.utcoffset() for order in random_orders]
+        assert len(services[1]) == len(random_orders)
+
+    def test_prices_are_rescaled_when_more_decimal_places_arrive(self):
+        date = datetime(2022, 1, 1, tzinfo=timezone(timedelta(hours=2)))
+        customer = Customer('ADAM', 'SMITH', 33, 'adam@gmail.com')
+        with SqliteOrdersService() as sqlite_service:
+            sqlite_service.add_orders([Order(customer, Product('TV', Decimal('10'), Category.A), 3, date)])
+            sqlite_service.add_orders([Order(customer, Product('RADIO', Decimal('0.125'), Category.A), 2, date)])
+            assert sqlite_service.price_scale == 3
+            assert sqlite_service.get_orders_value_in_date_range(date, date) == Decimal('30.25')
+            assert sqlite_service.get_most_expensive_products_per_category(2)[Category.A] == [
+                Product('TV', Decimal('10'), Category.A), Product('RADIO', Decimal('0.125'), Category.A)]
+
+    def test_orders_persist_in_database_file(self, tmp_path, random_orders):
+        database = str(tmp_path / 'orders.db')
+        with SqliteOrdersService.from_orders(random_orders[:150], database) as sqlite_service:
+            expected_summary = sqlite_service.get_customers_orders_summary()
+        with SqliteOrdersService(database) as sqlite_service:
+            assert sqlite_service.get_customers_orders_summary() == expected_summary
+            sqlite_service.add_orders(random_orders[150:], batch_size=40)
+            assert list(sqlite_service.iter_orders()) == random_orders
+            assert sqlite_service.get_client_with_most_valuable_cart() == \
+                   OrdersService(random_orders).get_client_with_most_valuable_cart()
+
+    def test_add_order_from_dict(self, valid_order_data):
+        with SqliteOrdersService() as sqlite_service:
+            sqlite_service.add_order_from_dict(valid_order_data)
+            assert list(sqlite_service.iter_orders()) == [Order.from_dict(valid_order_data)]
+
+    def test_top_queries_of_empty_service(self):
+        with SqliteOrdersService() as sqlite_service:
+            with pytest.raises(IndexError):
+                sqlite_service.get_most_popular_category()
+            assert sqlite_service.get_most_expensive_products_per_category() == {}
+            with pytest.raises(ValueError, match='k has to be positive integer'):
+                sqlite_service.get_date_with_most_orders_made(0)
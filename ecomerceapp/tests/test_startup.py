@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+from decimal import Decimal
+
+import pytest
+
+from ecomerceapp.settings import AppData, SETTINGS_TYPES, load_settings
+
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# modules that are imported only by code paths that need them
+DEFERRED_MODULES = ['dotenv', 'pytz', 'multiprocessing', 'concurrent.futures.process', 'sqlite3', 'asyncio']
+# cumulative import time in microseconds, measured values are 2 to 5 times lower, so only regressions fail
+IMPORT_TIME_BUDGET = 150_000
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    environment = {**os.environ, 'PYTHONPATH': REPOSITORY_PATH}
+    return subprocess.run([sys.executable, *options, '-c', code], capture_output=True, text=True, check=True,
+                          cwd=REPOSITORY_PATH, env=environment)
+
+
+def get_import_time(module: str) -> int:
+    """ Cumulative import time of module in microseconds, reported by python -X importtime """
+    stderr = run_python(f'import {module}', '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        _, _, cumulative, name = (part.strip() for part in line.replace('|', ':').split(':'))
+        if name == module:
+            return int(cumulative)
+    raise AssertionError(f'{module} was not imported')
+
+
+@pytest.mark.parametrize('module', [
+    'ecomerceapp.ecomerce_service.model', 'ecomerceapp.ecomerce_service.loader',
+    'ecomerceapp.ecomerce_service.service', 'ecomerceapp.__main__'
+])
+class TestStartup:
+    def test_heavy_modules_and_settings_are_not_loaded_on_import(self, module):
+        code = f'import json, sys, {module}; from ecomerceapp.settings import load_settings; ' \
+               f'print(json.dumps([sorted(sys.modules), load_settings.cache_info().currsize]))'
+        imported_modules, loaded_settings = json.loads(run_python(code).stdout)
+        assert [name for name in DEFERRED_MODULES if name in imported_modules] == []
+        assert loaded_settings == 0
+
+    def test_import_time_budget(self, module):
+        assert min(get_import_time(module) for _ in range(3)) < IMPORT_TIME_BUDGET
+
+
+class TestSettings:
+    @pytest.fixture(autouse=True)
+    def reloaded_settings(self):
+        AppData.reload()
+        yield
+        AppData.reload()
+
+    def test_settings_are_loaded_once_on_first_read(self, monkeypatch):
+        monkeypatch.setenv('ORDERS_FILE_PATH', 'first.json')
+        assert load_settings.cache_info().currsize == 0
+        assert AppData.ORDERS_FILE_PATH == 'first.json'
+        assert AppData.DISCOUNT_RATE_FOR_DATE == Decimal(os.environ['DISCOUNT_RATE_FOR_DATE'])
+        monkeypatch.setenv('ORDERS_FILE_PATH', 'second.json')
+        assert AppData.ORDERS_FILE_PATH == 'first.json'
+        assert load_settings.cache_info().misses == 1
+        AppData.reload()
+        assert AppData.ORDERS_FILE_PATH == 'second.json'
+
+    def test_unknown_setting(self):
+        with pytest.raises(AttributeError):
+            AppData.UNKNOWN_SETTING
+
+    def test_missing_setting(self, monkeypatch):
+        monkeypatch.setattr('ecomerceapp.settings.SETTINGS_TYPES', {**SETTINGS_TYPES, 'MISSING_SETTING': int})
+        with pytest.raises(KeyError, match='Setting MISSING_SETTING is not defined'):
+            AppData.MISSING_SETTING